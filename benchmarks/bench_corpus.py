@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Replays the recorded sessions in benchmarks/corpus through the output path.
+
+No network is involved. Every recording is cut into reads at a fixed,
+unaligned size and timed stage by stage:
+
+    decode   incremental UTF-8 decoding, as done by SSHWorker
+    parse    the VT parser alone, keeping only the printable text
+    screen   updating the TerminalScreen model, without the parser
+    widget   SSHTerminal.append_output and painting on the offscreen
+             Qt platform, without the screen model
+
+Times are the best of --repeat runs. A separate run under tracemalloc
+reports the peak and retained Python memory of every stage.
+
+    python benchmarks/bench_corpus.py [NAME ...] [--chunk BYTES] [--frame BYTES]
+                                      [--repeat N] [--no-memory] [--json]
+"""
+
+import argparse
+import codecs
+import gc
+import gzip
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(ROOT, "benchmarks", "corpus")
+sys.path.insert(0, ROOT)
+
+from PyQt5.QtWidgets import QApplication
+
+from src.vt_parser import VTParser
+from src.terminal_screen import TerminalScreen
+from src.ssh_terminal import SSHTerminal
+
+# Size of the recordings' pseudo terminal
+COLS = 120
+ROWS = 40
+
+STAGES = ("decode", "parse", "screen", "widget")
+
+class TextCollector:
+    """Parser handler that keeps the text and drops every escape sequence."""
+
+    def __init__(self):
+        self.parts = []
+
+    def draw(self, text):
+        self.parts.append(text)
+
+    def execute(self, ch):
+        if ch in "\r\n\t":
+            self.parts.append(ch)
+
+    def csi_dispatch(self, params, private, intermediates, final):
+        pass
+
+    def esc_dispatch(self, intermediates, final):
+        pass
+
+    def osc_dispatch(self, data):
+        pass
+
+def load(name):
+    with gzip.open(os.path.join(CORPUS_DIR, f"{name}.bin.gz"), "rb") as f:
+        return f.read()
+
+def split(data, chunk):
+    return [data[i:i + chunk] for i in range(0, len(data), chunk)]
+
+def frames(texts, size):
+    """Join reads into the batches SSHWorker would hand to the GUI."""
+    batches = []
+    pending = []
+    length = 0
+    for text in texts:
+        pending.append(text)
+        length += len(text)
+        if length >= size:
+            batches.append("".join(pending))
+            pending = []
+            length = 0
+    if pending:
+        batches.append("".join(pending))
+    return batches
+
+def decode(chunks):
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    return [decoder.decode(chunk) for chunk in chunks]
+
+def parse(texts):
+    parser = VTParser(TextCollector())
+    for text in texts:
+        parser.feed(text)
+
+def feed_screen(texts):
+    screen = TerminalScreen(COLS, ROWS)
+    for text in texts:
+        screen.feed(text)
+
+def feed_terminal(app, batches):
+    terminal = SSHTerminal({"name": "corpus", "host": "localhost", "port": 22, "username": "bench"})
+    view = terminal.terminal_view
+    terminal.resize(COLS * view.cell_width + view.scrollbar.sizeHint().width(),
+                    ROWS * view.cell_height + terminal.input_widget.sizeHint().height())
+    terminal.show()
+    app.processEvents()
+    for batch in batches:
+        terminal.append_output(batch)
+        # Paint what append_output scheduled
+        app.processEvents()
+    terminal.shutdown()
+    terminal.deleteLater()
+    app.processEvents()
+
+def run_stages(app, chunks, frame):
+    """Run every stage once; returns cumulative seconds per stage."""
+    times = {}
+    start = time.perf_counter()
+    texts = decode(chunks)
+    times["decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parse(texts)
+    times["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    feed_screen(texts)
+    times["screen"] = time.perf_counter() - start
+
+    batches = frames(texts, frame)
+    start = time.perf_counter()
+    feed_terminal(app, batches)
+    times["widget"] = time.perf_counter() - start
+    return times
+
+def measure_memory(app, chunks, frame):
+    """Peak and retained traced memory of every stage, in KB."""
+    texts = decode(chunks)
+    batches = frames(texts, frame)
+    steps = {
+        "decode": lambda: decode(chunks),
+        "parse": lambda: parse(texts),
+        "screen": lambda: feed_screen(texts),
+        "widget": lambda: feed_terminal(app, batches),
+    }
+    memory = {}
+    for stage, step in steps.items():
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        result = step()
+        peak = tracemalloc.get_traced_memory()[1]
+        # Whatever the stage returns or leaves in reference cycles is not retained
+        del result
+        gc.collect()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        memory[stage] = {"peak_kb": round((peak - before) / 1024, 1),
+                         "retained_kb": round((current - before) / 1024, 1)}
+    return memory
+
+def run(app, name, data, chunk, frame, repeat, memory):
+    chunks = split(data, chunk)
+    best = {stage: float("inf") for stage in STAGES}
+    for _ in range(repeat):
+        for stage, seconds in run_stages(app, chunks, frame).items():
+            best[stage] = min(best[stage], seconds)
+
+    # The screen runs the parser and the widget runs the screen, count each stage once
+    own = {
+        "decode": best["decode"],
+        "parse": best["parse"],
+        "screen": max(0.0, best["screen"] - best["parse"]),
+        "widget": max(0.0, best["widget"] - best["screen"]),
+    }
+    total = own["decode"] + best["widget"]
+    megabytes = len(data) / 1e6
+    result = {
+        "recording": name,
+        "bytes": len(data),
+        "chunk": chunk,
+        "frame": frame,
+        "total_ms": round(total * 1000, 2),
+        "total_mb_s": round(megabytes / total, 2),
+        "stages": {stage: {"ms": round(seconds * 1000, 2),
+                           "share": round(seconds / total, 3)} for stage, seconds in own.items()},
+    }
+    if memory:
+        for stage, usage in measure_memory(app, chunks, frame).items():
+            result["stages"][stage].update(usage)
+    return result
+
+def main():
+    names = sorted(f[:-len(".bin.gz")] for f in os.listdir(CORPUS_DIR) if f.endswith(".bin.gz"))
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("names", nargs="*", choices=[[]] + names, help="recordings to replay")
+    parser.add_argument("--chunk", type=int, default=4093, help="bytes per simulated read")
+    parser.add_argument("--frame", type=int, default=16384, help="characters per append_output call")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per line")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    for name in args.names or names:
+        result = run(app, name, load(name), args.chunk, args.frame, args.repeat, not args.no_memory)
+        if args.json:
+            print(json.dumps(result))
+            continue
+        print(f"{name:6s} {result['bytes'] / 1e6:6.2f} MB  {result['total_ms']:8.1f} ms  "
+              f"{result['total_mb_s']:6.2f} MB/s")
+        for stage, values in result["stages"].items():
+            line = f"    {stage:7s} {values['ms']:8.1f} ms  {values['share'] * 100:5.1f} %"
+            if "peak_kb" in values:
+                line += f"  peak {values['peak_kb']:9.1f} KB  retained {values['retained_kb']:9.1f} KB"
+            print(line)
+
+if __name__ == "__main__":
+    main()
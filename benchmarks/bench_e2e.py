@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+End-to-end benchmarks of the SSH session pipeline against a loopback server.
+
+Drives real SSHTerminal tabs (SSHWorker, TerminalScreen and TerminalView)
+on the offscreen Qt platform against ssh_server.py and reports:
+
+    throughput  MB/s per output profile until the output is on screen
+    echo        keystroke to echo latency in raw input mode
+    stall       longest GUI thread stall while output streams in
+    idle        CPU used by idle open sessions
+
+The server runs in this process unless --external starts it as a child
+process, which keeps its CPU out of the idle measurement.
+
+    python benchmarks/bench_e2e.py [--size MB] [--keys N] [--sessions N]
+                                   [--idle SECONDS] [--external] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QEventLoop, QTimer
+from PyQt5.QtTest import QTest
+
+from src.ssh_terminal import SSHTerminal
+from src.transport_pool import TransportPool
+from ssh_server import BenchServer, DONE_MARKER, USERNAME, PASSWORD
+
+# Interval of the timer that notices GUI thread stalls
+STALL_TICK_MS = 5
+
+# Bytes per frame of the tui profile, roughly
+TUI_FRAME_BYTES = 1100
+
+# Characters per line of the lines profile
+LINE_BYTES = 26
+
+class StallMonitor:
+    """Records how late a periodic GUI thread timer fires."""
+
+    def __init__(self):
+        self.timer = QTimer()
+        self.timer.setInterval(STALL_TICK_MS)
+        self.timer.timeout.connect(self.tick)
+        self.gaps = []
+        self.last = None
+
+    def start(self):
+        self.gaps = []
+        self.last = time.perf_counter()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def tick(self):
+        now = time.perf_counter()
+        self.gaps.append(now - self.last)
+        self.last = now
+
+    def summary(self):
+        gaps = sorted(self.gaps) or [0.0]
+        return {
+            "stall_max_ms": round(gaps[-1] * 1000, 2),
+            "stall_p99_ms": round(gaps[min(len(gaps) - 1, int(len(gaps) * 0.99))] * 1000, 2),
+        }
+
+class Session:
+    """An SSHTerminal tab plus counters on the output it receives."""
+
+    def __init__(self, app, connection, transport_pool):
+        self.app = app
+        self.terminal = SSHTerminal(connection, transport_pool=transport_pool)
+        self.terminal.resize(1000, 600)
+        self.terminal.show()
+        self.received = 0
+        self.tail = ""
+        self.connected = False
+        self.failed = None
+
+    def connect(self, timeout=30):
+        terminal = self.terminal
+        terminal.connect_to_host()
+        terminal.connection_established.connect(lambda: setattr(self, "connected", True))
+        terminal.connection_failed.connect(lambda error: setattr(self, "failed", error))
+        # Connected after the terminal's own slot, so it sees output once it is painted
+        terminal.ssh_worker.output_received.connect(self.on_output)
+        wait_until(self.app, lambda: self.connected or self.failed, timeout)
+        if not self.connected:
+            raise RuntimeError(f"Could not connect: {self.failed}")
+        self.wait_done(timeout, command=None)
+
+    def on_output(self, text):
+        self.received += len(text)
+        self.tail = (self.tail + text)[-200:]
+
+    def run(self, command, timeout=300):
+        """Run a profile command; returns (chars received, seconds)."""
+        self.tail = ""
+        start_count = self.received
+        start = time.perf_counter()
+        self.terminal.send_data(command + "\r")
+        self.wait_done(timeout, command)
+        return self.received - start_count, time.perf_counter() - start
+
+    def wait_done(self, timeout, command):
+        if command is None:
+            # The prompt after connecting
+            wait_until(self.app, lambda: self.tail.endswith("$ "), timeout)
+            return
+        if not wait_until(self.app, lambda: DONE_MARKER in self.tail, timeout):
+            raise RuntimeError(f"{command!r} did not finish in {timeout} s")
+        self.terminal.terminal_view.repaint()
+
+    def close(self):
+        self.terminal.shutdown()
+
+def wait_until(app, predicate, timeout):
+    deadline = time.perf_counter() + timeout
+    # Wakes the event loop even when nothing else is scheduled
+    waker = QTimer()
+    waker.start(STALL_TICK_MS)
+    try:
+        while not predicate():
+            if time.perf_counter() > deadline:
+                return False
+            app.processEvents(QEventLoop.AllEvents | QEventLoop.WaitForMoreEvents)
+        return True
+    finally:
+        waker.stop()
+
+def bench_throughput(app, session, size):
+    monitor = StallMonitor()
+    commands = {
+        "bulk": f"bulk {size}",
+        "lines": f"lines {size // LINE_BYTES}",
+        "tui": f"tui {size // TUI_FRAME_BYTES}",
+    }
+    results = []
+    for profile, command in commands.items():
+        monitor.start()
+        received, seconds = session.run(command)
+        monitor.stop()
+        result = {
+            "benchmark": "throughput",
+            "profile": profile,
+            "bytes": received,
+            "seconds": round(seconds, 3),
+            "mb_s": round(received / seconds / 1e6, 2),
+        }
+        result.update(monitor.summary())
+        results.append(result)
+    return results
+
+def bench_echo(app, session, keys):
+    terminal = session.terminal
+    terminal.set_input_mode("raw")
+    gui_latencies = []
+    for i in range(keys):
+        count = session.received
+        start = time.perf_counter()
+        QTest.keyClick(terminal.terminal_view, "abcdefghij"[i % 10])
+        if not wait_until(app, lambda: session.received > count, 5):
+            raise RuntimeError("Keystroke was not echoed")
+        gui_latencies.append(time.perf_counter() - start)
+    # Clear the typed line, the server answers unknown commands with the marker
+    session.run("")
+    terminal.set_input_mode("line")
+    reactor = terminal.echo_latency()
+    gui_latencies.sort()
+    return {
+        "benchmark": "echo",
+        "keys": keys,
+        "reactor_p50_ms": round(reactor["p50"] * 1000, 3),
+        "reactor_p99_ms": round(reactor["p99"] * 1000, 3),
+        "gui_p50_ms": round(statistics.median(gui_latencies) * 1000, 3),
+        "gui_p99_ms": round(gui_latencies[min(keys - 1, int(keys * 0.99))] * 1000, 3),
+    }
+
+def bench_idle(app, connection, count, seconds):
+    # Separate transports, as for tabs to different hosts
+    sessions = []
+    for i in range(count):
+        session = Session(app, connection, TransportPool(idle_timeout=0))
+        session.connect()
+        sessions.append(session)
+    wait_until(app, lambda: False, 0.5)
+
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    # Let the event loop idle without the wake-up timer of wait_until
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec_()
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+
+    for session in sessions:
+        session.close()
+    return {
+        "benchmark": "idle",
+        "sessions": count,
+        "seconds": round(wall, 2),
+        "cpu_percent": round(100 * cpu / wall, 3),
+        "cpu_percent_per_session": round(100 * cpu / wall / count, 3),
+    }
+
+def start_external_server():
+    process = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "ssh_server.py"), "--port", "0"],
+                               stdout=subprocess.PIPE, text=True)
+    # "Listening on 127.0.0.1:PORT, ..."
+    line = process.stdout.readline()
+    port = int(line.split(":")[1].split(",")[0])
+    connection = {"name": "bench", "host": "127.0.0.1", "port": port,
+                  "username": USERNAME, "password": PASSWORD}
+    return process, connection
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=float, default=8.0, help="output per throughput profile in MB")
+    parser.add_argument("--keys", type=int, default=200, help="keystrokes timed for echo latency")
+    parser.add_argument("--sessions", type=int, default=10, help="idle sessions opened")
+    parser.add_argument("--idle", type=float, default=5.0, help="seconds the idle sessions are measured")
+    parser.add_argument("--external", action="store_true", help="run the server in a child process")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per line")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    if args.external:
+        process, connection = start_external_server()
+    else:
+        server = BenchServer().start()
+        connection = server.connection()
+
+    try:
+        session = Session(app, connection, TransportPool(idle_timeout=0))
+        session.connect()
+        results = bench_throughput(app, session, int(args.size * 1e6))
+        results.append(bench_echo(app, session, args.keys))
+        session.close()
+        if args.sessions > 0:
+            results.append(bench_idle(app, connection, args.sessions, args.idle))
+    finally:
+        if args.external:
+            process.terminate()
+        else:
+            server.stop()
+
+    for result in results:
+        if args.json:
+            print(json.dumps(result))
+        elif result["benchmark"] == "throughput":
+            print(f"throughput {result['profile']:6s} {result['mb_s']:8.2f} MB/s  "
+                  f"stall max {result['stall_max_ms']:7.1f} ms  p99 {result['stall_p99_ms']:6.1f} ms")
+        elif result["benchmark"] == "echo":
+            print(f"echo       reactor p50 {result['reactor_p50_ms']:.3f} ms  p99 {result['reactor_p99_ms']:.3f} ms  "
+                  f"gui p50 {result['gui_p50_ms']:.3f} ms  p99 {result['gui_p99_ms']:.3f} ms")
+        else:
+            print(f"idle       {result['sessions']} sessions  cpu {result['cpu_percent']:.2f} %  "
+                  f"({result['cpu_percent_per_session']:.3f} % per session)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmarks for the terminal output path without Qt or a network.
+
+Each workload is split into chunks at fixed, unaligned offsets (so escape
+sequences and multibyte characters straddle chunk boundaries), decoded
+with the incremental UTF-8 decoder and fed to a TerminalScreen.
+
+    python benchmarks/bench_parser.py [--size MB] [--chunk BYTES] [--json]
+"""
+
+import argparse
+import codecs
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.terminal_screen import TerminalScreen
+
+def plain_log(size):
+    """Plain ASCII log lines."""
+    rng = random.Random(1)
+    words = ["INFO", "request", "handled", "in", "ms", "user", "GET", "/api/v1/items", "200", "OK"]
+    lines = []
+    total = 0
+    while total < size:
+        line = f"2024-01-01 12:00:{rng.randrange(60):02d} " + " ".join(rng.choice(words) for _ in range(10)) + "\r\n"
+        lines.append(line)
+        total += len(line)
+    return "".join(lines).encode()
+
+def colored_listing(size):
+    """ls --color style output with short SGR sequences."""
+    rng = random.Random(2)
+    lines = []
+    total = 0
+    while total < size:
+        color = rng.choice(["01;34", "01;32", "00", "01;36", "38;5;208"])
+        line = f"-rw-r--r-- 1 user user {rng.randrange(100000):6d} Jan  1 12:00 \x1b[{color}mfile_{total}\x1b[0m\r\n"
+        lines.append(line)
+        total += len(line)
+    return "".join(lines).encode()
+
+def utf8_heavy(size):
+    """Log lines mixing accented, CJK and emoji characters."""
+    rng = random.Random(3)
+    words = ["Grüße", "naïve", "日本語", "中文字符", "Ελληνικά", "кириллица", "✓", "→", "🙂"]
+    lines = []
+    total = 0
+    while total < size:
+        line = " ".join(rng.choice(words) for _ in range(12)) + "\r\n"
+        encoded = line.encode()
+        lines.append(encoded)
+        total += len(encoded)
+    return b"".join(lines)
+
+def tui_redraw(size):
+    """Full-screen redraws with cursor positioning, as done by top or htop."""
+    rng = random.Random(4)
+    frames = []
+    total = 0
+    while total < size:
+        parts = ["\x1b[H"]
+        for row in range(1, 25):
+            parts.append(f"\x1b[{row};1H\x1b[7m{rng.randrange(99999):5d}\x1b[0m "
+                         f"\x1b[32m{rng.random() * 100:5.1f}\x1b[0m proc_{row}\x1b[K")
+        frame = "".join(parts).encode()
+        frames.append(frame)
+        total += len(frame)
+    return b"".join(frames)
+
+WORKLOADS = {
+    "plain_log": plain_log,
+    "colored_listing": colored_listing,
+    "utf8_heavy": utf8_heavy,
+    "tui_redraw": tui_redraw,
+}
+
+def split(data, chunk):
+    # Odd chunk size so boundaries fall inside sequences and characters
+    return [data[i:i + chunk] for i in range(0, len(data), chunk)]
+
+def run(name, data, chunk, repeat):
+    chunks = split(data, chunk)
+    best_decode = best_total = float("inf")
+    for _ in range(repeat):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        start = time.perf_counter()
+        texts = [decoder.decode(c) for c in chunks]
+        decoded = time.perf_counter()
+        screen = TerminalScreen(120, 40)
+        for text in texts:
+            screen.feed(text)
+        done = time.perf_counter()
+        best_decode = min(best_decode, decoded - start)
+        best_total = min(best_total, done - start)
+    megabytes = len(data) / 1e6
+    return {
+        "workload": name,
+        "bytes": len(data),
+        "chunk": chunk,
+        "decode_mb_s": round(megabytes / best_decode, 2) if best_decode else None,
+        "parse_mb_s": round(megabytes / (best_total - best_decode), 2),
+        "total_mb_s": round(megabytes / best_total, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=float, default=2.0, help="workload size in MB")
+    parser.add_argument("--chunk", type=int, default=4093, help="bytes per simulated read")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print one JSON object per line")
+    args = parser.parse_args()
+
+    size = int(args.size * 1e6)
+    for name, generate in WORKLOADS.items():
+        result = run(name, generate(size), args.chunk, args.repeat)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(f"{name:16s} decode {result['decode_mb_s']:8.2f} MB/s  "
+                  f"parse {result['parse_mb_s']:7.2f} MB/s  total {result['total_mb_s']:7.2f} MB/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Startup time of the GUI and of the headless command line.
+
+Starts `main.py --measure-startup` on the offscreen Qt platform several
+times and reports the median of every startup stage, then times
+`main.py list`. With --max-ms the script exits with status 1 when the
+median time until the main window is shown exceeds the limit, so it
+can guard against startup regressions.
+
+    python benchmarks/bench_startup.py [--runs N] [--max-ms MS] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+def environment(home):
+    env = dict(os.environ)
+    env["QT_QPA_PLATFORM"] = "offscreen"
+    # Measure with an empty configuration, not the user's
+    env["HOME"] = home
+    return env
+
+def measure_gui(runs, env):
+    reports = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, MAIN, "--measure-startup"], env=env,
+                                capture_output=True, text=True, timeout=60, check=True).stdout
+        reports.append(json.loads(output.strip().splitlines()[-1]))
+    stages = {name: round(statistics.median(r["stages_ms"][name] for r in reports), 1)
+              for name in reports[0]["stages_ms"]}
+    return {
+        "mode": "gui",
+        "runs": runs,
+        "stages_ms": stages,
+        "total_ms": round(statistics.median(r["total_ms"] for r in reports), 1),
+    }
+
+def measure_cli(runs, env):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, MAIN, "list"], env=env, capture_output=True,
+                       timeout=60, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    # The bare interpreter start is reported so the CLI's own cost can be read off
+    baseline = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+        baseline.append((time.perf_counter() - start) * 1000)
+    return {
+        "mode": "cli",
+        "runs": runs,
+        "total_ms": round(statistics.median(times), 1),
+        "interpreter_ms": round(statistics.median(baseline), 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, help="fail if the GUI median exceeds this")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per line")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        env = environment(home)
+        results = [measure_gui(args.runs, env), measure_cli(args.runs, env)]
+
+    for result in results:
+        if args.json:
+            print(json.dumps(result))
+        elif result["mode"] == "gui":
+            stages = "  ".join(f"{name} {ms:.1f}" for name, ms in result["stages_ms"].items())
+            print(f"gui  total {result['total_ms']:7.1f} ms  ({stages})")
+        else:
+            print(f"cli  total {result['total_ms']:7.1f} ms  (interpreter {result['interpreter_ms']:.1f})")
+
+    if args.max_ms is not None and results[0]["total_ms"] > args.max_ms:
+        print(f"GUI startup {results[0]['total_ms']} ms exceeds {args.max_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
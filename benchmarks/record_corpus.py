@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Records the byte streams in benchmarks/corpus from real programs.
+
+Each program runs on a pseudo terminal (120x40, TERM=xterm-256color) and
+everything it writes is saved gzip-compressed, exactly as an SSH session
+would receive it. Inputs are generated or taken from this repository,
+and top only watches processes started by this script, so the
+recordings do not show what else runs on the machine:
+
+    vim     editing src/terminal_screen.py with syntax highlighting
+    top     interactive top watching a handful of busy processes
+    dmesg   coloured dmesg output of a generated kernel log
+    gcc     coloured diagnostics of a generated C file
+    utf8    cat of a generated log full of multibyte characters
+
+    python benchmarks/record_corpus.py [NAME ...]
+"""
+
+import argparse
+import fcntl
+import gzip
+import os
+import pty
+import random
+import select
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import termios
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(ROOT, "benchmarks", "corpus")
+
+COLS = 120
+ROWS = 40
+
+def record(argv, keys=(), cwd=None, timeout=30):
+    """Run argv on a pty, typing keys as (delay, bytes) pairs; returns its output."""
+    # A scratch HOME keeps files like .viminfo out of the repository
+    home = tempfile.mkdtemp()
+    master, slave = pty.openpty()
+    fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", ROWS, COLS, 0, 0))
+    env = {"PATH": os.environ.get("PATH", "/usr/bin:/bin"), "TERM": "xterm-256color",
+           "LANG": "C.UTF-8", "LC_ALL": "C.UTF-8", "HOME": home,
+           "COLUMNS": str(COLS), "LINES": str(ROWS)}
+    process = subprocess.Popen(argv, stdin=slave, stdout=slave, stderr=slave, cwd=cwd or ROOT,
+                               env=env, start_new_session=True)
+    os.close(slave)
+
+    output = []
+    pending = list(keys)
+    next_key = time.monotonic() + (pending[0][0] if pending else 0)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        wait = max(0.0, next_key - time.monotonic()) if pending else 0.1
+        readable, _, _ = select.select([master], [], [], wait)
+        if readable:
+            try:
+                data = os.read(master, 65536)
+            except OSError:
+                break
+            if not data:
+                break
+            output.append(data)
+        if pending and time.monotonic() >= next_key:
+            os.write(master, pending.pop(0)[1])
+            if pending:
+                next_key = time.monotonic() + pending[0][0]
+        if not pending and process.poll() is not None and not readable:
+            break
+    if process.poll() is None:
+        process.kill()
+    process.wait()
+    os.close(master)
+    shutil.rmtree(home, ignore_errors=True)
+    return b"".join(output)
+
+def record_vim():
+    keys = [(0.5, b"")]
+    # Page through the file, search, edit a few lines and undo
+    keys += [(0.05, b"\x06")] * 25
+    keys += [(0.05, b"\x02")] * 10
+    keys += [(0.1, b"/def \r")] + [(0.05, b"n")] * 20
+    keys += [(0.1, b"o"), *[(0.02, bytes([c])) for c in b"    # recorded for the benchmark corpus"],
+             (0.05, b"\x1b")]
+    keys += [(0.05, b"j")] * 60 + [(0.05, b"dd")] * 10 + [(0.05, b"u")] * 11
+    keys += [(0.05, b"G"), (0.05, b"gg"), (0.2, b":q!\r")]
+    return record(["vim", "-u", "NONE", "-N", "-c", "syntax on", "-c", "set number",
+                   "src/terminal_screen.py"], keys)
+
+def record_top():
+    # Watch only processes started here, not whatever the machine runs
+    busy = "import time\nwhile True:\n    sum(range(20000)); time.sleep(0.01)"
+    workers = [subprocess.Popen([sys.executable, "-c", busy]) for _ in range(12)]
+    try:
+        pids = ",".join(str(worker.pid) for worker in workers)
+        keys = [(3.0, b"z"), (2.0, b"P"), (2.0, b"M"), (2.0, b"q")]
+        return record(["top", "-d", "0.2", "-p", pids], keys)
+    finally:
+        for worker in workers:
+            worker.kill()
+            worker.wait()
+
+def record_dmesg(tmp):
+    rng = random.Random(5)
+    subsystems = ["usb 1-1", "ACPI", "e1000e 0000:00:1f.6 eth0", "EXT4-fs (nvme0n1p2)",
+                  "nvme nvme0", "i915 0000:00:02.0", "audit", "systemd[1]", "pci 0000:00:1c.0"]
+    messages = ["new high-speed USB device number 3 using xhci_hcd", "Link is Up - 1000Mbps/Full",
+                "mounted filesystem with ordered data mode", "device descriptor read/64, error -71",
+                "BAR 13: assigned [io  0x3000-0x3fff]", "Warning: _OSC evaluation failed",
+                "type=1400 audit: apparmor=\"STATUS\" operation=\"profile_load\"",
+                "Started Journal Service.", "GuC firmware i915/kbl_guc_70.1.1.bin version 70.1"]
+    lines = []
+    stamp = 0.0
+    for _ in range(6000):
+        stamp += rng.random() * 0.05
+        level = rng.choice([3, 4, 6, 6, 6, 6, 7])
+        lines.append(f"<{level}>[{stamp:12.6f}] {rng.choice(subsystems)}: {rng.choice(messages)}")
+    path = os.path.join(tmp, "kern.log")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return record(["dmesg", "--color=always", "-F", path])
+
+def record_gcc(tmp):
+    rng = random.Random(6)
+    functions = []
+    for i in range(400):
+        kind = rng.randrange(4)
+        if kind == 0:
+            body = f"int unused_{i} = {i}; return a;"
+        elif kind == 1:
+            body = f"unsigned u = a; if (u < -{i}) return 1; return 0;"
+        elif kind == 2:
+            body = f"char buf[4]; sprintf(buf, \"%d\", a * {i}); return buf[0];"
+        else:
+            body = f"int *p = (int *){i}L; return *p + a;"
+        functions.append(f"int function_{i}(int a, int b)\n{{\n    {body}\n}}\n")
+    with open(os.path.join(tmp, "module.c"), "w") as f:
+        f.write("#include <stdio.h>\n\n" + "\n".join(functions))
+    return record(["gcc", "-Wall", "-Wextra", "-fdiagnostics-color=always", "-c", "module.c",
+                   "-o", os.devnull], cwd=tmp, timeout=120)
+
+def record_utf8(tmp):
+    rng = random.Random(7)
+    words = ["Grüße", "naïve", "façade", "日本語のログ", "中文字符", "한국어", "Ελληνικά", "кириллица",
+             "עברית", "العربية", "✓", "→", "⚠", "🙂", "🚀", "∑", "½", "€"]
+    lines = []
+    for i in range(8000):
+        level = rng.choice(["INFO", "WARN", "DEBUG"])
+        lines.append(f"2024-03-0{1 + i % 9} 10:{i % 60:02d}:{rng.randrange(60):02d} {level} "
+                     + " ".join(rng.choice(words) for _ in range(rng.randrange(4, 14))))
+    path = os.path.join(tmp, "app.log")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return record(["cat", path])
+
+RECORDERS = {
+    "vim": lambda tmp: record_vim(),
+    "top": lambda tmp: record_top(),
+    "dmesg": record_dmesg,
+    "gcc": record_gcc,
+    "utf8": record_utf8,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("names", nargs="*", choices=[[]] + list(RECORDERS), help="recordings to make")
+    args = parser.parse_args()
+
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.names or RECORDERS:
+            data = RECORDERS[name](tmp)
+            # mtime=0 keeps the files identical when nothing changed
+            with open(os.path.join(CORPUS_DIR, f"{name}.bin.gz"), "wb") as raw:
+                with gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as f:
+                    f.write(data)
+            print(f"{name:6s} {len(data):9d} bytes")
+
+if __name__ == "__main__":
+    main()
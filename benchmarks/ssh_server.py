@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A loopback SSH server stand-in for benchmarks.
+
+Accepts user bench with password bench and gives every shell a tiny
+line-oriented interpreter that echoes input like a PTY and answers with
+scripted output profiles:
+
+    bulk BYTES     plain 80 column text, as from cat of a log file
+    lines COUNT    many short lines, as from find or a chatty build
+    tui FRAMES     full screen redraws with colours, as from top
+    idle SECONDS   nothing at all for a while
+
+Every profile ends with DONE_MARKER so the client knows when it is
+complete. Used in-process by bench_e2e.py, or on its own:
+
+    python benchmarks/ssh_server.py [--port PORT]
+"""
+
+import argparse
+import logging
+import random
+import socket
+import threading
+import time
+
+import paramiko
+
+DONE_MARKER = "__bench_done__"
+USERNAME = "bench"
+PASSWORD = "bench"
+PROMPT = b"$ "
+
+def bulk_block():
+    line = ("0123456789abcdefghijklmnopqrstuvwxyz" * 3)[:78]
+    return ((line + "\r\n") * 820).encode()
+
+def lines_block():
+    return "".join(f"./src/module_{i:05d}.py\r\n" for i in range(2000)).encode()
+
+def tui_frame(rng):
+    parts = ["\x1b[H"]
+    for row in range(1, 25):
+        parts.append(f"\x1b[{row};1H\x1b[7m{rng.randrange(99999):5d}\x1b[0m "
+                     f"\x1b[32m{rng.random() * 100:5.1f}\x1b[0m \x1b[1;34mproc_{row}\x1b[0m\x1b[K")
+    return "".join(parts).encode()
+
+class ShellSession:
+    """The interpreter behind one shell channel."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.rng = random.Random(1)
+
+    def run(self):
+        channel = self.channel
+        channel.sendall(PROMPT)
+        line = b""
+        while True:
+            data = channel.recv(65536)
+            if not data:
+                break
+            # Echo like a PTY in cooked mode
+            channel.sendall(data.replace(b"\r", b"\r\n"))
+            line += data
+            while b"\r" in line:
+                command, line = line.split(b"\r", 1)
+                if not self.execute(command.decode(errors='replace').strip()):
+                    channel.close()
+                    return
+                channel.sendall(PROMPT)
+        channel.close()
+
+    def execute(self, command):
+        words = command.split()
+        if not words:
+            return True
+        name, argument = words[0], float(words[1]) if len(words) > 1 else 0
+        if name == "bulk":
+            self.send_repeated(bulk_block(), int(argument))
+        elif name == "lines":
+            block = lines_block()
+            full, rest = divmod(int(argument), 2000)
+            self.send_repeated(block, full * len(block))
+            self.channel.sendall(block[:block.index(b"\n") + 1] * rest)
+        elif name == "tui":
+            for _ in range(int(argument)):
+                self.channel.sendall(tui_frame(self.rng))
+            self.channel.sendall(b"\x1b[25;1H")
+        elif name == "idle":
+            time.sleep(argument)
+        elif name == "exit":
+            return False
+        self.channel.sendall(f"{DONE_MARKER}\r\n".encode())
+        return True
+
+    def send_repeated(self, block, size):
+        sent = 0
+        while sent < size:
+            part = block[:size - sent]
+            self.channel.sendall(part)
+            sent += len(part)
+
+class BenchServerInterface(paramiko.ServerInterface):
+    def check_auth_password(self, username, password):
+        if username == USERNAME and password == PASSWORD:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_window_change_request(self, channel, width, height, pixelwidth, pixelheight):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        threading.Thread(target=ShellSession(channel).run, daemon=True).start()
+        return True
+
+class BenchServer:
+    """SSH server on 127.0.0.1 running in background threads."""
+
+    def __init__(self, port=0):
+        # Clients closing their sessions would otherwise log resets
+        logging.getLogger("paramiko").setLevel(logging.CRITICAL)
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", port))
+        self.sock.listen(64)
+        self.port = self.sock.getsockname()[1]
+        self.transports = []
+        self.running = False
+
+    def connection(self, name="bench"):
+        """Connection dict for the client side."""
+        return {"name": name, "host": "127.0.0.1", "port": self.port,
+                "username": USERNAME, "password": PASSWORD}
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self.serve, name="bench-ssh-server", daemon=True).start()
+        return self
+
+    def serve(self):
+        while self.running:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                break
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            transport = paramiko.Transport(client)
+            transport.add_server_key(self.host_key)
+            transport.start_server(server=BenchServerInterface())
+            self.transports.append(transport)
+
+    def stop(self):
+        self.running = False
+        self.sock.close()
+        for transport in self.transports:
+            transport.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=2222)
+    args = parser.parse_args()
+    server = BenchServer(args.port).start()
+    print(f"Listening on 127.0.0.1:{server.port}, user {USERNAME}, password {PASSWORD}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
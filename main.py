@@ -1,37 +1,79 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import time
+
+STARTED = time.perf_counter()
+
 import sys
 import os
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QTimer
 
-from src.splash_screen import SplashScreen
-from src.main_window import MainWindow
+from src import cli
 
 def main():
+    from src.startup import StartupTimer
+    timer = StartupTimer(STARTED)
+
+    # --measure-startup prints the stage timings as JSON once the window is up and exits
+    measure = "--measure-startup" in sys.argv
+    argv = [arg for arg in sys.argv if arg != "--measure-startup"]
+
+    # Qt is only imported for the GUI, the headless commands never load it
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import QTimer
+
+    from src.splash_screen import SplashScreen
+
     # Create application
-    app = QApplication(sys.argv)
-    
+    app = QApplication(argv)
+
     # Show splash screen
     splash = SplashScreen()
     splash.show()
-    
-    # Create main window but don't show yet
-    main_window = MainWindow()
-    
-    # Timer to simulate loading and then show main window
-    def finish_splash():
+    timer.mark("qt")
+
+    # The progress bar follows the real initialization stages
+    splash.set_stage("Loading settings...", 10)
+    from src.settings import SettingsManager
+    settings_manager = SettingsManager()
+    timer.mark("settings")
+
+    splash.set_stage("Loading SSH libraries...", 25)
+    import paramiko
+    timer.mark("ssh_libraries")
+
+    splash.set_stage("Loading terminal...", 45)
+    from src.main_window import MainWindow
+    timer.mark("modules")
+
+    main_window = MainWindow(settings_manager, splash.set_stage)
+    timer.mark("main_window")
+    splash.set_stage("Ready", 100)
+
+    def show_main_window():
         splash.close()
         main_window.show()
-    
-    # Connect splash screen finished signal
-    splash.animation_finished.connect(finish_splash)
-    
+        if measure:
+            # Runs after the first frame of the window has been handled
+            QTimer.singleShot(0, report_startup)
+
+    def report_startup():
+        timer.mark("first_frame")
+        timer.write()
+        app.quit()
+
+    # Show the window as soon as it is usable, or let the animation finish first
+    if settings_manager.get("fast_start") or measure or splash.animation_done:
+        show_main_window()
+    else:
+        splash.animation_finished.connect(show_main_window)
+
     # Execute application
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
     # Ensure src directory is in path
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    if cli.wants_cli(sys.argv[1:]):
+        sys.exit(cli.main(sys.argv[1:]))
     main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QSplitter, QListWidget,
+                            QListWidgetItem, QTreeWidget, QTreeWidgetItem, QPushButton,
+                            QLabel, QTextEdit, QSpinBox, QFormLayout)
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QFont
+
+from .remote_exec import Broadcast, output_key
+
+class BroadcastDialog(QDialog):
+    """Runs a custom command on several saved connections at once.
+
+    Results arrive as each host finishes and hosts with identical output
+    are shown as one group.
+    """
+    result_ready = pyqtSignal(dict)
+    broadcast_finished = pyqtSignal()
+
+    def __init__(self, command, connections, settings, transport_pool, parent=None):
+        super().__init__(parent)
+        self.command = command
+        self.connections = connections
+        self.transport_pool = transport_pool
+        self.broadcast = None
+        self.total = 0
+        self.done = 0
+        self.groups = {}
+
+        self.setWindowTitle(f"Run '{command['name']}' on Multiple Hosts")
+        self.resize(900, 600)
+
+        self.result_ready.connect(self.add_result)
+        self.broadcast_finished.connect(self.on_finished)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(f"Command: {command['command']}"))
+
+        splitter = QSplitter(Qt.Horizontal)
+        layout.addWidget(splitter)
+
+        # Host selection
+        self.hosts_list = QListWidget()
+        for connection in connections:
+            item = QListWidgetItem(connection["name"])
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            item.setData(Qt.UserRole, connection)
+            self.hosts_list.addItem(item)
+        splitter.addWidget(self.hosts_list)
+
+        # Grouped results and the output of the selected group
+        results_panel = QSplitter(Qt.Vertical)
+        self.results_tree = QTreeWidget()
+        self.results_tree.setHeaderLabels(["Hosts", "Exit", "Time"])
+        self.results_tree.currentItemChanged.connect(self.show_output)
+        self.output_view = QTextEdit()
+        self.output_view.setReadOnly(True)
+        self.output_view.setFont(QFont("Monospace", 10))
+        results_panel.addWidget(self.results_tree)
+        results_panel.addWidget(self.output_view)
+        splitter.addWidget(results_panel)
+        splitter.setSizes([250, 650])
+
+        # Options and buttons
+        options_layout = QFormLayout()
+        self.workers_input = QSpinBox()
+        self.workers_input.setRange(1, 256)
+        self.workers_input.setValue(settings.get("broadcast_workers"))
+        self.timeout_input = QSpinBox()
+        self.timeout_input.setRange(1, 3600)
+        self.timeout_input.setSuffix(" s")
+        self.timeout_input.setValue(settings.get("broadcast_timeout"))
+        options_layout.addRow("Parallel hosts:", self.workers_input)
+        options_layout.addRow("Timeout per host:", self.timeout_input)
+        layout.addLayout(options_layout)
+
+        buttons_layout = QHBoxLayout()
+        self.select_all_btn = QPushButton("Select All")
+        self.select_all_btn.clicked.connect(lambda: self.set_all_checked(Qt.Checked))
+        self.select_none_btn = QPushButton("Select None")
+        self.select_none_btn.clicked.connect(lambda: self.set_all_checked(Qt.Unchecked))
+        self.status_label = QLabel("")
+        self.run_btn = QPushButton("Run")
+        self.run_btn.clicked.connect(self.start)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel)
+        buttons_layout.addWidget(self.select_all_btn)
+        buttons_layout.addWidget(self.select_none_btn)
+        buttons_layout.addWidget(self.status_label, 1)
+        buttons_layout.addWidget(self.run_btn)
+        buttons_layout.addWidget(self.cancel_btn)
+        layout.addLayout(buttons_layout)
+
+    def set_all_checked(self, state):
+        for i in range(self.hosts_list.count()):
+            self.hosts_list.item(i).setCheckState(state)
+
+    def selected_connections(self):
+        selected = []
+        for i in range(self.hosts_list.count()):
+            item = self.hosts_list.item(i)
+            if item.checkState() == Qt.Checked:
+                selected.append(item.data(Qt.UserRole))
+        return selected
+
+    def start(self):
+        connections = self.selected_connections()
+        if not connections:
+            self.status_label.setText("No hosts selected.")
+            return
+
+        self.results_tree.clear()
+        self.output_view.clear()
+        self.groups = {}
+        self.total = len(connections)
+        self.done = 0
+        self.update_status()
+        self.run_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+
+        self.broadcast = Broadcast(connections, self.command["command"],
+                                   self.workers_input.value(), self.timeout_input.value(),
+                                   self.transport_pool)
+        # Results are emitted from the worker thread and queued to the UI thread
+        threading.Thread(target=self._run, args=(self.broadcast,), daemon=True).start()
+
+    def _run(self, broadcast):
+        broadcast.run(self.result_ready.emit)
+        self.broadcast_finished.emit()
+
+    def cancel(self):
+        if self.broadcast is not None:
+            self.broadcast.cancel()
+            self.status_label.setText("Cancelling...")
+
+    def add_result(self, result):
+        self.done += 1
+        self.update_status()
+
+        key = output_key(result)
+        group = self.groups.get(key)
+        if group is None:
+            group = QTreeWidgetItem(self.results_tree)
+            group.setData(0, Qt.UserRole, result)
+            group.setText(1, "error" if result["error"] else str(result["exit_status"]))
+            self.groups[key] = group
+
+        host = QTreeWidgetItem(group)
+        host.setText(0, result["name"])
+        host.setText(1, group.text(1))
+        host.setText(2, f"{result['duration']:.2f} s")
+        host.setData(0, Qt.UserRole, result)
+        count = group.childCount()
+        group.setText(0, f"{count} host{'s' if count != 1 else ''}")
+
+        # Keep the largest groups on top
+        ordered = sorted(self.groups.values(), key=QTreeWidgetItem.childCount, reverse=True)
+        for position, item in enumerate(ordered):
+            current = self.results_tree.indexOfTopLevelItem(item)
+            if current != position:
+                self.results_tree.insertTopLevelItem(position, self.results_tree.takeTopLevelItem(current))
+
+    def show_output(self, item, previous=None):
+        if item is None:
+            return
+        result = item.data(0, Qt.UserRole)
+        parts = []
+        if result["error"]:
+            parts.append(f"Error: {result['error']}")
+        if result["stdout"]:
+            parts.append(result["stdout"])
+        if result["stderr"]:
+            parts.append(f"--- stderr ---\n{result['stderr']}")
+        if result["truncated"]:
+            parts.append("(output truncated)")
+        self.output_view.setPlainText("\n".join(parts))
+
+    def update_status(self):
+        self.status_label.setText(f"{self.done}/{self.total} hosts finished")
+
+    def on_finished(self):
+        self.run_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+        if self.done < self.total:
+            self.status_label.setText(f"{self.done}/{self.total} hosts finished, rest cancelled")
+        self.broadcast = None
+
+    def reject(self):
+        self.cancel()
+        super().reject()
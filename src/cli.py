@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Headless command line interface.
+
+Runs saved custom commands on saved connections without a display and
+prints one JSON object per line. Nothing here imports PyQt5, and the
+SSH stack is only imported when a command actually runs, so listing
+connections or commands starts almost instantly.
+"""
+
+import argparse
+import fnmatch
+import json
+import sys
+
+# Sub-commands; main.py hands the arguments over when the first one matches
+COMMANDS = ("list", "commands", "run")
+
+def wants_cli(argv):
+    """Return True if the arguments ask for the headless interface."""
+    return bool(argv) and argv[0] in COMMANDS
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="sshworks",
+        description="Run saved commands on saved SSH connections and print JSON lines.")
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    list_parser = sub.add_parser("list", help="list saved connections")
+    list_parser.add_argument("-m", "--match", action="append", default=[],
+                             help="only connections whose name matches this glob")
+
+    sub.add_parser("commands", help="list saved custom commands")
+
+    run_parser = sub.add_parser("run", help="run a command on one or more connections")
+    what = run_parser.add_mutually_exclusive_group(required=True)
+    what.add_argument("-n", "--command", help="name of a saved custom command")
+    what.add_argument("-c", "--exec", dest="exec_command", help="command line to run")
+    targets = run_parser.add_argument_group("targets")
+    targets.add_argument("-H", "--host", action="append", default=[],
+                         help="saved connection name (repeatable)")
+    targets.add_argument("-m", "--match", action="append", default=[],
+                         help="saved connections whose name matches this glob (repeatable)")
+    targets.add_argument("-a", "--all", action="store_true", help="every saved connection")
+    run_parser.add_argument("-w", "--workers", type=int, help="hosts to run at the same time")
+    run_parser.add_argument("-t", "--timeout", type=float, help="seconds allowed per host")
+    run_parser.add_argument("-g", "--group", action="store_true",
+                            help="finish with one line per group of identical output")
+    return parser
+
+def emit(record, stream=sys.stdout):
+    stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    stream.flush()
+
+def select_connections(connections, names=(), patterns=(), everything=False):
+    """Pick saved connections by exact name, by glob, or all of them.
+
+    Returns the selected connections and the requested names that do not exist.
+    """
+    if everything:
+        return list(connections), []
+    by_name = {conn["name"]: conn for conn in connections}
+    selected = {}
+    missing = []
+    for name in names:
+        if name in by_name:
+            selected[name] = by_name[name]
+        else:
+            missing.append(name)
+    for pattern in patterns:
+        for conn in connections:
+            if fnmatch.fnmatchcase(conn["name"], pattern):
+                selected[conn["name"]] = conn
+    return list(selected.values()), missing
+
+def public_fields(connection):
+    """A connection without its secrets."""
+    return {key: value for key, value in connection.items() if key != "password"}
+
+def open_managers():
+    """Connection and command managers on the configured backend."""
+    from .connection_manager import ConnectionManager
+    from .custom_commands import CustomCommandsManager
+    from .inventory_store import open_inventory_store
+    from .settings import SettingsManager
+
+    settings = SettingsManager()
+    store = open_inventory_store(settings)
+    return settings, ConnectionManager(store), CustomCommandsManager(store)
+
+def list_connections(args):
+    _, connections_manager, _ = open_managers()
+    connections = connections_manager.get_all_connections()
+    if args.match:
+        connections, _ = select_connections(connections, patterns=args.match)
+    for conn in connections:
+        emit(public_fields(conn))
+    return 0
+
+def list_commands(args):
+    _, _, commands_manager = open_managers()
+    for cmd in commands_manager.get_all_commands():
+        emit(cmd)
+    return 0
+
+def run(args):
+    settings, connections_manager, commands_manager = open_managers()
+    if args.command:
+        cmd = commands_manager.get_command(args.command)
+        if cmd is None:
+            emit({"error": f"Unknown custom command '{args.command}'"}, sys.stderr)
+            return 2
+        command = cmd["command"]
+    else:
+        command = args.exec_command
+
+    connections, missing = select_connections(connections_manager.get_all_connections(),
+                                              args.host, args.match, args.all)
+    for name in missing:
+        emit({"error": f"Unknown connection '{name}'"}, sys.stderr)
+    if missing or not connections:
+        if not connections:
+            emit({"error": "No connections selected"}, sys.stderr)
+        return 2
+
+    workers = args.workers or settings.get("broadcast_workers")
+    timeout = args.timeout or settings.get("broadcast_timeout")
+
+    # Imported here so listing never pays for the SSH stack
+    from .remote_exec import Broadcast, group_results
+    from .transport_pool import TransportPool
+
+    # Jump hosts may name saved connections
+    pool = TransportPool(idle_timeout=0, resolve=connections_manager.get_connection)
+    broadcast = Broadcast(connections, command, workers, timeout, pool)
+    results = []
+    try:
+        for result in broadcast.results():
+            results.append(result)
+            emit(result)
+    except KeyboardInterrupt:
+        broadcast.cancel()
+        return 130
+    finally:
+        pool.close_all()
+
+    if args.group:
+        for group in group_results(results):
+            emit({"group": group})
+    failed = any(result["error"] or result["exit_status"] != 0 for result in results)
+    return 1 if failed else 0
+
+def main(argv=None):
+    args = build_parser().parse_args(sys.argv[1:] if argv is None else argv)
+    handlers = {"list": list_connections, "commands": list_commands, "run": run}
+    return handlers[args.action](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
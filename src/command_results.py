@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import itertools
+
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QSplitter, QTreeWidget,
+                            QTreeWidgetItem, QPushButton, QTabWidget, QPlainTextEdit)
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QFont, QTextCursor
+
+from .remote_exec import ExecChannel, MAX_OUTPUT
+
+class CommandRun:
+    """A command started from the results panel and the output it produced."""
+
+    def __init__(self, run_id, job, item):
+        self.id = run_id
+        self.job = job
+        self.item = item
+        self.output = {"stdout": [], "stderr": []}
+        self.sizes = {"stdout": 0, "stderr": 0}
+        self.result = None
+
+class CommandResultsPanel(QWidget):
+    """Runs commands on exec channels and lists their results.
+
+    Each command gets its own channel on the connection's pooled transport,
+    so several run at the same time without touching the interactive shell.
+    stdout and stderr stream into separate views while a command runs; the
+    exit status and duration are shown once it finishes.
+    """
+    output_received = pyqtSignal(int, str, str)
+    run_finished = pyqtSignal(int, dict)
+
+    def __init__(self, connection, transport_pool, timeout=None, parent=None):
+        super().__init__(parent)
+        self.connection = connection
+        self.transport_pool = transport_pool
+        self.timeout = timeout
+        self.runs = {}
+        self.run_ids = itertools.count(1)
+
+        # Emitted from the reactor thread, delivered on the GUI thread
+        self.output_received.connect(self.on_output)
+        self.run_finished.connect(self.on_finished)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        splitter = QSplitter(Qt.Horizontal)
+        self.runs_tree = QTreeWidget()
+        self.runs_tree.setHeaderLabels(["Command", "Status", "Exit", "Time"])
+        self.runs_tree.setRootIsDecorated(False)
+        self.runs_tree.currentItemChanged.connect(self.show_run)
+        splitter.addWidget(self.runs_tree)
+
+        self.output_tabs = QTabWidget()
+        self.stdout_view = self.make_output_view()
+        self.stderr_view = self.make_output_view()
+        self.output_tabs.addTab(self.stdout_view, "stdout")
+        self.output_tabs.addTab(self.stderr_view, "stderr")
+        splitter.addWidget(self.output_tabs)
+        splitter.setSizes([300, 600])
+        layout.addWidget(splitter)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch()
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_selected)
+        self.clear_button = QPushButton("Clear Finished")
+        self.clear_button.clicked.connect(self.clear_finished)
+        self.hide_button = QPushButton("Hide")
+        self.hide_button.clicked.connect(self.hide)
+        buttons_layout.addWidget(self.cancel_button)
+        buttons_layout.addWidget(self.clear_button)
+        buttons_layout.addWidget(self.hide_button)
+        layout.addLayout(buttons_layout)
+
+    def make_output_view(self):
+        view = QPlainTextEdit()
+        view.setReadOnly(True)
+        view.setFont(QFont("Monospace", 10))
+        return view
+
+    def run(self, command, title=None):
+        """Start command on a new exec channel and select it in the list."""
+        run_id = next(self.run_ids)
+        item = QTreeWidgetItem(self.runs_tree)
+        item.setText(0, title or command)
+        item.setToolTip(0, command)
+        item.setText(1, "Running")
+        item.setData(0, Qt.UserRole, run_id)
+        job = ExecChannel(
+            self.connection, command, self.transport_pool, timeout=self.timeout,
+            on_output=lambda stream, text: self.output_received.emit(run_id, stream, text),
+            on_finished=lambda result: self.run_finished.emit(run_id, result))
+        self.runs[run_id] = CommandRun(run_id, job, item)
+        self.runs_tree.setCurrentItem(item)
+        self.show()
+        job.start()
+        return run_id
+
+    def running(self):
+        return [run for run in self.runs.values() if run.result is None]
+
+    def current_run(self):
+        item = self.runs_tree.currentItem()
+        return self.runs.get(item.data(0, Qt.UserRole)) if item else None
+
+    def on_output(self, run_id, stream, text):
+        run = self.runs.get(run_id)
+        if run is None or run.sizes[stream] >= MAX_OUTPUT:
+            return
+        run.output[stream].append(text)
+        run.sizes[stream] += len(text)
+        if run is self.current_run():
+            self.append_text(self.stdout_view if stream == "stdout" else self.stderr_view, text)
+
+    def append_text(self, view, text):
+        cursor = view.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        view.ensureCursorVisible()
+
+    def on_finished(self, run_id, result):
+        run = self.runs.get(run_id)
+        if run is None:
+            return
+        run.result = result
+        item = run.item
+        if result["error"]:
+            item.setText(1, result["error"])
+        else:
+            item.setText(1, "Done" if result["exit_status"] == 0 else "Failed")
+        if result["exit_status"] is not None:
+            item.setText(2, str(result["exit_status"]))
+        item.setText(3, f"{result['duration']:.2f} s")
+
+    def show_run(self, item, previous=None):
+        self.stdout_view.clear()
+        self.stderr_view.clear()
+        run = self.runs.get(item.data(0, Qt.UserRole)) if item else None
+        if run is None:
+            return
+        self.stdout_view.setPlainText("".join(run.output["stdout"]))
+        self.stderr_view.setPlainText("".join(run.output["stderr"]))
+        if not run.output["stdout"] and run.output["stderr"]:
+            self.output_tabs.setCurrentWidget(self.stderr_view)
+
+    def cancel_selected(self):
+        run = self.current_run()
+        if run is not None and run.result is None:
+            run.job.cancel()
+
+    def cancel_all(self):
+        for run in self.running():
+            run.job.cancel()
+
+    def clear_finished(self):
+        for run_id, run in list(self.runs.items()):
+            if run.result is not None:
+                self.runs_tree.takeTopLevelItem(self.runs_tree.indexOfTopLevelItem(run.item))
+                del self.runs[run_id]
@@ -3,12 +3,28 @@
 
 import os
 import json
-import yaml
+from contextlib import contextmanager
 from pathlib import Path
 
+from .storage import load_yaml, dump_yaml, write_atomic
+from .inventory_store import connection_tags
+
 class ConnectionManager:
-    def __init__(self):
-        self.connections = []
+    """Saved connections, indexed by name.
+
+    Connections live in connections.yaml, or in an InventoryStore when one
+    is given. Every change is written right away unless it happens inside
+    batch(), in which case it is written once when the batch ends.
+    """
+    
+    def __init__(self, store=None):
+        # SQLite inventory; when None the YAML file is used
+        self.store = store
+        # Connections by name, in the order they were added (YAML only)
+        self.connections = {}
+        self.batch_depth = 0
+        self.batch_snapshot = None
+        self.dirty = False
         self.config_dir = os.path.join(os.path.expanduser("~"), ".sshworks")
         self.connections_file = os.path.join(self.config_dir, "connections.yaml")
         
@@ -21,56 +37,141 @@ class ConnectionManager:
     
     def load_connections(self):
         """Load saved connections from file."""
+        if self.store is not None:
+            # Queried on demand, nothing to load
+            return
         if os.path.exists(self.connections_file):
             try:
-                with open(self.connections_file, 'r') as f:
-                    self.connections = yaml.safe_load(f) or []
+                loaded = load_yaml(self.connections_file) or []
+                self.connections = {conn["name"]: conn for conn in loaded}
             except Exception as e:
                 print(f"Error loading connections: {e}")
-                self.connections = []
+                self.connections = {}
         else:
-            self.connections = []
+            self.connections = {}
     
     def save_connections(self):
         """Save connections to file."""
+        if self.store is not None:
+            return
         try:
-            with open(self.connections_file, 'w') as f:
-                yaml.dump(self.connections, f, default_flow_style=False)
+            dump_yaml(list(self.connections.values()), self.connections_file)
+            self.dirty = False
         except Exception as e:
             print(f"Error saving connections: {e}")
     
+    @contextmanager
+    def batch(self):
+        """Group several changes into one write.
+        
+        Batches may be nested; the file is written when the outermost one
+        ends. If the block raises, every change made in it is undone.
+        """
+        if self.store is not None:
+            with self.store.transaction():
+                yield self
+            return
+        if self.batch_depth == 0:
+            self.batch_snapshot = dict(self.connections)
+        self.batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            if self.batch_depth == 1:
+                self.connections = self.batch_snapshot
+                self.dirty = False
+            raise
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                self.batch_snapshot = None
+                if self.dirty:
+                    self.save_connections()
+    
+    def changed(self):
+        """Save now, or at the end of the running batch."""
+        if self.batch_depth:
+            self.dirty = True
+        else:
+            self.save_connections()
+    
     def get_all_connections(self):
         """Return all saved connections."""
-        return self.connections
+        if self.store is not None:
+            return self.store.all_connections()
+        return list(self.connections.values())
     
     def get_connection(self, name):
         """Get a connection by name."""
-        for conn in self.connections:
-            if conn["name"] == name:
-                return conn
-        return None
+        if self.store is not None:
+            return self.store.get_connection(name)
+        return self.connections.get(name)
     
-    def add_connection(self, connection):
-        """Add a new connection."""
-        # Check if connection with same name already exists
-        existing = self.get_connection(connection["name"])
-        if existing:
-            # Update existing connection
-            for i, conn in enumerate(self.connections):
-                if conn["name"] == connection["name"]:
-                    self.connections[i] = connection
-                    break
-        else:
-            # Add new connection
-            self.connections.append(connection)
+    def get_connections(self, names):
+        """Get the connections with the given names as {name: connection}."""
+        if self.store is not None:
+            return self.store.get_connections(names)
+        return {name: self.connections[name] for name in names if name in self.connections}
+    
+    def connection_summaries(self):
+        """(name, host, group, tags) of every connection, for building indexes."""
+        if self.store is not None:
+            return self.store.connection_summaries()
+        return [(conn["name"], conn.get("host", ""), conn.get("group") or "", connection_tags(conn))
+                for conn in self.connections.values()]
+    
+    def find_connections(self, prefix=None, host=None, tag=None, group=None, offset=0, limit=None):
+        """Connections matching every given filter, sorted by name.
         
-        # Save to file
-        self.save_connections()
+        prefix matches the start of the name; offset and limit select a page.
+        """
+        if self.store is not None:
+            return self.store.query_connections(prefix, host, tag, group, offset, limit)
+        matches = sorted(self._matching(prefix, host, tag, group), key=lambda conn: conn["name"])
+        return matches[offset:None if limit is None else offset + limit]
+    
+    def count_connections(self, prefix=None, host=None, tag=None, group=None):
+        """Number of connections matching every given filter."""
+        if self.store is not None:
+            return self.store.count_connections(prefix, host, tag, group)
+        return sum(1 for _ in self._matching(prefix, host, tag, group))
+    
+    def _matching(self, prefix, host, tag, group):
+        for conn in self.connections.values():
+            if prefix and not conn["name"].startswith(prefix):
+                continue
+            if host is not None and conn.get("host") != host:
+                continue
+            if group is not None and (conn.get("group") or "") != group:
+                continue
+            if tag is not None and tag not in connection_tags(conn):
+                continue
+            yield conn
+    
+    def add_connection(self, connection):
+        """Add a new connection, replacing one with the same name."""
+        if self.store is not None:
+            self.store.put_connection(connection)
+            return
+        self.connections[connection["name"]] = connection
+        self.changed()
+    
+    def add_connections(self, connections):
+        """Add or replace many connections with a single write."""
+        if self.store is not None:
+            self.store.put_connections(list(connections))
+            return
+        for conn in connections:
+            self.connections[conn["name"]] = conn
+        self.changed()
     
     def remove_connection(self, name):
         """Remove a connection by name."""
-        self.connections = [conn for conn in self.connections if conn["name"] != name]
-        self.save_connections()
+        if self.store is not None:
+            self.store.delete_connection(name)
+            return
+        if self.connections.pop(name, None) is not None:
+            self.changed()
     
     def import_from_file(self, file_path):
         """Import connections from file."""
@@ -79,14 +180,12 @@ class ConnectionManager:
                 with open(file_path, 'r') as f:
                     imported = json.load(f)
             elif file_path.endswith('.yaml') or file_path.endswith('.yml'):
-                with open(file_path, 'r') as f:
-                    imported = yaml.safe_load(f)
+                imported = load_yaml(file_path)
             else:
                 raise ValueError("Unsupported file format")
             
-            # Merge with existing connections
-            for conn in imported:
-                self.add_connection(conn)
+            # Merge with existing connections, written once at the end
+            self.add_connections(imported)
             
             return True
         except Exception as e:
@@ -97,11 +196,9 @@ class ConnectionManager:
         """Export connections to file."""
         try:
             if file_path.endswith('.json'):
-                with open(file_path, 'w') as f:
-                    json.dump(self.connections, f, indent=4)
+                write_atomic(file_path, json.dumps(self.get_all_connections(), indent=4))
             elif file_path.endswith('.yaml') or file_path.endswith('.yml'):
-                with open(file_path, 'w') as f:
-                    yaml.dump(self.connections, f, default_flow_style=False)
+                dump_yaml(self.get_all_connections(), file_path)
             else:
                 raise ValueError("Unsupported file format")
             
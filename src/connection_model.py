@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import bisect
+import itertools
+
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex
+
+# Rows handed to the view at a time; more are fetched while scrolling
+FETCH_BATCH = 256
+
+class SearchIndex:
+    """Search text of every connection, kept sorted by name.
+
+    The text is the lower-cased name, host and tags. Results come out in
+    name order, so the model never has to sort them. When the query only
+    grows (the user keeps typing), just the previous matches are searched.
+    """
+
+    def __init__(self):
+        self.texts = {}
+        self.names = []
+        self.last_query = None
+        self.last_matches = []
+
+    @staticmethod
+    def search_text(name, host, tags):
+        return " ".join([name, host] + list(tags)).lower()
+
+    def load(self, summaries):
+        """Replace the index with (name, host, tags) entries."""
+        self.texts = {name: self.search_text(name, host, tags) for name, host, tags in summaries}
+        self.names = sorted(self.texts)
+        self.last_query = None
+
+    def set(self, name, host, tags):
+        if name not in self.texts:
+            bisect.insort(self.names, name)
+        self.texts[name] = self.search_text(name, host, tags)
+        self.last_query = None
+
+    def discard(self, name):
+        if self.texts.pop(name, None) is not None:
+            del self.names[bisect.bisect_left(self.names, name)]
+            self.last_query = None
+
+    def search(self, text):
+        """Names, in order, of the connections whose text contains text."""
+        query = text.lower()
+        if self.last_query is not None and query.startswith(self.last_query):
+            candidates = self.last_matches
+        else:
+            candidates = self.names
+        texts = self.texts
+        matches = [name for name in candidates if query in texts[name]]
+        self.last_query = query
+        self.last_matches = matches
+        return matches
+
+class Folder:
+    """A group of connections; only the sorted names are kept in memory."""
+
+    def __init__(self, name, folder_id):
+        self.name = name
+        self.id = folder_id
+        self.names = []
+        self.loaded = 0
+
+class ConnectionTreeModel(QAbstractItemModel):
+    """Lazy tree of saved connections, grouped into folders by their "group".
+
+    Only names are held by the model; the full connection is looked up in
+    the ConnectionManager when a view asks for it. Rows are handed to the
+    view in batches as it scrolls, changes are applied as single row
+    inserts and removals, and the filter is answered from a SearchIndex.
+    Connections without a group are listed at the top level, after the
+    folders. The model starts empty until reload() is called.
+    """
+
+    def __init__(self, connection_manager, parent=None):
+        super().__init__(parent)
+        self.connection_manager = connection_manager
+        self.search_index = SearchIndex()
+        self.group_of = {}
+        self.filter_text = ""
+        self.folder_ids = itertools.count(1)
+        self.root = Folder("", 0)
+        self.folders = []
+        self.folder_names = []
+        self.folders_by_id = {}
+
+    # ===== Building =====
+    def reload(self):
+        """Rebuild the index and the tree from the connection manager."""
+        summaries = self.connection_manager.connection_summaries()
+        self.group_of = {name: group for name, host, group, tags in summaries}
+        self.search_index.load((name, host, tags) for name, host, group, tags in summaries)
+        self._rebuild()
+
+    def set_filter(self, text):
+        """Show only connections whose name, host or tags contain text."""
+        self.filter_text = text.strip()
+        self._rebuild()
+
+    def _visible_names(self):
+        if not self.filter_text:
+            return self.search_index.names
+        return self.search_index.search(self.filter_text)
+
+    def _rebuild(self):
+        self.beginResetModel()
+        # Names arrive sorted, so every group's list is sorted too
+        grouped = {}
+        group_of = self.group_of
+        for name in self._visible_names():
+            group = group_of[name]
+            names = grouped.get(group)
+            if names is None:
+                names = grouped[group] = []
+            names.append(name)
+        self.root = Folder("", 0)
+        self.root.names = grouped.pop("", [])
+        self.folders = []
+        self.folders_by_id = {}
+        for group in sorted(grouped):
+            folder = self._new_folder(group)
+            folder.names = grouped[group]
+            self.folders.append(folder)
+        self.folder_names = [folder.name for folder in self.folders]
+        self.endResetModel()
+
+    def _new_folder(self, name):
+        folder = Folder(name, next(self.folder_ids))
+        self.folders_by_id[folder.id] = folder
+        return folder
+
+    def matches_filter(self, name, host, tags):
+        if not self.filter_text:
+            return True
+        return self.filter_text.lower() in SearchIndex.search_text(name, host, tags)
+
+    # ===== Incremental updates =====
+    def upsert(self, connection):
+        """Add a connection or apply changes to an existing one."""
+        name = connection["name"]
+        group = connection.get("group") or ""
+        tags = connection.get("tags") or []
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        host = connection.get("host", "")
+
+        if name in self.group_of:
+            if self.group_of[name] == group and self._row_of(name) is not None:
+                self.search_index.set(name, host, tags)
+                if self.matches_filter(name, host, tags):
+                    index = self.index_for_name(name)
+                    if index.isValid():
+                        self.dataChanged.emit(index, index)
+                    return
+            self.remove(name)
+
+        self.group_of[name] = group
+        self.search_index.set(name, host, tags)
+        if self.matches_filter(name, host, tags):
+            self._insert(name, group)
+
+    def remove(self, name):
+        """Remove a connection from the tree."""
+        group = self.group_of.pop(name, None)
+        self.search_index.discard(name)
+        if group is None:
+            return
+        folder = self._folder(group)
+        if folder is None:
+            return
+        row = bisect.bisect_left(folder.names, name)
+        if row >= len(folder.names) or folder.names[row] != name:
+            return
+        parent = self._folder_index(folder)
+        if row < folder.loaded:
+            self.beginRemoveRows(parent, self._first_row(folder) + row, self._first_row(folder) + row)
+            del folder.names[row]
+            folder.loaded -= 1
+            self.endRemoveRows()
+        else:
+            del folder.names[row]
+        if folder is not self.root and not folder.names:
+            position = self.folders.index(folder)
+            self.beginRemoveRows(QModelIndex(), position, position)
+            del self.folders[position]
+            del self.folder_names[position]
+            del self.folders_by_id[folder.id]
+            self.endRemoveRows()
+
+    def _insert(self, name, group):
+        folder = self._folder(group)
+        if folder is None:
+            position = bisect.bisect_left(self.folder_names, group)
+            folder = self._new_folder(group)
+            self.beginInsertRows(QModelIndex(), position, position)
+            self.folders.insert(position, folder)
+            self.folder_names.insert(position, group)
+            self.endInsertRows()
+        row = bisect.bisect_left(folder.names, name)
+        if row <= folder.loaded and (row < folder.loaded or folder.loaded == len(folder.names)):
+            first = self._first_row(folder) + row
+            self.beginInsertRows(self._folder_index(folder), first, first)
+            folder.names.insert(row, name)
+            folder.loaded += 1
+            self.endInsertRows()
+        else:
+            # Beyond the rows the view has seen; fetched later
+            folder.names.insert(row, name)
+
+    # ===== Lookups =====
+    def _folder(self, group):
+        if group == "":
+            return self.root
+        position = bisect.bisect_left(self.folder_names, group)
+        if position < len(self.folders) and self.folder_names[position] == group:
+            return self.folders[position]
+        return None
+
+    def _first_row(self, folder):
+        # Ungrouped connections follow the folders at the top level
+        return len(self.folders) if folder is self.root else 0
+
+    def _folder_index(self, folder):
+        if folder is self.root:
+            return QModelIndex()
+        return self.createIndex(self.folders.index(folder), 0, 0)
+
+    def _row_of(self, name):
+        folder = self._folder(self.group_of.get(name, ""))
+        if folder is None:
+            return None
+        row = bisect.bisect_left(folder.names, name)
+        if row < len(folder.names) and folder.names[row] == name:
+            return row
+        return None
+
+    def index_for_name(self, name):
+        """Model index of a connection, or an invalid index if not shown yet."""
+        folder = self._folder(self.group_of.get(name, ""))
+        row = self._row_of(name)
+        if folder is None or row is None or row >= folder.loaded:
+            return QModelIndex()
+        return self.createIndex(self._first_row(folder) + row, 0, folder.id)
+
+    def node(self, index):
+        """The Folder or connection name at index."""
+        if not index.isValid():
+            return self.root
+        folder = self.folders_by_id.get(index.internalId()) if index.internalId() else self.root
+        if folder is self.root and index.row() < len(self.folders):
+            return self.folders[index.row()]
+        return folder.names[index.row() - self._first_row(folder)]
+
+    def connection(self, index):
+        """The saved connection at index, or None for folders."""
+        node = self.node(index)
+        if isinstance(node, Folder):
+            return None
+        return self.connection_manager.get_connection(node)
+
+    # ===== QAbstractItemModel =====
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0)
+        folder = self.node(parent)
+        return self.createIndex(row, column, folder.id)
+
+    def parent(self, index):
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        folder = self.folders_by_id.get(index.internalId())
+        if folder is None:
+            return QModelIndex()
+        return self._folder_index(folder)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = self.node(parent)
+        if not isinstance(node, Folder):
+            return 0
+        return self._first_row(node) + node.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        return isinstance(node, Folder) and (node is self.root or bool(node.names))
+
+    def canFetchMore(self, parent):
+        node = self.node(parent)
+        return isinstance(node, Folder) and node.loaded < len(node.names)
+
+    def fetchMore(self, parent):
+        folder = self.node(parent)
+        count = min(FETCH_BATCH, len(folder.names) - folder.loaded)
+        if count <= 0:
+            return
+        first = self._first_row(folder) + folder.loaded
+        self.beginInsertRows(parent, first, first + count - 1)
+        folder.loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = self.node(index)
+        if isinstance(node, Folder):
+            if role == Qt.DisplayRole:
+                return f"{node.name} ({len(node.names)})"
+            return None
+        if role == Qt.DisplayRole:
+            return node
+        if role in (Qt.ToolTipRole, Qt.UserRole):
+            connection = self.connection_manager.get_connection(node)
+            if connection is None:
+                return None
+            if role == Qt.UserRole:
+                return connection
+            return f"{connection.get('username', '')}@{connection.get('host', '')}:{connection.get('port', 22)}"
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and section == 0:
+            return "Name"
+        return None
@@ -2,10 +2,13 @@
 # -*- coding: utf-8 -*-
 
 import os
-import yaml
+
+from .storage import load_yaml, dump_yaml
 
 class CustomCommandsManager:
-    def __init__(self):
+    def __init__(self, store=None):
+        # SQLite inventory; when None commands.yaml is used
+        self.store = store
         self.commands = []
         self.config_dir = os.path.join(os.path.expanduser("~"), ".sshworks")
         self.commands_file = os.path.join(self.config_dir, "commands.yaml")
@@ -19,10 +22,11 @@ class CustomCommandsManager:
     
     def load_commands(self):
         """Load saved commands from file."""
+        if self.store is not None:
+            return
         if os.path.exists(self.commands_file):
             try:
-                with open(self.commands_file, 'r') as f:
-                    self.commands = yaml.safe_load(f) or []
+                self.commands = load_yaml(self.commands_file) or []
             except Exception as e:
                 print(f"Error loading commands: {e}")
                 self.commands = []
@@ -32,17 +36,20 @@ class CustomCommandsManager:
     def save_commands(self):
         """Save commands to file."""
         try:
-            with open(self.commands_file, 'w') as f:
-                yaml.dump(self.commands, f, default_flow_style=False)
+            dump_yaml(self.commands, self.commands_file)
         except Exception as e:
             print(f"Error saving commands: {e}")
     
     def get_all_commands(self):
         """Return all saved commands."""
+        if self.store is not None:
+            return self.store.all_commands()
         return self.commands
     
     def get_command(self, name):
         """Get a command by name."""
+        if self.store is not None:
+            return self.store.get_command(name)
         for cmd in self.commands:
             if cmd["name"] == name:
                 return cmd
@@ -50,6 +57,10 @@ class CustomCommandsManager:
     
     def add_command(self, command):
         """Add a new command."""
+        if self.store is not None:
+            self.store.put_command(command)
+            return
+        
         # Check if command with same name already exists
         existing = self.get_command(command["name"])
         if existing:
@@ -67,5 +78,8 @@ class CustomCommandsManager:
     
     def remove_command(self, name):
         """Remove a command by name."""
+        if self.store is not None:
+            self.store.delete_command(name)
+            return
         self.commands = [cmd for cmd in self.commands if cmd["name"] != name]
         self.save_commands()
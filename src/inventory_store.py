@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from .storage import load_yaml
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS connections (
+    name TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    group_name TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS connections_host ON connections (host);
+CREATE INDEX IF NOT EXISTS connections_group ON connections (group_name, name);
+CREATE TABLE IF NOT EXISTS connection_tags (
+    tag TEXT NOT NULL,
+    name TEXT NOT NULL REFERENCES connections (name) ON DELETE CASCADE,
+    PRIMARY KEY (tag, name)
+);
+CREATE INDEX IF NOT EXISTS connection_tags_name ON connection_tags (name);
+CREATE TABLE IF NOT EXISTS commands (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+# Seconds a writer waits for another instance to finish its transaction
+BUSY_TIMEOUT = 5.0
+
+# Rows written per executemany() call in bulk inserts
+PUT_BATCH = 1000
+
+def connection_tags(connection):
+    """Tags of a connection, accepting a list or a comma separated string."""
+    tags = connection.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return sorted({str(tag).strip() for tag in tags if str(tag).strip()})
+
+def prefix_end(prefix):
+    # Smallest string greater than every string starting with prefix
+    return prefix + "\U0010ffff"
+
+class InventoryStore:
+    """Connections and custom commands in an SQLite database.
+
+    Connections are indexed by name, host, group and tag, so lookups and
+    paged or prefix queries do not read the whole inventory. The database
+    runs in WAL mode so several instances of the application can use it at
+    the same time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.depth = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Transactions are managed explicitly with BEGIN/COMMIT
+        self.db = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                                  check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    @contextmanager
+    def transaction(self):
+        """Run the block in one transaction; nested calls join the outer one."""
+        with self.lock:
+            if self.depth == 0:
+                self.db.execute("BEGIN IMMEDIATE")
+            self.depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.db.execute("ROLLBACK")
+                raise
+            self.depth -= 1
+            if self.depth == 0:
+                self.db.execute("COMMIT")
+
+    def _rows(self, sql, params=()):
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    # ===== Connections =====
+    def get_connection(self, name):
+        rows = self._rows("SELECT data FROM connections WHERE name = ?", (name,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def get_connections(self, names):
+        """{name: connection} for the given names that exist."""
+        names = list(names)
+        found = {}
+        for start in range(0, len(names), PUT_BATCH):
+            chunk = names[start:start + PUT_BATCH]
+            sql = f"SELECT name, data FROM connections WHERE name IN ({','.join('?' * len(chunk))})"
+            for name, data in self._rows(sql, chunk):
+                found[name] = json.loads(data)
+        return found
+
+    def all_connections(self):
+        """Every connection in the order it was first added."""
+        return [json.loads(data) for data, in self._rows("SELECT data FROM connections ORDER BY rowid")]
+
+    def connection_summaries(self):
+        """(name, host, group, tags) of every connection without decoding the full entries."""
+        tags = {}
+        for tag, name in self._rows("SELECT tag, name FROM connection_tags"):
+            tags.setdefault(name, []).append(tag)
+        return [(name, host, group, tags.get(name, []))
+                for name, host, group in self._rows("SELECT name, host, group_name FROM connections")]
+
+    def put_connection(self, connection):
+        """Insert or replace a connection, keeping its position on replace."""
+        self.put_connections([connection])
+
+    def put_connections(self, connections):
+        """Insert or replace many connections in one transaction."""
+        with self.transaction():
+            for start in range(0, len(connections), PUT_BATCH):
+                batch = connections[start:start + PUT_BATCH]
+                names = [(conn["name"],) for conn in batch]
+                self.db.executemany(
+                    "INSERT INTO connections (name, host, group_name, data) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET host = excluded.host, "
+                    "group_name = excluded.group_name, data = excluded.data",
+                    [(conn["name"], conn.get("host", ""), conn.get("group") or "", json.dumps(conn))
+                     for conn in batch])
+                self.db.executemany("DELETE FROM connection_tags WHERE name = ?", names)
+                self.db.executemany("INSERT INTO connection_tags (tag, name) VALUES (?, ?)",
+                                    [(tag, conn["name"]) for conn in batch
+                                     for tag in connection_tags(conn)])
+
+    def delete_connection(self, name):
+        """Delete a connection; returns True if it existed."""
+        with self.transaction():
+            return self.db.execute("DELETE FROM connections WHERE name = ?", (name,)).rowcount > 0
+
+    def _where(self, prefix, host, tag, group):
+        clauses = []
+        params = []
+        if prefix:
+            clauses.append("c.name >= ? AND c.name < ?")
+            params += [prefix, prefix_end(prefix)]
+        if host is not None:
+            clauses.append("c.host = ?")
+            params.append(host)
+        if group is not None:
+            clauses.append("c.group_name = ?")
+            params.append(group)
+        if tag is not None:
+            clauses.append("c.name IN (SELECT name FROM connection_tags WHERE tag = ?)")
+            params.append(tag)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query_connections(self, prefix=None, host=None, tag=None, group=None, offset=0, limit=None):
+        """Connections matching every given filter, sorted by name.
+
+        prefix matches the start of the name; offset and limit select a page.
+        """
+        where, params = self._where(prefix, host, tag, group)
+        sql = f"SELECT c.data FROM connections c{where} ORDER BY c.name LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+        return [json.loads(data) for data, in self._rows(sql, params)]
+
+    def count_connections(self, prefix=None, host=None, tag=None, group=None):
+        where, params = self._where(prefix, host, tag, group)
+        return self._rows(f"SELECT COUNT(*) FROM connections c{where}", params)[0][0]
+
+    def connection_groups(self):
+        """Distinct group names with the number of connections in each."""
+        return self._rows("SELECT group_name, COUNT(*) FROM connections "
+                          "GROUP BY group_name ORDER BY group_name")
+
+    def connection_tag_counts(self):
+        return self._rows("SELECT tag, COUNT(*) FROM connection_tags GROUP BY tag ORDER BY tag")
+
+    # ===== Commands =====
+    def get_command(self, name):
+        rows = self._rows("SELECT data FROM commands WHERE name = ?", (name,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def all_commands(self):
+        return [json.loads(data) for data, in self._rows("SELECT data FROM commands ORDER BY rowid")]
+
+    def put_command(self, command):
+        with self.transaction():
+            self.db.execute("INSERT INTO commands (name, data) VALUES (?, ?) "
+                            "ON CONFLICT (name) DO UPDATE SET data = excluded.data",
+                            (command["name"], json.dumps(command)))
+
+    def delete_command(self, name):
+        with self.transaction():
+            return self.db.execute("DELETE FROM commands WHERE name = ?", (name,)).rowcount > 0
+
+    # ===== Migration =====
+    def get_meta(self, key):
+        rows = self._rows("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def migrate_from_yaml(self, connections_file, commands_file):
+        """Copy the YAML connections and commands into the database once.
+
+        The YAML files are left in place. Returns True if the migration ran.
+        """
+        with self.transaction():
+            if self.get_meta("migrated_from_yaml"):
+                return False
+            for path, put in ((connections_file, self.put_connection),
+                              (commands_file, self.put_command)):
+                if os.path.exists(path):
+                    for entry in load_yaml(path) or []:
+                        put(entry)
+            self.db.execute("INSERT INTO meta (key, value) VALUES ('migrated_from_yaml', '1')")
+        return True
+
+def default_path(config_dir):
+    return os.path.join(config_dir, "inventory.db")
+
+def open_inventory_store(settings):
+    """Open the SQLite store if the settings select it, otherwise return None.
+
+    On first use the existing YAML files are migrated into the database.
+    """
+    if settings.get("inventory_backend") != "sqlite":
+        return None
+    config_dir = os.path.join(os.path.expanduser("~"), ".sshworks")
+    store = InventoryStore(settings.get("inventory_path") or default_path(config_dir))
+    try:
+        store.migrate_from_yaml(os.path.join(config_dir, "connections.yaml"),
+                                os.path.join(config_dir, "commands.yaml"))
+    except Exception as e:
+        print(f"Error migrating connections to SQLite: {e}")
+    return store
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads available for calls that cannot avoid blocking (connect, auth, close)
+BLOCKING_WORKERS = 8
+
+class IOReactor:
+    """A single event loop thread that multiplexes the I/O of every session.
+
+    Channels are registered for readability with add_reader(); everything
+    else is scheduled from any thread with call_soon(). Blocking calls such
+    as connecting and authenticating run on a small fixed thread pool, so
+    the number of threads does not grow with the number of sessions.
+    """
+
+    def __init__(self, blocking_workers=BLOCKING_WORKERS):
+        # A selector loop on every platform, add_reader() needs it
+        self.loop = asyncio.SelectorEventLoop()
+        self.executor = ThreadPoolExecutor(max_workers=blocking_workers,
+                                           thread_name_prefix="sshworks-blocking")
+        self.loop.set_default_executor(self.executor)
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start the reactor thread if it is not running yet."""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="sshworks-reactor", daemon=True)
+                self.thread.start()
+
+    def stop(self):
+        """Stop the event loop and the blocking thread pool."""
+        with self.lock:
+            if self.thread is None:
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(5)
+            self.thread = None
+        self.executor.shutdown(wait=False)
+
+    def call_soon(self, callback, *args):
+        """Run callback(*args) on the reactor thread; safe from any thread."""
+        self.start()
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def call_later(self, delay, callback, *args):
+        """Schedule a call on the reactor; must be called from the reactor thread."""
+        return self.loop.call_later(delay, callback, *args)
+
+    def add_reader(self, fileobj, callback, *args):
+        """Call callback(*args) whenever fileobj is readable (reactor thread only)."""
+        self.loop.add_reader(fileobj, callback, *args)
+
+    def remove_reader(self, fileobj):
+        try:
+            self.loop.remove_reader(fileobj)
+        except (ValueError, OSError):
+            # Already closed
+            pass
+
+    def add_writer(self, fileobj, callback, *args):
+        """Call callback(*args) whenever fileobj is writable (reactor thread only)."""
+        self.loop.add_writer(fileobj, callback, *args)
+
+    def remove_writer(self, fileobj):
+        try:
+            self.loop.remove_writer(fileobj)
+        except (ValueError, OSError):
+            pass
+
+    def run_blocking(self, func, *args, callback=None):
+        """Run a blocking call on the thread pool (reactor thread only).
+
+        callback receives the finished future on the reactor thread.
+        """
+        future = self.loop.run_in_executor(None, func, *args)
+        if callback is not None:
+            future.add_done_callback(callback)
+        return future
+
+    def in_reactor_thread(self):
+        return threading.current_thread() is self.thread
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+_shared_reactor = None
+_shared_lock = threading.Lock()
+
+def get_reactor():
+    """Return the process-wide reactor, starting it on first use."""
+    global _shared_reactor
+    with _shared_lock:
+        if _shared_reactor is None:
+            _shared_reactor = IOReactor()
+            _shared_reactor.start()
+        return _shared_reactor
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+from collections import deque
+
+from PyQt5.QtCore import Qt
+
+# Echo latency samples kept per session
+LATENCY_SAMPLES = 256
+
+# Seconds after a keystroke in which the next output still counts as its echo
+ECHO_TIMEOUT = 2.0
+
+# Keys with a fixed sequence; cursor keys depend on DECCKM
+CURSOR_KEYS = {Qt.Key_Up: "A", Qt.Key_Down: "B", Qt.Key_Right: "C", Qt.Key_Left: "D",
+               Qt.Key_Home: "H", Qt.Key_End: "F"}
+
+TILDE_KEYS = {Qt.Key_Insert: 2, Qt.Key_Delete: 3, Qt.Key_PageUp: 5, Qt.Key_PageDown: 6,
+              Qt.Key_F5: 15, Qt.Key_F6: 17, Qt.Key_F7: 18, Qt.Key_F8: 19,
+              Qt.Key_F9: 20, Qt.Key_F10: 21, Qt.Key_F11: 23, Qt.Key_F12: 24}
+
+SS3_KEYS = {Qt.Key_F1: "P", Qt.Key_F2: "Q", Qt.Key_F3: "R", Qt.Key_F4: "S"}
+
+SIMPLE_KEYS = {Qt.Key_Return: b"\r", Qt.Key_Enter: b"\r", Qt.Key_Backspace: b"\x7f",
+               Qt.Key_Tab: b"\t", Qt.Key_Backtab: b"\x1b[Z", Qt.Key_Escape: b"\x1b"}
+
+def modifier_param(modifiers):
+    """xterm modifier parameter for a key sequence, 1 meaning none."""
+    value = 1
+    if modifiers & Qt.ShiftModifier:
+        value += 1
+    if modifiers & Qt.AltModifier:
+        value += 2
+    if modifiers & Qt.ControlModifier:
+        value += 4
+    return value
+
+def key_to_bytes(key, modifiers, text, app_cursor_keys=False):
+    """Translate a Qt key press into the bytes an xterm would send.
+
+    Returns b"" for keys that produce nothing, such as a lone modifier.
+    """
+    param = modifier_param(modifiers)
+    if key in CURSOR_KEYS:
+        final = CURSOR_KEYS[key]
+        if param > 1:
+            return f"\x1b[1;{param}{final}".encode()
+        return f"\x1bO{final}".encode() if app_cursor_keys else f"\x1b[{final}".encode()
+    if key in TILDE_KEYS:
+        code = TILDE_KEYS[key]
+        return f"\x1b[{code};{param}~".encode() if param > 1 else f"\x1b[{code}~".encode()
+    if key in SS3_KEYS:
+        final = SS3_KEYS[key]
+        return f"\x1b[1;{param}{final}".encode() if param > 1 else f"\x1bO{final}".encode()
+    if key in SIMPLE_KEYS:
+        data = SIMPLE_KEYS[key]
+        if key == Qt.Key_Backspace and modifiers & Qt.ControlModifier:
+            data = b"\x08"
+        return b"\x1b" + data if modifiers & Qt.AltModifier else data
+
+    if modifiers & Qt.ControlModifier and not modifiers & Qt.MetaModifier:
+        # Ctrl+@ .. Ctrl+_ map to the C0 controls, Ctrl+Space to NUL
+        if Qt.Key_A <= key <= Qt.Key_Z:
+            data = bytes([key - Qt.Key_A + 1])
+        elif key in (Qt.Key_Space, Qt.Key_At, Qt.Key_2):
+            data = b"\x00"
+        elif Qt.Key_BracketLeft <= key <= Qt.Key_Underscore:
+            data = bytes([key - Qt.Key_BracketLeft + 0x1b])
+        elif key == Qt.Key_Slash:
+            data = b"\x1f"
+        else:
+            data = text.encode('utf-8')
+        return b"\x1b" + data if data and modifiers & Qt.AltModifier else data
+
+    data = text.encode('utf-8')
+    if data and modifiers & Qt.AltModifier:
+        # Meta sends ESC prefix
+        return b"\x1b" + data
+    return data
+
+class EchoLatency:
+    """Time from a keystroke to the first output that follows it.
+
+    With a remote shell echoing input this is one network round trip plus
+    the time spent on both ends. Only the first keystroke without an echo
+    yet is timed, so typing ahead does not inflate the samples.
+    """
+
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self.samples = deque(maxlen=samples)
+        self.sent_at = None
+
+    def key_sent(self, when=None):
+        if self.sent_at is None:
+            self.sent_at = time.monotonic() if when is None else when
+
+    def waiting(self):
+        return self.sent_at is not None
+
+    def output_received(self, when=None):
+        """Record the echo of the pending keystroke, returns the latency or None."""
+        if self.sent_at is None:
+            return None
+        latency = (time.monotonic() if when is None else when) - self.sent_at
+        self.sent_at = None
+        if latency > ECHO_TIMEOUT:
+            # Nothing was echoed, the output is unrelated
+            return None
+        self.samples.append(latency)
+        return latency
+
+    def summary(self):
+        """Return count, last, mean, p50, p99 and max latency in seconds."""
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": 0, "last": None, "mean": None, "p50": None, "p99": None, "max": None}
+        return {
+            "count": len(samples),
+            "last": self.samples[-1],
+            "mean": sum(samples) / len(samples),
+            "p50": samples[len(samples) // 2],
+            "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+            "max": samples[-1],
+        }
@@ -1,35 +1,86 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
+
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QSplitter,
                             QTreeWidget, QTreeWidgetItem, QPushButton, QLabel, QLineEdit,
                             QGroupBox, QFormLayout, QSpinBox, QTextEdit, QTabWidget,
                             QMenu, QMessageBox, QDialog, QDialogButtonBox, QInputDialog,
-                            QAction)
-from PyQt5.QtCore import Qt, QSize, pyqtSignal, pyqtSlot
+                            QAction, QTreeView, QFileDialog, QDockWidget)
+from PyQt5.QtCore import Qt, QSize, QTimer, pyqtSignal, pyqtSlot
 from PyQt5.QtGui import QIcon, QFont
 
 from .ssh_terminal import SSHTerminal
 from .connection_manager import ConnectionManager
 from .custom_commands import CustomCommandsManager
+from .settings import SettingsManager
+from .inventory_store import open_inventory_store
+from .ssh_config_import import OpenSSHImporter
+from .scrollback import ScrollbackBudget
+from .transport_pool import TransportPool, parse_jump, MAX_JUMPS
+from .warm_pool import WarmPool
+from .transfer_panel import TransferPanel
+from .port_forwarding import parse_forward, format_forward
+from .broadcast_dialog import BroadcastDialog
+from .connection_model import ConnectionTreeModel
+from .session_metrics import format_status, to_json, to_prometheus
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, settings_manager=None, progress=None):
         super().__init__()
         
+        # progress(text, percent) reports initialization stages to the splash screen
+        self.progress = progress or (lambda text, percent: None)
+        
         # Window properties
         self.setWindowTitle("SSHWorks Client")
         self.setMinimumSize(1024, 768)
         
         # Initialize managers
-        self.connection_manager = ConnectionManager()
-        self.custom_commands_manager = CustomCommandsManager()
+        self.progress("Loading connections...", 60)
+        self.settings_manager = settings_manager or SettingsManager()
+        self.inventory_store = open_inventory_store(self.settings_manager)
+        self.connection_manager = ConnectionManager(self.inventory_store)
+        self.custom_commands_manager = CustomCommandsManager(self.inventory_store)
+        self.scrollback_budget = ScrollbackBudget(
+            self.settings_manager.get("scrollback_budget_bytes"))
+        settings = self.settings_manager
+        self.transport_pool = TransportPool(
+            settings.get("transport_idle_timeout"),
+            keepalive=settings.get("transport_keepalive"),
+            warm_size=settings.get("warm_pool_size") if settings.get("warm_pool") else 0,
+            warm_ttl=settings.get("warm_pool_ttl"),
+            resolve=self.connection_manager.get_connection)
+        self.warm_pool = WarmPool(self.transport_pool, self.connection_manager, settings)
+        # Created when the first transfer starts
+        self.transfer_panel = None
+        self.transfer_dock = None
+        # Terminals are only referenced by their tab once connected
+        self.connecting_terminals = []
+        # Refreshes the session metrics in the status bar while they are shown
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(1000)
+        self.metrics_timer.timeout.connect(self.update_metrics)
+        self.metrics_label = QLabel()
+        self.statusBar().addPermanentWidget(self.metrics_label)
+        
+        # Re-import OpenSSH files that changed since the last start
+        self.progress("Checking OpenSSH config...", 70)
+        self.sync_openssh_sources()
         
         # Setup UI
+        self.progress("Building interface...", 75)
         self.setup_ui()
         
-        # Load saved connections
+        # Load saved connections and commands
+        self.progress("Loading saved connections...", 90)
         self.load_saved_connections()
+        self.load_custom_commands()
+        
+        # Pre-connect pinned and recent connections once the window is up
+        QTimer.singleShot(0, self.warm_pool.warm_up)
+        self.set_metrics_shown(self.settings_manager.get("session_metrics"))
     
     def setup_ui(self):
         # Central widget and main layout
@@ -49,12 +100,21 @@ class MainWindow(QMainWindow):
         self.connections_group = QGroupBox("Saved Connections")
         self.connections_layout = QVBoxLayout()
         
-        # Connections tree
-        self.connections_tree = QTreeWidget()
-        self.connections_tree.setHeaderLabels(["Name"])
+        # Filter box, searched as you type
+        self.connections_filter = QLineEdit()
+        self.connections_filter.setPlaceholderText("Filter by name, host or tag...")
+        self.connections_filter.setClearButtonEnabled(True)
+        
+        # Connections tree, backed by a lazy model over the connection store
+        self.connections_model = ConnectionTreeModel(self.connection_manager, self)
+        self.connections_filter.textChanged.connect(self.connections_model.set_filter)
+        self.connections_tree = QTreeView()
+        self.connections_tree.setModel(self.connections_model)
+        self.connections_tree.setHeaderHidden(True)
+        self.connections_tree.setUniformRowHeights(True)
         self.connections_tree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.connections_tree.customContextMenuRequested.connect(self.show_connection_context_menu)
-        self.connections_tree.itemDoubleClicked.connect(self.connect_to_saved)
+        self.connections_tree.doubleClicked.connect(self.connect_to_saved)
         
         # Connections buttons
         self.connections_buttons_layout = QHBoxLayout()
@@ -69,6 +129,7 @@ class MainWindow(QMainWindow):
         self.connections_buttons_layout.addWidget(self.edit_connection_btn)
         self.connections_buttons_layout.addWidget(self.remove_connection_btn)
         
+        self.connections_layout.addWidget(self.connections_filter)
         self.connections_layout.addWidget(self.connections_tree)
         self.connections_layout.addLayout(self.connections_buttons_layout)
         self.connections_group.setLayout(self.connections_layout)
@@ -178,6 +239,12 @@ class MainWindow(QMainWindow):
         preferences_action.triggered.connect(self.show_preferences)
         edit_menu.addAction(preferences_action)
         
+        raw_input_action = QAction("Raw Keyboard Input", self)
+        raw_input_action.setCheckable(True)
+        raw_input_action.setChecked(self.settings_manager.get("input_mode") == "raw")
+        raw_input_action.toggled.connect(self.set_raw_input)
+        edit_menu.addAction(raw_input_action)
+        
         # Connection menu
         conn_menu = self.menuBar().addMenu("&Connection")
         
@@ -191,6 +258,40 @@ class MainWindow(QMainWindow):
         
         conn_menu.addSeparator()
         
+        upload_action = QAction("Upload File...", self)
+        upload_action.triggered.connect(self.upload_file)
+        conn_menu.addAction(upload_action)
+        
+        download_action = QAction("Download File...", self)
+        download_action.triggered.connect(self.download_file)
+        conn_menu.addAction(download_action)
+        
+        transfers_action = QAction("Show Transfers", self)
+        transfers_action.triggered.connect(self.show_transfers)
+        conn_menu.addAction(transfers_action)
+        
+        send_file_action = QAction("Send File as Input...", self)
+        send_file_action.triggered.connect(self.send_file_input)
+        conn_menu.addAction(send_file_action)
+        
+        paste_action = QAction("Paste Clipboard to Shell", self)
+        paste_action.triggered.connect(self.paste_clipboard)
+        conn_menu.addAction(paste_action)
+        
+        conn_menu.addSeparator()
+        
+        metrics_action = QAction("Show Session Metrics", self)
+        metrics_action.setCheckable(True)
+        metrics_action.setChecked(self.settings_manager.get("session_metrics"))
+        metrics_action.toggled.connect(self.toggle_metrics)
+        conn_menu.addAction(metrics_action)
+        
+        export_metrics_action = QAction("Export Session Metrics...", self)
+        export_metrics_action.triggered.connect(self.export_metrics)
+        conn_menu.addAction(export_metrics_action)
+        
+        conn_menu.addSeparator()
+        
         manage_action = QAction("Manage Connections", self)
         manage_action.triggered.connect(self.manage_connections)
         conn_menu.addAction(manage_action)
@@ -204,13 +305,13 @@ class MainWindow(QMainWindow):
     
     # ===== Connection Management =====
     def load_saved_connections(self):
-        connections = self.connection_manager.get_all_connections()
-        self.connections_tree.clear()
-        
-        for conn in connections:
-            item = QTreeWidgetItem(self.connections_tree)
-            item.setText(0, conn["name"])
-            item.setData(0, Qt.UserRole, conn)
+        self.connections_model.reload()
+    
+    def selected_connection(self):
+        index = self.connections_tree.currentIndex()
+        if not index.isValid():
+            return None
+        return self.connections_model.connection(index)
     
     def add_connection_dialog(self):
         # This would be a more detailed dialog in a real implementation
@@ -234,6 +335,10 @@ class MainWindow(QMainWindow):
                                             QLineEdit.Password)
         if not ok:
             return
+            
+        group, ok = QInputDialog.getText(self, "New Connection", "Group (optional):")
+        if not ok:
+            return
         
         connection = {
             "name": name,
@@ -242,28 +347,27 @@ class MainWindow(QMainWindow):
             "username": username,
             "password": password  # In real app, this should be encrypted
         }
+        if group:
+            connection["group"] = group
         
         self.connection_manager.add_connection(connection)
-        self.load_saved_connections()
+        self.connections_model.upsert(connection)
     
     def edit_connection(self):
-        selected = self.connections_tree.currentItem()
-        if not selected:
+        connection = self.selected_connection()
+        if not connection:
             QMessageBox.warning(self, "Warning", "No connection selected.")
             return
             
         # In a real implementation, this would populate a dialog with existing values
-        connection = selected.data(0, Qt.UserRole)
         # For simplicity, just update the connection with the same dialog
         self.add_connection_dialog()
     
     def remove_connection(self):
-        selected = self.connections_tree.currentItem()
-        if not selected:
+        connection = self.selected_connection()
+        if not connection:
             QMessageBox.warning(self, "Warning", "No connection selected.")
             return
-            
-        connection = selected.data(0, Qt.UserRole)
         
         confirm = QMessageBox.question(
             self, "Confirm Delete", 
@@ -273,29 +377,116 @@ class MainWindow(QMainWindow):
         
         if confirm == QMessageBox.Yes:
             self.connection_manager.remove_connection(connection["name"])
-            self.load_saved_connections()
+            self.connections_model.remove(connection["name"])
+            if self.warm_pool.is_pinned(connection["name"]):
+                self.warm_pool.set_pinned(connection["name"], False)
     
     def show_connection_context_menu(self, position):
         menu = QMenu()
         connect_action = menu.addAction("Connect")
         edit_action = menu.addAction("Edit")
         remove_action = menu.addAction("Remove")
+        forwarding_action = menu.addAction("Port Forwarding...")
+        jump_action = menu.addAction("Jump Hosts...")
+        menu.addSeparator()
+        connection = self.selected_connection()
+        pin_action = menu.addAction("Keep Pre-connected")
+        pin_action.setCheckable(True)
+        pin_action.setEnabled(connection is not None)
+        pin_action.setChecked(connection is not None and self.warm_pool.is_pinned(connection["name"]))
         
         selected_action = menu.exec(self.connections_tree.mapToGlobal(position))
         
         if selected_action == connect_action:
             self.connect_to_saved()
+        elif selected_action == forwarding_action:
+            self.edit_port_forwarding()
+        elif selected_action == jump_action:
+            self.edit_jump_hosts()
+        elif selected_action == pin_action:
+            self.warm_pool.set_pinned(connection["name"], pin_action.isChecked())
         elif selected_action == edit_action:
             self.edit_connection()
         elif selected_action == remove_action:
             self.remove_connection()
     
+    def edit_port_forwarding(self):
+        connection = self.selected_connection()
+        if not connection:
+            QMessageBox.warning(self, "Warning", "No connection selected.")
+            return
+        
+        lines = []
+        for spec in connection.get("forwards") or []:
+            try:
+                lines.append(format_forward(parse_forward(spec)))
+            except (ValueError, KeyError):
+                continue
+        text, ok = QInputDialog.getMultiLineText(
+            self, "Port Forwarding",
+            "One rule per line, started with the session:\n"
+            "L [bind:]port:host:hostport   local (-L)\n"
+            "R [bind:]port:host:hostport   remote (-R)\n"
+            "D [bind:]port                  SOCKS proxy (-D)",
+            "\n".join(lines))
+        if not ok:
+            return
+        
+        try:
+            forwards = [parse_forward(line) for line in text.splitlines() if line.strip()]
+        except ValueError as e:
+            QMessageBox.critical(self, "Port Forwarding", str(e))
+            return
+        connection = dict(connection)
+        if forwards:
+            connection["forwards"] = forwards
+        else:
+            connection.pop("forwards", None)
+        self.connection_manager.add_connection(connection)
+        self.connections_model.upsert(connection)
+    
+    def edit_jump_hosts(self):
+        connection = self.selected_connection()
+        if not connection:
+            QMessageBox.warning(self, "Warning", "No connection selected.")
+            return
+        
+        text, ok = QInputDialog.getMultiLineText(
+            self, "Jump Hosts",
+            "One host per line, first hop first, like ssh -J:\n"
+            "a saved connection's name, or [user@]host[:port]",
+            "\n".join(connection.get("jump_hosts") or []))
+        if not ok:
+            return
+        
+        jump_hosts = [line.strip() for line in text.splitlines() if line.strip()]
+        if len(jump_hosts) > MAX_JUMPS:
+            QMessageBox.critical(self, "Jump Hosts", f"At most {MAX_JUMPS} jump hosts are supported.")
+            return
+        for spec in jump_hosts:
+            if spec == connection["name"]:
+                QMessageBox.critical(self, "Jump Hosts", "A connection cannot be its own jump host.")
+                return
+            if self.connection_manager.get_connection(spec) is None:
+                try:
+                    parse_jump(spec, connection["username"])
+                except ValueError:
+                    QMessageBox.critical(self, "Jump Hosts", f"Malformed jump host: {spec}")
+                    return
+        connection = dict(connection)
+        if jump_hosts:
+            connection["jump_hosts"] = jump_hosts
+        else:
+            connection.pop("jump_hosts", None)
+        self.connection_manager.add_connection(connection)
+        self.connections_model.upsert(connection)
+    
     def connect_to_saved(self):
-        selected = self.connections_tree.currentItem()
-        if not selected:
+        connection = self.selected_connection()
+        if not connection:
             return
             
-        connection = selected.data(0, Qt.UserRole)
+        self.warm_pool.record_use(connection)
         self.create_terminal_tab(connection)
     
     def quick_connect(self):
@@ -319,13 +510,16 @@ class MainWindow(QMainWindow):
     
     def create_terminal_tab(self, connection):
         # Create a new SSH terminal
-        terminal = SSHTerminal(connection)
+        terminal = SSHTerminal(connection, self.settings_manager, self.scrollback_budget,
+                               self.transport_pool)
+        terminal.set_metrics_enabled(self.metrics_timer.isActive())
         
         # Connect signals
         terminal.connection_established.connect(
             lambda: self.connection_success(terminal, connection))
         terminal.connection_failed.connect(
-            lambda error: self.connection_failed(error, connection))
+            lambda error: self.connection_failed(error, connection, terminal))
+        self.connecting_terminals.append(terminal)
         
         # Add a loading tab
         index = self.terminal_tabs.addTab(QWidget(), f"Connecting to {connection['name']}...")
@@ -335,6 +529,8 @@ class MainWindow(QMainWindow):
         terminal.connect_to_host()
     
     def connection_success(self, terminal, connection):
+        if terminal in self.connecting_terminals:
+            self.connecting_terminals.remove(terminal)
         # Find the loading tab and replace it
         for i in range(self.terminal_tabs.count()):
             if self.terminal_tabs.tabText(i).startswith(f"Connecting to {connection['name']}"):
@@ -348,7 +544,12 @@ class MainWindow(QMainWindow):
         # Enable custom commands for this terminal
         terminal.set_custom_commands(self.custom_commands_manager.get_all_commands())
     
-    def connection_failed(self, error, connection):
+    def connection_failed(self, error, connection, terminal=None):
+        if terminal in self.connecting_terminals:
+            self.connecting_terminals.remove(terminal)
+        if terminal is not None:
+            # Give the scrollback's share back to the budget
+            terminal.shutdown()
         # Find the loading tab and remove it
         for i in range(self.terminal_tabs.count()):
             if self.terminal_tabs.tabText(i).startswith(f"Connecting to {connection['name']}"):
@@ -361,9 +562,137 @@ class MainWindow(QMainWindow):
     def close_terminal_tab(self, index):
         terminal = self.terminal_tabs.widget(index)
         if isinstance(terminal, SSHTerminal):
-            terminal.disconnect_from_host()
+            terminal.shutdown()
         self.terminal_tabs.removeTab(index)
     
+    # ===== File Transfers =====
+    def transfer_connection(self):
+        """Connection of the current tab, or else the selected saved connection."""
+        current_tab = self.terminal_tabs.currentWidget()
+        if isinstance(current_tab, SSHTerminal):
+            return current_tab.connection
+        return self.selected_connection()
+    
+    def show_transfers(self):
+        if self.transfer_dock is None:
+            self.transfer_panel = TransferPanel(self.settings_manager, self.transport_pool)
+            self.transfer_dock = QDockWidget("Transfers", self)
+            self.transfer_dock.setWidget(self.transfer_panel)
+            self.addDockWidget(Qt.BottomDockWidgetArea, self.transfer_dock)
+        self.transfer_dock.show()
+        return self.transfer_panel
+    
+    def upload_file(self):
+        connection = self.transfer_connection()
+        if not connection:
+            QMessageBox.warning(self, "Warning", "Open or select a connection first.")
+            return
+        local_path, _ = QFileDialog.getOpenFileName(self, "Upload File")
+        if not local_path:
+            return
+        remote_path, ok = QInputDialog.getText(self, "Upload File", "Remote path:",
+                                               text=os.path.basename(local_path))
+        if not ok or not remote_path:
+            return
+        self.show_transfers().start(connection, "upload", local_path, remote_path)
+    
+    def download_file(self):
+        connection = self.transfer_connection()
+        if not connection:
+            QMessageBox.warning(self, "Warning", "Open or select a connection first.")
+            return
+        remote_path, ok = QInputDialog.getText(self, "Download File", "Remote path:")
+        if not ok or not remote_path:
+            return
+        local_path, _ = QFileDialog.getSaveFileName(self, "Save As", os.path.basename(remote_path))
+        if not local_path:
+            return
+        self.show_transfers().start(connection, "download", local_path, remote_path)
+    
+    def current_terminal(self):
+        terminal = self.terminal_tabs.currentWidget()
+        if isinstance(terminal, SSHTerminal) and terminal.ssh_worker and terminal.ssh_worker.running:
+            return terminal
+        QMessageBox.warning(self, "Warning", "No active connection.")
+        return None
+    
+    def send_file_input(self):
+        terminal = self.current_terminal()
+        if terminal is None:
+            return
+        local_path, _ = QFileDialog.getOpenFileName(self, "Send File as Input")
+        if not local_path:
+            return
+        try:
+            with open(local_path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Could not read {local_path}: {e}")
+            return
+        terminal.paste_data(data, "Sending")
+    
+    def paste_clipboard(self):
+        terminal = self.current_terminal()
+        if terminal is not None:
+            terminal.terminal_view.paste_clipboard()
+    
+    def terminals(self):
+        return [self.terminal_tabs.widget(i) for i in range(self.terminal_tabs.count())
+                if isinstance(self.terminal_tabs.widget(i), SSHTerminal)]
+    
+    def toggle_metrics(self, shown):
+        self.settings_manager.set("session_metrics", shown)
+        self.set_metrics_shown(shown)
+    
+    def set_metrics_shown(self, shown):
+        """Show live metrics of the current tab; collection stops while hidden."""
+        for terminal in self.terminals():
+            terminal.set_metrics_enabled(shown)
+        self.metrics_label.setVisible(shown)
+        if shown:
+            self.metrics_timer.start()
+            self.update_metrics()
+        else:
+            self.metrics_timer.stop()
+    
+    def update_metrics(self):
+        terminal = self.terminal_tabs.currentWidget()
+        if isinstance(terminal, SSHTerminal):
+            self.metrics_label.setText(format_status(terminal.metrics_snapshot()))
+        else:
+            self.metrics_label.setText("")
+    
+    def export_metrics(self):
+        file_path, selected = QFileDialog.getSaveFileName(
+            self, "Export Session Metrics", "sshworks-metrics.json",
+            "JSON (*.json);;Prometheus text (*.prom)")
+        if not file_path:
+            return
+        snapshots = [terminal.metrics_snapshot() for terminal in self.terminals()]
+        prometheus = file_path.endswith(".prom") or selected.startswith("Prometheus")
+        try:
+            with open(file_path, 'w') as f:
+                f.write(to_prometheus(snapshots) if prometheus else to_json(snapshots))
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Could not write {file_path}: {e}")
+            return
+        self.statusBar().showMessage(f"Exported metrics of {len(snapshots)} sessions to {file_path}", 5000)
+    
+    def closeEvent(self, event):
+        # Close every session, then the transports they shared
+        for i in range(self.terminal_tabs.count()):
+            terminal = self.terminal_tabs.widget(i)
+            if isinstance(terminal, SSHTerminal):
+                terminal.shutdown()
+        # Sessions still connecting have no tab yet
+        for terminal in self.connecting_terminals:
+            terminal.shutdown()
+        self.connecting_terminals = []
+        if self.transfer_panel is not None:
+            self.transfer_panel.cancel_all()
+        self.transport_pool.close_all()
+        super().closeEvent(event)
+    
     def disconnect_current(self):
         current_index = self.terminal_tabs.currentIndex()
         if current_index >= 0:
@@ -389,10 +718,17 @@ class MainWindow(QMainWindow):
         if not ok or not command:
             return
         
+        modes = ["In the terminal", "On a separate channel (results panel)"]
+        mode, ok = QInputDialog.getItem(self, "New Command", "Run:", modes, 0, False)
+        if not ok:
+            return
+        
         cmd = {
             "name": name,
             "command": command
         }
+        if mode == modes[1]:
+            cmd["mode"] = "exec"
         
         self.custom_commands_manager.add_command(cmd)
         self.load_custom_commands()
@@ -429,6 +765,7 @@ class MainWindow(QMainWindow):
     def show_command_context_menu(self, position):
         menu = QMenu()
         execute_action = menu.addAction("Execute")
+        broadcast_action = menu.addAction("Run on Multiple Hosts...")
         edit_action = menu.addAction("Edit")
         remove_action = menu.addAction("Remove")
         
@@ -436,6 +773,8 @@ class MainWindow(QMainWindow):
         
         if selected_action == execute_action:
             self.execute_custom_command()
+        elif selected_action == broadcast_action:
+            self.broadcast_custom_command()
         elif selected_action == edit_action:
             self.edit_command()
         elif selected_action == remove_action:
@@ -453,17 +792,76 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Warning", "No active terminal to execute command.")
             return
             
-        current_tab.execute_command(cmd["command"])
+        current_tab.run_custom_command(cmd)
+    
+    def broadcast_custom_command(self):
+        selected = self.commands_tree.currentItem()
+        if not selected:
+            return
+            
+        cmd = selected.data(0, Qt.UserRole)
+        connections = self.connection_manager.get_all_connections()
+        if not connections:
+            QMessageBox.warning(self, "Warning", "No saved connections to run the command on.")
+            return
+        
+        # Non-modal so results can be watched while working in the terminals
+        dialog = BroadcastDialog(cmd, connections, self.settings_manager, self.transport_pool, self)
+        dialog.show()
     
     # ===== Other Functions =====
     def import_connections(self):
-        # In a real app, this would show a file dialog and import from a file
-        QMessageBox.information(self, "Info", "Import connections feature not implemented yet.")
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Import Connections", os.path.join(os.path.expanduser("~"), ".ssh"),
+            "All files (*);;OpenSSH config or known_hosts (config known_hosts*);;"
+            "JSON or YAML (*.json *.yaml *.yml)")
+        if not file_path:
+            return
+        
+        if file_path.endswith(('.json', '.yaml', '.yml')):
+            if not self.connection_manager.import_from_file(file_path):
+                QMessageBox.critical(self, "Import Failed", f"Could not import {file_path}.")
+                return
+        else:
+            try:
+                count = self.openssh_importer().import_file(file_path, force=True)
+            except Exception as e:
+                QMessageBox.critical(self, "Import Failed", f"Could not import {file_path}: {e}")
+                return
+            
+            # Keep the file in sync on later starts
+            sources = list(self.settings_manager.get("openssh_sources"))
+            if file_path not in sources:
+                sources.append(file_path)
+                self.settings_manager.set("openssh_sources", sources)
+            self.statusBar().showMessage(f"Imported {count} connections from {file_path}", 5000)
+        
+        self.load_saved_connections()
+    
+    def openssh_importer(self):
+        return OpenSSHImporter(self.connection_manager)
+    
+    def sync_openssh_sources(self):
+        sources = self.settings_manager.get("openssh_sources")
+        if not sources:
+            return
+        try:
+            self.openssh_importer().sync(sources)
+        except Exception as e:
+            print(f"Error syncing OpenSSH sources: {e}")
     
     def export_connections(self):
         # In a real app, this would show a file dialog and export to a file
         QMessageBox.information(self, "Info", "Export connections feature not implemented yet.")
     
+    def set_raw_input(self, enabled):
+        mode = "raw" if enabled else "line"
+        self.settings_manager.set("input_mode", mode)
+        for i in range(self.terminal_tabs.count()):
+            terminal = self.terminal_tabs.widget(i)
+            if isinstance(terminal, SSHTerminal):
+                terminal.set_input_mode(mode)
+    
     def show_preferences(self):
         QMessageBox.information(self, "Info", "Preferences dialog not implemented yet.")
     
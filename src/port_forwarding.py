@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import errno
+import ipaddress
+import re
+import socket
+import struct
+import threading
+import weakref
+
+from .io_reactor import get_reactor
+
+# One receive buffer shared by every relay; they all run on the reactor thread
+RELAY_BUFFER_SIZE = 256 * 1024
+_relay_buffer = memoryview(bytearray(RELAY_BUFFER_SIZE))
+
+# Largest number of bytes pulled from a channel in a single recv call
+READ_SIZE = 65536
+
+# Seconds before retrying a send while an SSH channel's window is full;
+# doubled up to FLOW_RETRY_MAX while the window stays closed. paramiko
+# has no writability event for channels, so this is a timer.
+FLOW_RETRY = 0.002
+FLOW_RETRY_MAX = 0.1
+
+# Seconds allowed for opening a forwarded connection
+OPEN_TIMEOUT = 10
+
+# Seconds a SOCKS client gets to send its greeting and request
+HANDSHAKE_TIMEOUT = 10
+
+FORWARD_TYPES = {"L": "local", "R": "remote", "D": "dynamic"}
+
+def _split_spec(text):
+    # Split on ":" except inside [IPv6] brackets
+    return [bracketed or plain for bracketed, plain in re.findall(r'\[([^\]]*)\]|([^:]+)', text)]
+
+def parse_forward(spec):
+    """A forwarding rule from a dict or an OpenSSH style spec.
+
+    Specs look like the ssh options: "L 8080:db:5432" or
+    "-L 127.0.0.1:8080:db:5432" (local), "R 9000:localhost:9000" (remote)
+    and "D 1080" (dynamic SOCKS5). Returns a dict with type, bind_address
+    and bind_port, plus host and port except for dynamic rules. Raises
+    ValueError for malformed specs.
+    """
+    if isinstance(spec, dict):
+        rule = dict(spec)
+        if rule.get("type") not in FORWARD_TYPES.values():
+            raise ValueError(f"Unknown forwarding type: {rule.get('type')}")
+        rule["bind_port"] = int(rule["bind_port"])
+        if rule["type"] != "dynamic":
+            rule["port"] = int(rule["port"])
+        return rule
+    text = spec.strip()
+    flag, _, rest = text.lstrip("-").partition(" ")
+    kind = FORWARD_TYPES.get(flag.upper())
+    if kind is None:
+        raise ValueError(f"Forwarding spec must start with L, R or D: {spec}")
+    parts = _split_spec(rest.strip())
+    default_bind = "localhost" if kind == "remote" else "127.0.0.1"
+    try:
+        if kind == "dynamic":
+            if len(parts) not in (1, 2):
+                raise ValueError
+            bind_address = parts[0] if len(parts) == 2 else default_bind
+            return {"type": kind, "bind_address": bind_address, "bind_port": int(parts[-1])}
+        if len(parts) not in (3, 4):
+            raise ValueError
+        bind_address = parts[0] if len(parts) == 4 else default_bind
+        return {"type": kind, "bind_address": bind_address, "bind_port": int(parts[-3]),
+                "host": parts[-2], "port": int(parts[-1])}
+    except ValueError:
+        raise ValueError(f"Malformed forwarding spec: {spec}")
+
+def format_forward(rule):
+    """The OpenSSH style spec of a rule, the inverse of parse_forward()."""
+    def host(address):
+        return f"[{address}]" if ":" in address else address
+    flag = {kind: letter for letter, kind in FORWARD_TYPES.items()}[rule["type"]]
+    text = f"{flag} {host(rule['bind_address'])}:{rule['bind_port']}"
+    if rule["type"] != "dynamic":
+        text += f":{host(rule['host'])}:{rule['port']}"
+    return text
+
+class Relay:
+    """Copies data both ways between a socket and an SSH channel.
+
+    Runs on the reactor thread. Data read from the socket goes straight
+    from the shared receive buffer into the channel. When one side cannot
+    take more data, reading from the other side stops until it drains, so
+    nothing is buffered beyond one read and the SSH window provides the
+    flow control.
+    """
+
+    def __init__(self, reactor, sock, channel, on_close=None):
+        self.reactor = reactor
+        self.sock = sock
+        self.channel = channel
+        self.on_close = on_close
+        self.to_channel = b""
+        self.to_socket = b""
+        self.flow_delay = FLOW_RETRY
+        self.socket_eof = False
+        self.channel_eof = False
+        self.closed = False
+
+    def start(self):
+        self.sock.setblocking(False)
+        self.channel.setblocking(False)
+        self.reactor.add_reader(self.sock, self._on_socket_readable)
+        self.reactor.add_reader(self.channel, self._on_channel_readable)
+
+    # Socket -> channel
+    def _on_socket_readable(self):
+        try:
+            count = self.sock.recv_into(_relay_buffer)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self.close()
+            return
+        if count == 0:
+            self.socket_eof = True
+            self.reactor.remove_reader(self.sock)
+            self._channel_done_sending()
+            return
+        sent = self._send_to_channel(_relay_buffer[:count])
+        if sent < count:
+            # Window full; keep the rest and stop reading until it is sent
+            self.to_channel = bytes(_relay_buffer[sent:count])
+            self.reactor.remove_reader(self.sock)
+            self.flow_delay = FLOW_RETRY
+            self.reactor.call_later(self.flow_delay, self._flush_to_channel)
+
+    def _send_to_channel(self, data):
+        """Send as much of data as the window takes; returns the bytes sent."""
+        # Channel.send takes at most one packet per call, keep going until the window is full
+        view = memoryview(data)
+        total = 0
+        while total < len(view):
+            try:
+                sent = self.channel.send(view[total:])
+            except socket.timeout:
+                break
+            except Exception:
+                self.close()
+                return len(view)
+            if sent <= 0:
+                break
+            total += sent
+        return total
+
+    def _flush_to_channel(self):
+        if self.closed:
+            return
+        sent = self._send_to_channel(self.to_channel)
+        self.to_channel = self.to_channel[sent:]
+        if self.to_channel:
+            # Back off while the window stays closed
+            self.flow_delay = FLOW_RETRY if sent else min(self.flow_delay * 2, FLOW_RETRY_MAX)
+            self.reactor.call_later(self.flow_delay, self._flush_to_channel)
+        elif self.socket_eof:
+            self._channel_done_sending()
+        else:
+            self.reactor.add_reader(self.sock, self._on_socket_readable)
+
+    def _channel_done_sending(self):
+        if self.to_channel:
+            return
+        try:
+            self.channel.shutdown_write()
+        except Exception:
+            pass
+        self._close_if_done()
+
+    # Channel -> socket
+    def _on_channel_readable(self):
+        channel = self.channel
+        if channel.recv_ready():
+            try:
+                data = channel.recv(READ_SIZE)
+            except socket.timeout:
+                return
+            except Exception:
+                self.close()
+                return
+            self._send_to_socket(data)
+        elif channel.closed or channel.eof_received:
+            # The pipe stays readable after EOF, stop watching it
+            self.channel_eof = True
+            self.reactor.remove_reader(channel)
+            self._socket_done_sending()
+
+    def _send_to_socket(self, data):
+        try:
+            sent = self.sock.send(data)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self.close()
+            return
+        if sent < len(data):
+            self.to_socket = data[sent:]
+            self.reactor.remove_reader(self.channel)
+            self.reactor.add_writer(self.sock, self._on_socket_writable)
+
+    def _on_socket_writable(self):
+        data, self.to_socket = self.to_socket, b""
+        self.reactor.remove_writer(self.sock)
+        self._send_to_socket(data)
+        if not self.to_socket and not self.closed:
+            if self.channel_eof:
+                self._socket_done_sending()
+            else:
+                self.reactor.add_reader(self.channel, self._on_channel_readable)
+
+    def _socket_done_sending(self):
+        if self.to_socket:
+            return
+        try:
+            self.sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        self._close_if_done()
+
+    def _close_if_done(self):
+        if (self.socket_eof and not self.to_channel) and (self.channel_eof and not self.to_socket):
+            self.close()
+        elif self.channel.closed and not self.to_socket:
+            self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.reactor.remove_reader(self.sock)
+        self.reactor.remove_writer(self.sock)
+        self.reactor.remove_reader(self.channel)
+        self.sock.close()
+        self.channel.close()
+        if self.on_close is not None:
+            self.on_close(self)
+
+class LocalForwarder:
+    """-L: listens locally and opens a direct-tcpip channel per connection."""
+
+    def __init__(self, session, rule):
+        self.session = session
+        self.rule = rule
+        self.listener = None
+
+    def start(self):
+        # Binding is quick, it can happen on the reactor
+        self.listener = socket.create_server((self.rule["bind_address"], self.rule["bind_port"]),
+                                             backlog=128)
+        self.listener.setblocking(False)
+        self.session.reactor.add_reader(self.listener, self._on_accept)
+
+    def stop(self):
+        if self.listener is not None:
+            self.session.reactor.remove_reader(self.listener)
+            self.listener.close()
+            self.listener = None
+
+    def _on_accept(self):
+        while self.listener is not None:
+            try:
+                sock, peer = self.listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                if e.errno not in (errno.EMFILE, errno.ENFILE):
+                    self.session.report(self.rule, str(e))
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.accepted(sock, peer)
+
+    def accepted(self, sock, peer):
+        self.session.open_channel(sock, peer, self.rule["host"], self.rule["port"])
+
+class DynamicForwarder(LocalForwarder):
+    """-D: a SOCKS5 proxy; each CONNECT request opens a direct-tcpip channel."""
+
+    def accepted(self, sock, peer):
+        SocksHandshake(self.session, sock, peer).start()
+
+class SocksHandshake:
+    """Reads a SOCKS5 greeting and CONNECT request without blocking."""
+
+    def __init__(self, session, sock, peer):
+        self.session = session
+        self.sock = sock
+        self.peer = peer
+        self.buffer = b""
+        self.greeted = False
+        self.timer = None
+
+    def start(self):
+        self.sock.setblocking(False)
+        self.session.handshakes.add(self)
+        self.session.reactor.add_reader(self.sock, self._on_readable)
+        # A client that goes silent is dropped
+        self.timer = self.session.reactor.call_later(HANDSHAKE_TIMEOUT, self._fail)
+
+    def _finish(self):
+        self.session.handshakes.discard(self)
+        self.session.reactor.remove_reader(self.sock)
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def close(self):
+        self._fail()
+
+    def _fail(self, reply=None):
+        self._finish()
+        if reply:
+            try:
+                self.sock.send(reply)
+            except OSError:
+                pass
+        self.sock.close()
+
+    def _on_readable(self):
+        try:
+            data = self.sock.recv(512)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._fail()
+            return
+        self.buffer += data
+        if not self.greeted:
+            self._greeting()
+        if self.greeted:
+            self._request()
+
+    def _greeting(self):
+        if len(self.buffer) < 2 or len(self.buffer) < 2 + self.buffer[1]:
+            return
+        version, count = self.buffer[0], self.buffer[1]
+        methods = self.buffer[2:2 + count]
+        self.buffer = self.buffer[2 + count:]
+        if version != 5:
+            self._fail()
+            return
+        if 0 not in methods:
+            # Only "no authentication" is offered, like ssh -D
+            self._fail(b"\x05\xff")
+            return
+        try:
+            self.sock.send(b"\x05\x00")
+        except OSError:
+            self._fail()
+            return
+        self.greeted = True
+
+    def _request(self):
+        buffer = self.buffer
+        if len(buffer) < 5:
+            return
+        address_type = buffer[3]
+        if address_type == 1:
+            end = 4 + 4
+        elif address_type == 3:
+            end = 5 + buffer[4]
+        elif address_type == 4:
+            end = 4 + 16
+        else:
+            self._fail(b"\x05\x08\x00\x01" + bytes(6))
+            return
+        if len(buffer) < end + 2:
+            return
+        if buffer[0] != 5:
+            self._fail()
+            return
+        if buffer[1] != 1:
+            # Only CONNECT is supported
+            self._fail(b"\x05\x07\x00\x01" + bytes(6))
+            return
+        if address_type == 3:
+            try:
+                host = buffer[5:end].decode('idna')
+            except UnicodeError:
+                # General failure, the name is not a valid host name
+                self._fail(b"\x05\x01\x00\x01" + bytes(6))
+                return
+        else:
+            host = str(ipaddress.ip_address(bytes(buffer[4:end])))
+        port = struct.unpack("!H", buffer[end:end + 2])[0]
+        self._finish()
+        self.session.open_channel(self.sock, self.peer, host, port, socks=True)
+
+class RemoteForwarder:
+    """-R: asks the server to listen and connects each forwarded channel locally."""
+
+    def __init__(self, session, rule):
+        self.session = session
+        self.rule = rule
+        self.port = None
+
+    def start(self):
+        # Runs on the blocking pool; request_port_forward waits for the server
+        transport = self.session.transport
+        _RemoteRoutes.add(transport, self)
+        try:
+            self.port = transport.request_port_forward(self.rule["bind_address"], self.rule["bind_port"],
+                                                       handler=_RemoteRoutes.dispatch)
+        except Exception:
+            _RemoteRoutes.remove(transport, self)
+            raise
+        _RemoteRoutes.bind(transport, self)
+
+    def stop(self, transport):
+        # Runs on the blocking pool
+        _RemoteRoutes.remove(transport, self)
+        if self.port is not None and transport.is_active():
+            try:
+                transport.cancel_port_forward(self.rule["bind_address"], self.port)
+            except Exception:
+                pass
+
+    def incoming(self, channel, origin):
+        # Transport thread; connecting blocks, so it goes to the pool
+        self.session.reactor.call_soon(self.session.connect_channel, channel,
+                                       self.rule["host"], self.rule["port"])
+
+class _RemoteRoutes:
+    """paramiko takes one handler per transport; this routes by server port."""
+
+    lock = threading.Lock()
+    routes = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def add(cls, transport, forwarder):
+        with cls.lock:
+            cls.routes.setdefault(transport, {})[forwarder.rule["bind_port"]] = forwarder
+
+    @classmethod
+    def bind(cls, transport, forwarder):
+        # The server may have picked the port (bind_port 0)
+        with cls.lock:
+            ports = cls.routes.setdefault(transport, {})
+            ports.pop(forwarder.rule["bind_port"], None)
+            ports[forwarder.port] = forwarder
+
+    @classmethod
+    def remove(cls, transport, forwarder):
+        with cls.lock:
+            ports = cls.routes.get(transport, {})
+            for port in [port for port, f in ports.items() if f is forwarder]:
+                del ports[port]
+
+    @classmethod
+    def dispatch(cls, channel, origin, server):
+        with cls.lock:
+            forwarder = cls.routes.get(channel.get_transport(), {}).get(server[1])
+        if forwarder is None:
+            channel.close()
+        else:
+            forwarder.incoming(channel, origin)
+
+class PortForwarding:
+    """The forwarding rules of one connection, served by the I/O reactor.
+
+    Listeners and every forwarded connection are multiplexed on the
+    reactor thread; only opening channels and outgoing connections use its
+    small blocking pool. Hundreds of forwarded connections therefore need
+    no threads of their own. The transport comes from the TransportPool,
+    so it is shared with the connection's terminal tabs.
+
+    on_message(text) reports started rules and errors, from any thread.
+    """
+
+    def __init__(self, connection, transport_pool, reactor=None, on_message=None):
+        self.connection = connection
+        self.transport_pool = transport_pool
+        self.reactor = reactor or get_reactor()
+        self.on_message = on_message or (lambda text: None)
+        self.rules = []
+        for spec in connection.get("forwards") or []:
+            try:
+                self.rules.append(parse_forward(spec))
+            except (ValueError, KeyError) as e:
+                self.on_message(f"Skipping forwarding rule: {e}")
+        self.transport = None
+        self.forwarders = []
+        self.relays = set()
+        # SOCKS clients that have not sent their request yet
+        self.handshakes = set()
+        self.stopped = False
+
+    def start(self):
+        if self.rules:
+            self.reactor.run_blocking(self._start)
+
+    def stop(self):
+        """Close every listener and forwarded connection."""
+        self.reactor.call_soon(self._stop)
+
+    def active_connections(self):
+        return len(self.relays)
+
+    def report(self, rule, text):
+        self.on_message(f"Forwarding {format_forward(rule)}: {text}")
+
+    def _start(self):
+        # Runs on the blocking pool
+        try:
+            self.transport = self.transport_pool.acquire(self.connection)
+        except Exception as e:
+            self.on_message(f"Forwarding not started: {e}")
+            return
+        for rule in self.rules:
+            if self.stopped:
+                break
+            if rule["type"] == "remote":
+                forwarder = RemoteForwarder(self, rule)
+                try:
+                    forwarder.start()
+                except Exception as e:
+                    self.report(rule, str(e) or "refused by the server")
+                    continue
+                self.forwarders.append(forwarder)
+                self.report(rule, f"listening on the server's port {forwarder.port}")
+            else:
+                forwarder = (DynamicForwarder if rule["type"] == "dynamic" else LocalForwarder)(self, rule)
+                self.reactor.call_soon(self._start_local, forwarder)
+        if self.stopped:
+            self.reactor.call_soon(self._stop)
+
+    def _start_local(self, forwarder):
+        if self.stopped:
+            return
+        try:
+            forwarder.start()
+        except OSError as e:
+            self.report(forwarder.rule, e.strerror or str(e))
+            return
+        self.forwarders.append(forwarder)
+        self.report(forwarder.rule, "listening")
+
+    def _stop(self):
+        self.stopped = True
+        for relay in list(self.relays):
+            relay.close()
+        for handshake in list(self.handshakes):
+            handshake.close()
+        remote = []
+        for forwarder in self.forwarders:
+            if isinstance(forwarder, RemoteForwarder):
+                remote.append(forwarder)
+            else:
+                forwarder.stop()
+        self.forwarders = []
+        if self.transport is not None:
+            transport, self.transport = self.transport, None
+            self.reactor.run_blocking(self._release, transport, remote)
+
+    def _release(self, transport, remote):
+        # Runs on the blocking pool
+        for forwarder in remote:
+            forwarder.stop(transport)
+        self.transport_pool.release(transport)
+
+    # ===== Reactor thread =====
+    def open_channel(self, sock, peer, host, port, socks=False):
+        """Open a direct-tcpip channel to host:port and relay sock through it."""
+        transport = self.transport
+        if transport is None or self.stopped:
+            sock.close()
+            return
+        self.reactor.run_blocking(
+            transport.open_channel, "direct-tcpip", (host, port), peer[:2], None, None, OPEN_TIMEOUT,
+            callback=lambda future: self._on_channel_opened(future, sock, host, port, socks))
+
+    def _on_channel_opened(self, future, sock, host, port, socks):
+        try:
+            channel = future.result()
+        except Exception as e:
+            if socks:
+                # Connection refused by the far end
+                try:
+                    sock.send(b"\x05\x05\x00\x01" + bytes(6))
+                except OSError:
+                    pass
+            sock.close()
+            self.on_message(f"Error forwarding to {host}:{port}: {e}")
+            return
+        if socks:
+            try:
+                sock.send(b"\x05\x00\x00\x01" + bytes(6))
+            except OSError:
+                sock.close()
+                channel.close()
+                return
+        self._relay(sock, channel)
+
+    def connect_channel(self, channel, host, port):
+        """Connect to host:port locally and relay a forwarded channel to it."""
+        if self.stopped:
+            channel.close()
+            return
+        self.reactor.run_blocking(socket.create_connection, (host, port), OPEN_TIMEOUT,
+                                  callback=lambda future: self._on_connected(future, channel, host, port))
+
+    def _on_connected(self, future, channel, host, port):
+        try:
+            sock = future.result()
+        except Exception as e:
+            channel.close()
+            self.on_message(f"Error forwarding to {host}:{port}: {e}")
+            return
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._relay(sock, channel)
+
+    def _relay(self, sock, channel):
+        if self.stopped:
+            sock.close()
+            channel.close()
+            return
+        relay = Relay(self.reactor, sock, channel, on_close=self.relays.discard)
+        self.relays.add(relay)
+        relay.start()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import codecs
+import select
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .transport_pool import TransportPool
+from .io_reactor import get_reactor
+
+# Largest number of bytes pulled from the channel in a single recv call
+READ_SIZE = 65536
+
+# Output kept per stream and host; anything beyond is dropped
+MAX_OUTPUT = 1024 * 1024
+
+# Seconds between checks for an exit status that has not arrived with EOF
+STATUS_POLL = 0.01
+
+def new_result(connection, command):
+    """An empty result dict for a command on a connection."""
+    return {
+        "name": connection.get("name", connection["host"]),
+        "host": connection["host"],
+        "command": command,
+        "exit_status": None,
+        "stdout": "",
+        "stderr": "",
+        "truncated": False,
+        "duration": 0.0,
+        "error": None,
+    }
+
+def run_command(connection, command, timeout=30, transport_pool=None):
+    """Run a command on one host over an exec channel.
+
+    Returns a result dict with the connection name and host, stdout,
+    stderr, exit status, duration in seconds and an error message (None
+    on success). The timeout covers connecting, running and reading.
+    """
+    result = new_result(connection, command)
+    pool = transport_pool or TransportPool(idle_timeout=0)
+    started = time.monotonic()
+    deadline = started + timeout
+    transport = None
+    try:
+        transport = pool.acquire(connection, timeout)
+        channel = transport.open_session(timeout=max(0.1, deadline - time.monotonic()))
+        try:
+            channel.exec_command(command)
+            stdout, stderr, truncated = _collect(channel, deadline)
+            if not channel.status_event.wait(max(0.0, deadline - time.monotonic())):
+                raise socket.timeout()
+            result["exit_status"] = channel.exit_status
+            result["stdout"] = stdout.decode('utf-8', errors='replace')
+            result["stderr"] = stderr.decode('utf-8', errors='replace')
+            result["truncated"] = truncated
+        finally:
+            channel.close()
+    except socket.timeout:
+        result["error"] = f"Timed out after {timeout} s"
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+    finally:
+        if transport is not None:
+            pool.release(transport)
+        result["duration"] = round(time.monotonic() - started, 3)
+    return result
+
+def _collect(channel, deadline):
+    """Read stdout and stderr until EOF, raising socket.timeout at the deadline."""
+    stdout = bytearray()
+    stderr = bytearray()
+    truncated = False
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise socket.timeout()
+        # The channel's pipe stays readable once EOF arrived, so this never stalls
+        select.select([channel], [], [], remaining)
+        while channel.recv_ready():
+            data = channel.recv(READ_SIZE)
+            truncated |= _append(stdout, data)
+        while channel.recv_stderr_ready():
+            data = channel.recv_stderr(READ_SIZE)
+            truncated |= _append(stderr, data)
+        if channel.eof_received and not channel.recv_ready() and not channel.recv_stderr_ready():
+            return bytes(stdout), bytes(stderr), truncated
+
+def _append(buffer, data):
+    room = MAX_OUTPUT - len(buffer)
+    buffer += data[:room]
+    return len(data) > room
+
+class ExecChannel:
+    """One command on its own exec channel, served by the I/O reactor.
+
+    The channel is opened on a pooled transport, usually the one the
+    connection's terminal tab already uses, so any number of commands run
+    next to the interactive shell without new logins or threads. Output is
+    passed to on_output(stream, text) as it arrives, stream being "stdout"
+    or "stderr", and on_finished(result) receives the result dict of
+    run_command(). Both callbacks run on the reactor thread.
+    """
+
+    def __init__(self, connection, command, transport_pool, timeout=None, reactor=None,
+                 on_output=None, on_finished=None):
+        self.connection = connection
+        self.command = command
+        self.transport_pool = transport_pool
+        self.timeout = timeout
+        self.reactor = reactor or get_reactor()
+        self.on_output = on_output or (lambda stream, text: None)
+        self.on_finished = on_finished or (lambda result: None)
+        self.result = new_result(connection, command)
+        self.transport = None
+        self.channel = None
+        self.started = None
+        self.done = False
+        self.timeout_handle = None
+        self.buffers = {"stdout": bytearray(), "stderr": bytearray()}
+        self.decoders = {stream: codecs.getincrementaldecoder('utf-8')(errors='replace')
+                         for stream in self.buffers}
+
+    def start(self):
+        self.reactor.call_soon(self._start)
+
+    def cancel(self):
+        """Close the channel; the result reports the command as cancelled."""
+        self.reactor.call_soon(self._finish, "Cancelled")
+
+    # ===== Reactor thread =====
+    def _start(self):
+        self.started = time.monotonic()
+        if self.timeout:
+            self.timeout_handle = self.reactor.call_later(
+                self.timeout, self._finish, f"Timed out after {self.timeout} s")
+        self.reactor.run_blocking(self._open, callback=self._on_opened)
+
+    def _open(self):
+        # Runs on the blocking pool
+        transport = self.transport_pool.acquire(self.connection)
+        try:
+            channel = transport.open_session(timeout=10)
+            channel.exec_command(self.command)
+        except Exception:
+            self.transport_pool.release(transport)
+            raise
+        channel.setblocking(False)
+        return transport, channel
+
+    def _on_opened(self, future):
+        try:
+            self.transport, self.channel = future.result()
+        except Exception as e:
+            self._finish(str(e) or type(e).__name__)
+            return
+        if self.done:
+            # Cancelled or timed out while connecting
+            self._release()
+            return
+        self.reactor.add_reader(self.channel, self._on_readable)
+
+    def _on_readable(self):
+        channel = self.channel
+        try:
+            while channel.recv_ready():
+                self._output("stdout", channel.recv(READ_SIZE))
+            while channel.recv_stderr_ready():
+                self._output("stderr", channel.recv_stderr(READ_SIZE))
+        except Exception as e:
+            self._finish(str(e) or type(e).__name__)
+            return
+        if channel.eof_received and not channel.recv_ready() and not channel.recv_stderr_ready():
+            # The pipe stays readable after EOF, stop watching it
+            self.reactor.remove_reader(channel)
+            self._wait_for_status()
+
+    def _wait_for_status(self):
+        # The exit status usually arrives with EOF, sometimes just after it
+        if self.done:
+            return
+        if self.channel.exit_status_ready() or self.channel.closed:
+            self._finish()
+        else:
+            self.reactor.call_later(STATUS_POLL, self._wait_for_status)
+
+    def _output(self, stream, data):
+        self.result["truncated"] |= _append(self.buffers[stream], data)
+        text = self.decoders[stream].decode(data)
+        if text:
+            self.on_output(stream, text)
+
+    def _finish(self, error=None):
+        if self.done:
+            return
+        self.done = True
+        if self.timeout_handle is not None:
+            self.timeout_handle.cancel()
+        result = self.result
+        result["error"] = error
+        if self.channel is not None and error is None:
+            result["exit_status"] = self.channel.exit_status
+        for stream, buffer in self.buffers.items():
+            result[stream] = buffer.decode('utf-8', errors='replace')
+            tail = self.decoders[stream].decode(b"", True)
+            if tail:
+                self.on_output(stream, tail)
+        result["duration"] = round(time.monotonic() - (self.started or time.monotonic()), 3)
+        self._release()
+        self.on_finished(result)
+
+    def _release(self):
+        if self.channel is not None:
+            self.reactor.remove_reader(self.channel)
+            self.channel.close()
+            self.channel = None
+        if self.transport is not None:
+            # Releasing may close the transport, keep that off the reactor
+            self.reactor.run_blocking(self.transport_pool.release, self.transport)
+            self.transport = None
+
+class Broadcast:
+    """Run one command on many connections with bounded concurrency.
+
+    At most max_workers hosts run at once and each host gets its own
+    timeout, so the total time follows the slowest host rather than the
+    sum of all of them. Results are delivered as each host finishes.
+    """
+
+    def __init__(self, connections, command, max_workers=16, timeout=30, transport_pool=None):
+        self.connections = list(connections)
+        self.command = command
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.transport_pool = transport_pool
+        self.cancelled = threading.Event()
+
+    def results(self):
+        """Yield a result dict for every connection in completion order."""
+        if not self.connections:
+            return
+        workers = min(self.max_workers, len(self.connections))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sshworks-broadcast")
+        try:
+            futures = {executor.submit(self._run, connection): connection
+                       for connection in self.connections}
+            for future in as_completed(futures):
+                result = future.result()
+                if result is not None:
+                    yield result
+        except BaseException:
+            # Ctrl-C or the caller stopping early; do not wait for queued hosts
+            self.cancelled.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+    def run(self, callback=None):
+        """Run to completion, calling callback(result) for each host; returns all results."""
+        results = []
+        for result in self.results():
+            results.append(result)
+            if callback is not None:
+                callback(result)
+        return results
+
+    def cancel(self):
+        """Skip every host that has not started yet."""
+        self.cancelled.set()
+
+    def _run(self, connection):
+        if self.cancelled.is_set():
+            return None
+        return run_command(connection, self.command, self.timeout, self.transport_pool)
+
+def output_key(result):
+    """Key under which results with identical output are grouped."""
+    return (result["exit_status"], result["error"], result["stdout"], result["stderr"])
+
+def group_results(results):
+    """Group results with identical output, largest group first.
+
+    Returns a list of dicts holding the shared exit status, error, stdout
+    and stderr together with the names of the hosts that produced them.
+    """
+    groups = {}
+    for result in results:
+        key = output_key(result)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                "exit_status": result["exit_status"],
+                "error": result["error"],
+                "stdout": result["stdout"],
+                "stderr": result["stderr"],
+                "names": [],
+            }
+        group["names"].append(result["name"])
+    return sorted(groups.values(), key=lambda group: len(group["names"]), reverse=True)
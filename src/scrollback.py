@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gzip
+import itertools
+import os
+import weakref
+from array import array
+
+from .terminal_screen import cells_to_text, trim_cells
+
+# Approximate memory used by a stored line besides its cells
+LINE_OVERHEAD = 200
+
+# Lines removed at once when the global budget is exceeded
+TRIM_BATCH = 256
+
+# Global order of lines across all scrollbacks, oldest first
+_sequence = itertools.count()
+
+class ScrollbackBudget:
+    """Memory budget shared by the scrollback of every open terminal.
+
+    When the total goes over max_bytes the oldest lines, whichever tab
+    they belong to, are dropped until usage is back under 90% of the budget.
+    """
+
+    def __init__(self, max_bytes=0):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.scrollbacks = weakref.WeakSet()
+
+    def register(self, scrollback):
+        self.scrollbacks.add(scrollback)
+
+    def unregister(self, scrollback):
+        self.scrollbacks.discard(scrollback)
+        self.nbytes -= scrollback.nbytes
+
+    def charge(self, size):
+        self.nbytes += size
+        if self.max_bytes and self.nbytes > self.max_bytes:
+            self.enforce()
+
+    def release(self, size):
+        self.nbytes -= size
+
+    def enforce(self):
+        """Trim the oldest history across all tabs until under budget."""
+        target = self.max_bytes * 0.9
+        while self.nbytes > target:
+            candidates = [sb for sb in self.scrollbacks if len(sb)]
+            if not candidates:
+                break
+            oldest = min(candidates, key=lambda sb: sb.oldest_sequence)
+            oldest.trim(TRIM_BATCH)
+
+class Scrollback:
+    """Ring buffer of lines that scrolled off the top of a terminal screen.
+
+    Holds at most max_lines lines and, when max_bytes is set, at most that
+    many bytes. Evicted lines are written as text to a gzip file when a
+    spill path is given, otherwise they are discarded.
+    """
+
+    def __init__(self, max_lines=10000, max_bytes=0, budget=None, spill_path=None):
+        self.max_lines = max(1, max_lines)
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self.spill_path = spill_path
+        self.spill_file = None
+        self.nbytes = 0
+        self._lines = [None] * self.max_lines
+        self._sizes = array('I', [0]) * self.max_lines
+        self._sequences = array('Q', [0]) * self.max_lines
+        self._start = 0
+        self._count = 0
+        if budget is not None:
+            budget.register(self)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("scrollback index out of range")
+        return self._lines[(self._start + index) % self.max_lines]
+
+    @property
+    def maxlen(self):
+        return self.max_lines
+
+    @property
+    def oldest_sequence(self):
+        return self._sequences[self._start] if self._count else -1
+
+    def append(self, line):
+        """Store a (chars, attrs, wrapped) line as the newest entry."""
+        chars, attrs, wrapped = line
+        chars, attrs = trim_cells(chars, attrs)
+        size = LINE_OVERHEAD + (len(chars) + len(attrs)) * chars.itemsize
+
+        if self._count == self.max_lines:
+            self.trim(1)
+        slot = (self._start + self._count) % self.max_lines
+        self._lines[slot] = (chars, attrs, wrapped)
+        self._sizes[slot] = size
+        self._sequences[slot] = next(_sequence)
+        self._count += 1
+        self.nbytes += size
+
+        if self.max_bytes and self.nbytes > self.max_bytes:
+            while self._count > 1 and self.nbytes > self.max_bytes:
+                self.trim(1)
+        if self.budget is not None:
+            self.budget.charge(size)
+
+    def trim(self, count):
+        """Evict up to count of the oldest lines."""
+        count = min(count, self._count)
+        freed = 0
+        for _ in range(count):
+            slot = self._start
+            line = self._lines[slot]
+            if self.spill_path:
+                self._spill(line)
+            freed += self._sizes[slot]
+            self._lines[slot] = None
+            self._start = (slot + 1) % self.max_lines
+            self._count -= 1
+        self.nbytes -= freed
+        if self.budget is not None:
+            self.budget.release(freed)
+        return freed
+
+    def clear(self):
+        self.trim(self._count)
+        self._start = 0
+
+    def close(self):
+        """Release the budget share and finish the spill file."""
+        if self.budget is not None:
+            self.budget.unregister(self)
+            self.budget = None
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+    def _spill(self, line):
+        if self.spill_file is None:
+            try:
+                os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+                self.spill_file = gzip.open(self.spill_path, 'at', encoding='utf-8')
+            except Exception as e:
+                print(f"Error opening scrollback spill file: {e}")
+                self.spill_path = None
+                return
+        chars, _, wrapped = line
+        text = cells_to_text(chars)
+        self.spill_file.write(text if wrapped else text.rstrip(' ') + "\n")
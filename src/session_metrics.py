@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import time
+from collections import deque
+
+# Seconds a keepalive round trip measurement is reused
+RTT_INTERVAL = 5.0
+
+# Receive to paint latencies kept per session
+LATENCY_SAMPLES = 256
+
+# Counters exported to Prometheus: (snapshot key, metric name, type, help)
+PROMETHEUS_METRICS = [
+    ("bytes_in", "sshworks_session_received_bytes_total", "counter", "Bytes received from the shell channel"),
+    ("bytes_out", "sshworks_session_sent_bytes_total", "counter", "Bytes sent to the shell channel"),
+    ("chunks_in", "sshworks_session_received_chunks_total", "counter", "Reads from the shell channel"),
+    ("chunks_per_s", "sshworks_session_received_chunks_per_second", "gauge", "Reads per second"),
+    ("send_queue", "sshworks_session_send_queue_bytes", "gauge", "Input waiting for the send window"),
+    ("recv_to_paint_ms", "sshworks_session_recv_to_paint_milliseconds", "gauge",
+     "Median time from receiving output to painting it"),
+    ("append_output_s", "sshworks_session_append_output_seconds_total", "counter",
+     "GUI thread time spent in append_output"),
+    ("gui_busy", "sshworks_session_gui_busy_ratio", "gauge", "Share of GUI thread time in append_output"),
+    ("handshake_ms", "sshworks_session_handshake_milliseconds", "gauge", "TCP connect and key exchange time"),
+    ("auth_ms", "sshworks_session_auth_milliseconds", "gauge", "Authentication time"),
+    ("rtt_ms", "sshworks_session_keepalive_rtt_milliseconds", "gauge", "Keepalive round trip time"),
+]
+
+class SessionMetrics:
+    """Performance counters of one SSHWorker and SSHTerminal pair.
+
+    Byte and read counts are plain additions and always kept. Timestamps,
+    receive to paint latencies, append_output timing and keepalive probes
+    are only taken while enabled is set, which the status bar display
+    turns on.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.enabled = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.chunks_in = 0
+        self.append_output_time = 0.0
+        self.handshake = None
+        self.auth = None
+        self.rtt = None
+        # Time of the first read of every batch handed to the GUI, oldest first
+        self.batch_times = deque()
+        # Receive time of the oldest output not painted yet
+        self.unpainted_since = None
+        self.paint_latency = deque(maxlen=LATENCY_SAMPLES)
+        # Returns the bytes waiting to be sent
+        self.queue_depth = lambda: 0
+        self.previous = None
+        self.rates = {"chunks_per_s": 0.0, "bytes_in_per_s": 0.0, "bytes_out_per_s": 0.0, "gui_busy": 0.0}
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        # Batches noted before the switch would pair with the wrong output
+        self.batch_times.clear()
+        self.unpainted_since = None
+
+    # ===== GUI thread =====
+    def batch_shown(self):
+        """A batch of output went into the screen; remember when it was received."""
+        if self.batch_times:
+            received = self.batch_times.popleft()
+            if self.unpainted_since is None:
+                self.unpainted_since = received
+
+    def painted(self):
+        if self.unpainted_since is not None:
+            self.paint_latency.append(time.perf_counter() - self.unpainted_since)
+            self.unpainted_since = None
+
+    def snapshot(self):
+        """Counters and the rates since the previous snapshot at least a second ago."""
+        now = time.monotonic()
+        current = (now, self.bytes_in, self.bytes_out, self.chunks_in, self.append_output_time)
+        if self.previous is None:
+            self.previous = current
+        elif now - self.previous[0] >= 1.0:
+            elapsed = now - self.previous[0]
+            self.rates = {
+                "chunks_per_s": (current[3] - self.previous[3]) / elapsed,
+                "bytes_in_per_s": (current[1] - self.previous[1]) / elapsed,
+                "bytes_out_per_s": (current[2] - self.previous[2]) / elapsed,
+                "gui_busy": (current[4] - self.previous[4]) / elapsed,
+            }
+            self.previous = current
+        latencies = sorted(self.paint_latency)
+        return {
+            "session": self.name,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "chunks_in": self.chunks_in,
+            "chunks_per_s": round(self.rates["chunks_per_s"], 1),
+            "bytes_in_per_s": round(self.rates["bytes_in_per_s"]),
+            "bytes_out_per_s": round(self.rates["bytes_out_per_s"]),
+            "send_queue": self.queue_depth(),
+            "recv_to_paint_ms": milliseconds(latencies[len(latencies) // 2] if latencies else None),
+            "recv_to_paint_max_ms": milliseconds(latencies[-1] if latencies else None),
+            "append_output_s": round(self.append_output_time, 4),
+            "gui_busy": round(self.rates["gui_busy"], 4),
+            "handshake_ms": milliseconds(self.handshake),
+            "auth_ms": milliseconds(self.auth),
+            "rtt_ms": milliseconds(self.rtt),
+        }
+
+def milliseconds(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+def format_status(snapshot):
+    """One line for the status bar."""
+    def value(key, unit=" ms"):
+        return "-" if snapshot[key] is None else f"{snapshot[key]:.1f}{unit}"
+    return (f"↓ {snapshot['bytes_in_per_s'] / 1024:.1f} KB/s  ↑ {snapshot['bytes_out_per_s'] / 1024:.1f} KB/s  "
+            f"{snapshot['chunks_per_s']:.0f} reads/s  queue {snapshot['send_queue']} B  "
+            f"paint {value('recv_to_paint_ms')}  GUI {snapshot['gui_busy'] * 100:.1f} %  "
+            f"RTT {value('rtt_ms')}  handshake {value('handshake_ms')}  auth {value('auth_ms')}")
+
+def to_json(snapshots):
+    return json.dumps({"time": time.time(), "sessions": snapshots}, indent=2)
+
+def to_prometheus(snapshots):
+    """Prometheus text exposition format, one series per session."""
+    lines = []
+    for key, metric, kind, description in PROMETHEUS_METRICS:
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for snapshot in snapshots:
+            if snapshot[key] is None:
+                continue
+            label = snapshot["session"].replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{metric}{{session="{label}"}} {snapshot[key]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+
+from .storage import load_yaml, dump_yaml
+
+# Default values for every known setting
+DEFAULTS = {
+    # Show the main window as soon as it is ready instead of after the splash animation
+    "fast_start": True,
+    # Maximum number of terminal output flushes per second
+    "frame_rate": 60,
+    # "line" edits commands below the terminal, "raw" sends every key press
+    "input_mode": "line",
+    # Number of lines kept above the visible screen
+    "scrollback_lines": 10000,
+    # Memory cap for the scrollback of one tab (0 disables the cap)
+    "scrollback_bytes": 64 * 1024 * 1024,
+    # Memory cap for the scrollback of all tabs together (0 disables the cap)
+    "scrollback_budget_bytes": 512 * 1024 * 1024,
+    # Write lines dropped from the scrollback to ~/.sshworks/scrollback
+    "scrollback_spill": False,
+    # Where connections and commands are stored: "yaml" or "sqlite"
+    "inventory_backend": "yaml",
+    # SQLite database file; empty means ~/.sshworks/inventory.db
+    "inventory_path": "",
+    # OpenSSH config and known_hosts files re-imported at startup when they change
+    "openssh_sources": [],
+    # Seconds an unused SSH transport stays open for new tabs and commands
+    "transport_idle_timeout": 60,
+    # Seconds between keepalive packets on open SSH transports (0 disables them)
+    "transport_keepalive": 30,
+    # Pre-connect pinned and recently used connections in the background
+    "warm_pool": False,
+    # Most unused pre-connected transports kept at a time
+    "warm_pool_size": 4,
+    # Seconds an unused pre-connected transport is kept
+    "warm_pool_ttl": 600,
+    # Connections kept pre-connected first, and the most recently opened ones
+    "pinned_connections": [],
+    "recent_connections": [],
+    # Ranges of a large file copied at the same time over SFTP
+    "sftp_streams": 4,
+    # SFTP requests kept in flight per range
+    "sftp_requests": 128,
+    # Show live session metrics in the status bar; they are only collected while shown
+    "session_metrics": False,
+    # Hosts a broadcast command runs on at the same time
+    "broadcast_workers": 16,
+    # Seconds each host gets to connect and finish a broadcast command
+    "broadcast_timeout": 30,
+}
+
+class SettingsManager:
+    def __init__(self):
+        self.settings = {}
+        self.config_dir = os.path.join(os.path.expanduser("~"), ".sshworks")
+        self.settings_file = os.path.join(self.config_dir, "settings.yaml")
+        
+        # Create config directory if it doesn't exist
+        if not os.path.exists(self.config_dir):
+            os.makedirs(self.config_dir)
+        
+        # Load saved settings
+        self.load_settings()
+    
+    def load_settings(self):
+        """Load saved settings from file."""
+        if os.path.exists(self.settings_file):
+            try:
+                self.settings = load_yaml(self.settings_file) or {}
+            except Exception as e:
+                print(f"Error loading settings: {e}")
+                self.settings = {}
+        else:
+            self.settings = {}
+    
+    def save_settings(self):
+        """Save settings to file."""
+        try:
+            dump_yaml(self.settings, self.settings_file)
+        except Exception as e:
+            print(f"Error saving settings: {e}")
+    
+    def get(self, key, default=None):
+        """Get a setting, falling back to its built-in default."""
+        if key in self.settings:
+            return self.settings[key]
+        if default is not None:
+            return default
+        return DEFAULTS.get(key)
+    
+    def set(self, key, value):
+        """Change a setting and save it."""
+        self.settings[key] = value
+        self.save_settings()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import paramiko
+from paramiko.sftp import CMD_READ, CMD_DATA, CMD_STATUS, int64
+
+from .storage import write_atomic
+
+# Largest read or write a single SFTP request carries
+CHUNK_SIZE = 32768
+
+# Requests kept in flight per range, so the link never waits for a round trip
+MAX_REQUESTS = 128
+
+# Ranges of one file transferred at the same time, each on its own channel
+PARALLEL_RANGES = 4
+
+# Files smaller than this per range are not split
+MIN_RANGE_SIZE = 8 * 1024 * 1024
+
+# Flow control window of each SFTP channel; must cover the bandwidth-delay product
+WINDOW_SIZE = 16 * 1024 * 1024
+
+# Seconds between saves of the resume state
+STATE_INTERVAL = 1.0
+
+# Seconds between progress callbacks
+PROGRESS_INTERVAL = 0.25
+
+# Seconds of history the reported throughput is averaged over
+RATE_WINDOW = 2.0
+
+# Suffix of the partial file until the transfer completes
+PART_SUFFIX = ".part"
+
+class TransferRange:
+    """Bytes [start, end) of a file; offset is where the transfer continues."""
+
+    def __init__(self, start, end, offset=None):
+        self.start = start
+        self.end = end
+        self.offset = start if offset is None else offset
+
+    def remaining(self):
+        return self.end - self.offset
+
+def split_ranges(size, streams):
+    """Split size bytes into up to streams ranges of at least MIN_RANGE_SIZE."""
+    count = max(1, min(streams, size // MIN_RANGE_SIZE))
+    # Range boundaries fall on whole requests
+    step = -(-size // count // CHUNK_SIZE) * CHUNK_SIZE or CHUNK_SIZE
+    return [TransferRange(start, min(size, start + step)) for start in range(0, size, step)] \
+        or [TransferRange(0, 0)]
+
+class ReadPipeline:
+    """Keeps up to depth read requests in flight on one open SFTP file.
+
+    paramiko only offers pipelined reads through readv(), whose bounded
+    mode can stall, so requests are issued here directly and the replies
+    are collected, in any order, through the client's response dispatch.
+    """
+
+    def __init__(self, sftp, sftp_file, start, end, depth):
+        self.sftp = sftp
+        self.handle = sftp_file.handle
+        self.next_offset = start
+        self.end = end
+        self.depth = depth
+        self.requests = []
+        self.replies = {}
+
+    def _async_response(self, t, msg, num):
+        # Called by SFTPClient._read_response() for our requests
+        self.replies[num] = (t, msg)
+
+    def _fill(self):
+        while self.next_offset < self.end and len(self.requests) < self.depth:
+            length = min(CHUNK_SIZE, self.end - self.next_offset)
+            num = self.sftp._async_request(self, CMD_READ, self.handle,
+                                           int64(self.next_offset), int(length))
+            self.requests.append((num, self.next_offset, length))
+            self.next_offset += length
+
+    def blocks(self):
+        """Yield (offset, data) in file order until end is reached."""
+        self._fill()
+        while self.requests:
+            num, offset, length = self.requests[0]
+            while num not in self.replies:
+                self.sftp._read_response()
+            del self.requests[0]
+            t, msg = self.replies.pop(num)
+            if t == CMD_STATUS:
+                # Raises IOError, or EOFError if the file became shorter
+                self.sftp._convert_status(msg)
+            if t != CMD_DATA:
+                raise IOError(f"Unexpected SFTP reply {t}")
+            data = msg.get_string()
+            if len(data) < length:
+                # Servers may return less than asked; fetch the rest first
+                num = self.sftp._async_request(self, CMD_READ, self.handle,
+                                               int64(offset + len(data)), int(length - len(data)))
+                self.requests.insert(0, (num, offset + len(data), length - len(data)))
+            self._fill()
+            yield offset, data
+
+class Throughput:
+    """Transfer rate over the last RATE_WINDOW seconds."""
+
+    def __init__(self):
+        self.samples = []
+
+    def add(self, now, total):
+        self.samples.append((now, total))
+        while len(self.samples) > 2 and now - self.samples[1][0] > RATE_WINDOW:
+            del self.samples[0]
+
+    def rate(self):
+        if len(self.samples) < 2:
+            return 0.0
+        (first_time, first_total), (last_time, last_total) = self.samples[0], self.samples[-1]
+        elapsed = last_time - first_time
+        return (last_total - first_total) / elapsed if elapsed > 0 else 0.0
+
+class Transfer:
+    """Copies one file over SFTP on a pooled transport.
+
+    Reads and writes are pipelined with up to MAX_REQUESTS requests in
+    flight, and large files are split into ranges copied in parallel on
+    separate channels, so throughput is bounded by the link rather than by
+    round trips. Data goes to a ".part" file that replaces the target once
+    complete. The offset reached in every range is saved while copying; a
+    transfer started again with the same paths continues from there as
+    long as the source did not change.
+
+    direction is "download" or "upload". on_progress(transferred, total,
+    rate) is called from the transfer threads.
+    """
+
+    def __init__(self, connection, direction, local_path, remote_path, transport_pool,
+                 streams=PARALLEL_RANGES, max_requests=MAX_REQUESTS, on_progress=None,
+                 state_dir=None):
+        if direction not in ("download", "upload"):
+            raise ValueError(f"Unknown transfer direction: {direction}")
+        self.connection = connection
+        self.direction = direction
+        self.local_path = os.path.abspath(os.path.expanduser(local_path))
+        self.remote_path = remote_path
+        self.transport_pool = transport_pool
+        self.streams = max(1, streams)
+        self.max_requests = max(1, max_requests)
+        self.on_progress = on_progress or (lambda transferred, total, rate: None)
+        self.state_dir = state_dir or os.path.join(os.path.expanduser("~"), ".sshworks", "transfers")
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.ranges = []
+        self.size = 0
+        self.signature = None
+        self.source_times = None
+        self.transferred = 0
+        self.throughput = Throughput()
+        self.last_progress = 0.0
+        self.last_state = 0.0
+
+    def cancel(self):
+        """Stop copying; the partial file and resume state are kept."""
+        self.cancelled.set()
+
+    def state_path(self):
+        key = "|".join([self.direction, self.connection["host"], str(self.connection["port"]),
+                        self.connection["username"], self.local_path, self.remote_path])
+        return os.path.join(self.state_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".json")
+
+    def run(self):
+        """Copy the file; returns a result dict, with error set if it did not complete."""
+        result = {
+            "name": self.connection.get("name", self.connection["host"]),
+            "direction": self.direction,
+            "local_path": self.local_path,
+            "remote_path": self.remote_path,
+            "size": 0,
+            "transferred": 0,
+            "resumed_from": 0,
+            "duration": 0.0,
+            "rate": 0.0,
+            "error": None,
+        }
+        started = time.monotonic()
+        transport = None
+        try:
+            transport = self.transport_pool.acquire(self.connection)
+            sftp = self._open_sftp(transport)
+            try:
+                self._prepare(sftp)
+                result["size"] = self.size
+                result["resumed_from"] = self.transferred
+                self.throughput.add(time.monotonic(), self.transferred)
+                pending = [r for r in self.ranges if r.remaining() > 0]
+                if pending:
+                    with ThreadPoolExecutor(max_workers=len(pending),
+                                            thread_name_prefix="sshworks-sftp") as executor:
+                        # Raises the first error of any range
+                        list(executor.map(lambda r: self._copy_range(transport, r), pending))
+                if self.cancelled.is_set():
+                    self._save_state()
+                    result["error"] = "Cancelled"
+                else:
+                    self._finish(sftp)
+            finally:
+                sftp.close()
+        except Exception as e:
+            if self.ranges:
+                self._save_state()
+            result["error"] = str(e) or type(e).__name__
+        finally:
+            if transport is not None:
+                self.transport_pool.release(transport)
+        duration = time.monotonic() - started
+        result["transferred"] = self.transferred
+        result["duration"] = round(duration, 3)
+        moved = self.transferred - result["resumed_from"]
+        result["rate"] = round(moved / duration, 1) if duration > 0 else 0.0
+        self.on_progress(self.transferred, self.size, self.throughput.rate())
+        return result
+
+    def _open_sftp(self, transport):
+        return paramiko.SFTPClient.from_transport(transport, window_size=WINDOW_SIZE)
+
+    # ===== Setup =====
+    def _prepare(self, sftp):
+        if self.direction == "download":
+            st = sftp.stat(self.remote_path)
+        else:
+            st = os.stat(self.local_path)
+        self.size = st.st_size
+        self.signature = [st.st_size, int(st.st_mtime)]
+        self.source_times = (st.st_atime, st.st_mtime)
+
+        if not self._resume(sftp):
+            self.ranges = split_ranges(self.size, self.streams)
+            self.transferred = 0
+            # Start from an empty partial file
+            if self.direction == "download":
+                open(self.local_path + PART_SUFFIX, 'wb').close()
+            else:
+                sftp.open(self.remote_path + PART_SUFFIX, 'wb').close()
+
+    def _resume(self, sftp):
+        try:
+            with open(self.state_path(), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if state.get("signature") != self.signature:
+            # The source changed since the partial copy was made
+            return False
+        ranges = [TransferRange(*values) for values in state.get("ranges", [])]
+        if self.direction == "upload":
+            # Data sent just before an interruption may never have reached
+            # the server; copy the last window of every range again
+            for r in ranges:
+                r.offset = max(r.start, r.offset - WINDOW_SIZE)
+        try:
+            if self.direction == "download":
+                part_size = os.stat(self.local_path + PART_SUFFIX).st_size
+            else:
+                part_size = sftp.stat(self.remote_path + PART_SUFFIX).st_size
+        except (OSError, IOError):
+            return False
+        # Every range must have reached the partial file
+        if not ranges or part_size < max(r.offset for r in ranges):
+            return False
+        self.ranges = ranges
+        self.transferred = sum(r.offset - r.start for r in ranges)
+        return True
+
+    def _save_state(self):
+        with self.lock:
+            state = {
+                "signature": self.signature,
+                "ranges": [[r.start, r.end, r.offset] for r in self.ranges],
+            }
+            self.last_state = time.monotonic()
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            write_atomic(self.state_path(), json.dumps(state))
+        except Exception as e:
+            print(f"Error saving transfer state: {e}")
+
+    def _finish(self, sftp):
+        part = (self.local_path if self.direction == "download" else self.remote_path) + PART_SUFFIX
+        if self.direction == "download":
+            os.replace(part, self.local_path)
+            os.utime(self.local_path, self.source_times)
+        else:
+            try:
+                sftp.posix_rename(part, self.remote_path)
+            except IOError:
+                # Server without the posix-rename extension
+                try:
+                    sftp.remove(self.remote_path)
+                except IOError:
+                    pass
+                sftp.rename(part, self.remote_path)
+            sftp.utime(self.remote_path, self.source_times)
+        try:
+            os.remove(self.state_path())
+        except OSError:
+            pass
+
+    # ===== Copying =====
+    def _copy_range(self, transport, r):
+        # Every range gets its own channel and flow control window
+        sftp = self._open_sftp(transport)
+        try:
+            if self.direction == "download":
+                self._download_range(sftp, r)
+            else:
+                self._upload_range(sftp, r)
+        except Exception:
+            # Stop the other ranges; run() reports this error
+            self.cancelled.set()
+            raise
+        finally:
+            sftp.close()
+
+    def _download_range(self, sftp, r):
+        with sftp.open(self.remote_path, 'rb') as src, open(self.local_path + PART_SUFFIX, 'r+b') as dst:
+            dst.seek(r.offset)
+            pipeline = ReadPipeline(sftp, src, r.offset, r.end, self.max_requests)
+            try:
+                for offset, data in pipeline.blocks():
+                    if self.cancelled.is_set():
+                        break
+                    dst.write(data)
+                    self._advance(r, len(data))
+            except EOFError:
+                raise IOError(f"{self.remote_path} became shorter while downloading")
+
+    def _upload_range(self, sftp, r):
+        with open(self.local_path, 'rb') as src, sftp.open(self.remote_path + PART_SUFFIX, 'r+b') as dst:
+            # Writes are not acknowledged one by one; close() collects the replies
+            dst.set_pipelined(True)
+            src.seek(r.offset)
+            dst.seek(r.offset)
+            while r.remaining() > 0 and not self.cancelled.is_set():
+                data = src.read(min(CHUNK_SIZE, r.remaining()))
+                if not data:
+                    raise IOError(f"{self.local_path} became shorter while uploading")
+                dst.write(data)
+                self._advance(r, len(data))
+
+    def _advance(self, r, count):
+        now = time.monotonic()
+        with self.lock:
+            r.offset += count
+            self.transferred += count
+            transferred = self.transferred
+            report = now - self.last_progress >= PROGRESS_INTERVAL
+            if report:
+                self.last_progress = now
+                self.throughput.add(now, transferred)
+            save = now - self.last_state >= STATE_INTERVAL
+            if save:
+                self.last_state = now
+        if report:
+            self.on_progress(transferred, self.size, self.throughput.rate())
+        if save:
+            self._save_state()
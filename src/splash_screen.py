@@ -5,6 +5,11 @@ from PyQt5.QtWidgets import QSplashScreen, QProgressBar, QVBoxLayout, QLabel, QW
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QSize
 from PyQt5.QtGui import QPixmap, QPainter, QColor, QFont
 
+# Animation timeline in 50 ms steps
+FADE_START = 20
+FADE_END = 35
+ANIMATION_STEPS = 50
+
 class SplashScreen(QSplashScreen):
     # Signal emitted when the animation is finished
     animation_finished = pyqtSignal()
@@ -14,11 +19,6 @@ class SplashScreen(QSplashScreen):
         self.setWindowFlag(Qt.FramelessWindowHint)
         self.setFixedSize(600, 400)
         
-        # Create base pixmap for drawing
-        self.pixmap = QPixmap(self.size())
-        self.pixmap.fill(Qt.black)
-        self.setPixmap(self.pixmap)
-        
         # Setup progress bar
         self.progress_bar = QProgressBar(self)
         self.progress_bar.setGeometry(100, 340, 400, 20)
@@ -35,11 +35,18 @@ class SplashScreen(QSplashScreen):
         """)
         self.progress_bar.setValue(0)
         
+        # Fonts are created once and every distinct frame is rendered once
+        self.large_font = QFont("Arial", 72, QFont.Bold)
+        self.small_font = QFont("Arial", 36, QFont.Bold)
+        self.frames = {}
+        
         # Animation state
         self.current_animation_step = 0
+        self.animation_done = False
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_animation)
         self.timer.start(50)  # Update every 50ms
+        self.show_frame(0)
         
         # Center the splash screen
         screen_geometry = QApplication.primaryScreen().geometry()
@@ -47,50 +54,60 @@ class SplashScreen(QSplashScreen):
         y = (screen_geometry.height() - self.height()) // 2
         self.move(x, y)
     
+    def set_stage(self, text, progress):
+        """Show the current initialization stage and its progress (0-100)."""
+        self.progress_bar.setValue(progress)
+        self.showMessage(text, Qt.AlignBottom | Qt.AlignHCenter, Qt.white)
+        # Stages block the event loop, so paint right away
+        QApplication.processEvents()
+    
     def update_animation(self):
         self.current_animation_step += 1
-        progress = min(100, self.current_animation_step * 2)
-        self.progress_bar.setValue(progress)
+        self.show_frame(self.current_animation_step)
         
-        # Create a new painter each time to draw current state
-        painter = QPainter(self.pixmap)
-        painter.fillRect(0, 0, self.width(), self.height(), QColor(0, 0, 0))
+        # Animation finished
+        if self.current_animation_step >= ANIMATION_STEPS:
+            self.timer.stop()
+            self.animation_done = True
+            self.animation_finished.emit()
+    
+    def show_frame(self, step):
+        # Steps that look the same share one frame
+        key = min(max(step, FADE_START - 1), FADE_END)
+        frame = self.frames.get(key)
+        if frame is None:
+            frame = self.frames[key] = self.render_frame(step)
+        self.setPixmap(frame)
+    
+    def render_frame(self, step):
+        pixmap = QPixmap(self.size())
+        pixmap.fill(Qt.black)
+        painter = QPainter(pixmap)
         
         # Animation phases
-        if self.current_animation_step < 20:
+        if step < FADE_END:
             # Phase 1: Show "404" in red
-            painter.setFont(QFont("Arial", 72, QFont.Bold))
-            painter.setPen(QColor(255, 0, 0))  # Red
-            painter.drawText(self.rect(), Qt.AlignCenter, "404")
-            
-        elif self.current_animation_step < 35:
-            # Phase 2: Transition
-            painter.setFont(QFont("Arial", 72, QFont.Bold))
+            painter.setFont(self.large_font)
             painter.setPen(QColor(255, 0, 0))  # Red
             painter.drawText(self.rect(), Qt.AlignCenter, "404")
             
-            # Fade in "Works"
-            opacity = (self.current_animation_step - 20) / 15.0
-            painter.setFont(QFont("Arial", 72, QFont.Bold))
-            painter.setPen(QColor(255, 255, 255, int(255 * opacity)))  # White with fade
-            painter.drawText(self.rect(), Qt.AlignCenter, "Works")
+            if step >= FADE_START:
+                # Phase 2: Fade in "Works"
+                opacity = (step - FADE_START) / float(FADE_END - FADE_START)
+                painter.setPen(QColor(255, 255, 255, int(255 * opacity)))  # White with fade
+                painter.drawText(self.rect(), Qt.AlignCenter, "Works")
             
         else:
             # Phase 3: Show "Works" and "SSH" in white
-            painter.setFont(QFont("Arial", 72, QFont.Bold))
+            painter.setFont(self.large_font)
             painter.setPen(QColor(255, 255, 255))  # White
             painter.drawText(self.rect().adjusted(0, -50, 0, -50), Qt.AlignCenter, "Works")
             
-            painter.setFont(QFont("Arial", 36, QFont.Bold))
+            painter.setFont(self.small_font)
             painter.drawText(self.rect().adjusted(0, 50, 0, 50), Qt.AlignCenter, "SSH")
         
         painter.end()
-        self.setPixmap(self.pixmap)
-        
-        # Animation finished
-        if progress >= 100:
-            self.timer.stop()
-            self.animation_finished.emit()
+        return pixmap
 
 # For testing purposes
 if __name__ == "__main__":
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import fnmatch
+import getpass
+import glob
+import json
+import os
+import shlex
+
+from .storage import write_atomic
+from .port_forwarding import parse_forward
+
+# Include depth OpenSSH allows before giving up
+MAX_INCLUDE_DEPTH = 16
+
+# Options that may be given several times; every value is kept
+MULTI_OPTIONS = {"localforward": "L", "remoteforward": "R", "dynamicforward": "D"}
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def is_known_hosts(path):
+    return "known_hosts" in os.path.basename(path)
+
+def _split_line(line):
+    """Split a config line into a lower-case keyword and its arguments."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None, []
+    # "Keyword value", "Keyword=value" and "Keyword = value" are all valid
+    for i, ch in enumerate(line):
+        if ch in " \t=":
+            keyword, rest = line[:i], line[i:].lstrip(" \t")
+            if rest.startswith("="):
+                rest = rest[1:].lstrip(" \t")
+            break
+    else:
+        keyword, rest = line, ""
+    try:
+        args = shlex.split(rest, comments=True) if ('"' in rest or "'" in rest or "#" in rest) else rest.split()
+    except ValueError:
+        args = rest.split()
+    return keyword.lower(), args
+
+class Block:
+    """A Host or Match section and the options set in it."""
+
+    def __init__(self, patterns=None, match_criteria=None):
+        self.patterns = patterns or []
+        self.match_criteria = match_criteria
+        self.options = {}
+
+    def matches(self, alias, hostname):
+        if self.match_criteria is not None:
+            return self._match(alias, hostname)
+        return _patterns_match(self.patterns, alias)
+
+    def _match(self, alias, hostname):
+        criteria = self.match_criteria
+        i = 0
+        while i < len(criteria):
+            criterion = criteria[i].lower()
+            negate = criterion.startswith("!")
+            criterion = criterion.lstrip("!")
+            if criterion == "all":
+                result = True
+                i += 1
+            elif criterion in ("host", "originalhost") and i + 1 < len(criteria):
+                target = hostname if criterion == "host" else alias
+                result = _patterns_match(criteria[i + 1].split(","), target)
+                i += 2
+            else:
+                # exec, user, localuser, canonical... depend on the connection attempt
+                return False
+            if result == negate:
+                return False
+        return True
+
+def _patterns_match(patterns, name):
+    matched = False
+    for pattern in patterns:
+        if pattern.startswith("!"):
+            if fnmatch.fnmatchcase(name, pattern[1:]):
+                return False
+        elif pattern == name or (not _is_concrete(pattern) and fnmatch.fnmatchcase(name, pattern)):
+            matched = True
+    return matched
+
+def _is_concrete(pattern):
+    return not any(ch in pattern for ch in "*?!")
+
+class SSHConfigParser:
+    """Reads an OpenSSH client config with its Include files.
+
+    Every file is read once per parser, even when it is included several
+    times. Host lines with plain names become connections; wildcard Host
+    and static Match blocks supply defaults with OpenSSH's first match wins
+    rule. Match blocks that depend on the connection attempt (exec, user,
+    canonical...) are skipped.
+    """
+
+    def __init__(self, base_dir=None):
+        # Relative Include paths start here, like for the user's own config
+        self.base_dir = base_dir or os.path.join(os.path.expanduser("~"), ".ssh")
+        self.blocks = []
+        self.aliases = []
+        self.files = {}
+        self._parsed = {}
+        self._by_alias = None
+
+    def parse(self, path):
+        """Read path; returns self for chaining."""
+        # Options before the first Host line apply to every host
+        block = Block(patterns=["*"])
+        self.blocks.append(block)
+        self._read(os.path.expanduser(path), block, 0)
+        self._by_alias = None
+        return self
+
+    def _lines(self, path):
+        # Parsed lines are memoized so repeated includes cost nothing
+        lines = self._parsed.get(path)
+        if lines is None:
+            lines = []
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    keyword, args = _split_line(line)
+                    if keyword:
+                        lines.append((keyword, args))
+            self._parsed[path] = lines
+            self.files[path] = file_signature(path)
+        return lines
+
+    def _read(self, path, block, depth):
+        if depth > MAX_INCLUDE_DEPTH:
+            return block
+        try:
+            lines = self._lines(path)
+        except OSError as e:
+            print(f"Error reading SSH config {path}: {e}")
+            return block
+        for keyword, args in lines:
+            if keyword == "host":
+                block = Block(patterns=args)
+                self.blocks.append(block)
+                self.aliases.extend(pattern for pattern in args if _is_concrete(pattern))
+            elif keyword == "match":
+                block = Block(match_criteria=args)
+                self.blocks.append(block)
+            elif keyword == "include":
+                for pattern in args:
+                    pattern = os.path.expanduser(pattern)
+                    if not os.path.isabs(pattern):
+                        pattern = os.path.join(self.base_dir, pattern)
+                    # Files added to the directory later change its mtime
+                    directory = os.path.dirname(pattern)
+                    self.files.setdefault(directory, file_signature(directory))
+                    for included in sorted(glob.glob(pattern)):
+                        # Host/Match lines inside an include end at its last line
+                        self._read(included, block, depth + 1)
+                        if self.blocks and self.blocks[-1] is not block:
+                            block = self._continuation(block)
+            elif keyword in MULTI_OPTIONS:
+                block.options.setdefault(keyword, []).append(args)
+            else:
+                # Only the first value of an option counts
+                block.options.setdefault(keyword, args)
+        return block
+
+    def _continuation(self, block):
+        # Options after an Include still belong to the enclosing section
+        follow = Block(block.patterns, block.match_criteria)
+        self.blocks.append(follow)
+        return follow
+
+    def _build_block_index(self):
+        # Blocks naming only plain hosts are looked up by name; only the
+        # wildcard and Match blocks have to be tested against every alias
+        self._by_alias = {}
+        self._dynamic = []
+        for position, block in enumerate(self.blocks):
+            if block.match_criteria is None and all(_is_concrete(p) for p in block.patterns):
+                for pattern in block.patterns:
+                    self._by_alias.setdefault(pattern, []).append(position)
+            else:
+                self._dynamic.append(position)
+
+    def options_for(self, alias):
+        """Effective options for a host alias, first match wins."""
+        if self._by_alias is None:
+            self._build_block_index()
+        positions = sorted(self._by_alias.get(alias, []) + self._dynamic)
+        options = {}
+        for block in (self.blocks[position] for position in positions):
+            hostname = options.get("hostname", [alias])[0]
+            if block.matches(alias, hostname):
+                for keyword, args in block.options.items():
+                    if keyword in MULTI_OPTIONS:
+                        options.setdefault(keyword, []).extend(args)
+                    else:
+                        options.setdefault(keyword, args)
+        return options
+
+    def connections(self, group="ssh_config"):
+        """Yield a connection entry for every concrete Host alias."""
+        seen = set()
+        default_user = getpass.getuser()
+        for alias in self.aliases:
+            if alias in seen:
+                continue
+            seen.add(alias)
+            options = self.options_for(alias)
+            connection = {
+                "name": alias,
+                "host": options.get("hostname", [alias])[0].replace("%h", alias),
+                "port": _int(options.get("port", ["22"])[0], 22),
+                "username": options.get("user", [default_user])[0],
+                "group": group,
+            }
+            if "identityfile" in options:
+                connection["key_filename"] = os.path.expanduser(options["identityfile"][0])
+            if "proxyjump" in options and options["proxyjump"][0].lower() != "none":
+                connection["jump_hosts"] = options["proxyjump"][0].split(",")
+            forwards = _forwards(options)
+            if forwards:
+                connection["forwards"] = forwards
+            yield connection
+
+def _forwards(options):
+    # LocalForward "[bind:]port host:hostport", DynamicForward "[bind:]port"
+    forwards = []
+    for keyword, flag in MULTI_OPTIONS.items():
+        for args in options.get(keyword, []):
+            try:
+                forwards.append(parse_forward(f"{flag} {':'.join(args)}"))
+            except ValueError:
+                # e.g. RemoteForward with a single port (remote SOCKS)
+                continue
+    return forwards
+
+def _int(value, default):
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+def read_known_hosts(path, group="known_hosts"):
+    """Yield a connection entry per host name in a known_hosts file.
+
+    The file is read line by line. Hashed names cannot be recovered and
+    are skipped, as are @revoked and @cert-authority lines.
+    """
+    seen = set()
+    default_user = getpass.getuser()
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line or line[0] in "#@|\n":
+                continue
+            names = line.split(None, 1)[0]
+            for name in names.split(","):
+                if not name or name[0] in "|!" or "*" in name or "?" in name:
+                    continue
+                port = 22
+                host = name
+                if name.startswith("["):
+                    host, _, port_text = name[1:].partition("]:")
+                    port = _int(port_text, 22)
+                    name = f"{host}:{port}"
+                if name in seen:
+                    continue
+                seen.add(name)
+                yield {"name": name, "host": host, "port": port,
+                       "username": default_user, "group": group}
+
+class OpenSSHImporter:
+    """Imports ssh_config and known_hosts files into a ConnectionManager.
+
+    Each source remembers the size and mtime of every file it was built
+    from (including Include files) in a small cache file. Importing an
+    unchanged source again does nothing, so sources can be re-synced at
+    every start for free.
+
+    Re-importing never overrides the user: fields of a saved connection
+    are only filled in where missing, connections not imported from the
+    same file are left alone, and imported connections the user removed
+    stay removed.
+    """
+
+    def __init__(self, connection_manager, cache_path=None):
+        self.connection_manager = connection_manager
+        self.cache_path = cache_path or os.path.join(os.path.expanduser("~"), ".sshworks",
+                                                     "import_cache.json")
+        self.cache = self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        try:
+            write_atomic(self.cache_path, json.dumps(self.cache))
+        except Exception as e:
+            print(f"Error saving import cache: {e}")
+
+    def is_unchanged(self, path):
+        entry = self.cache.get(path)
+        if not entry:
+            return False
+        return all(file_signature(dep) == signature for dep, signature in entry["files"].items())
+
+    def import_file(self, path, force=False):
+        """Import one source; returns the number of entries, or None if unchanged."""
+        path = os.path.abspath(os.path.expanduser(path))
+        if not force and self.is_unchanged(path):
+            return None
+        signature = file_signature(path)
+        if is_known_hosts(path):
+            entries = list(read_known_hosts(path))
+            files = {path: signature}
+        else:
+            parser = SSHConfigParser().parse(path)
+            entries = list(parser.connections())
+            files = parser.files
+        for entry in entries:
+            entry["source"] = path
+        previous = set(self.cache.get(path, {}).get("names", []))
+        changed = list(self._merge(path, entries, previous))
+        if changed:
+            self.connection_manager.add_connections(changed)
+        self.cache[path] = {"files": files, "count": len(entries),
+                            "names": [entry["name"] for entry in entries]}
+        self._save_cache()
+        return len(entries)
+
+    def sync(self, paths):
+        """Import every changed source; returns {path: count or None}."""
+        return {path: self.import_file(path) for path in paths}
+
+    def _merge(self, path, entries, previous):
+        """Entries that add or fill in connections; previous are the names imported last time."""
+        existing = self.connection_manager.get_connections(entry["name"] for entry in entries)
+        for entry in entries:
+            current = existing.get(entry["name"])
+            if current is None:
+                if entry["name"] in previous:
+                    # Imported before and removed by the user since
+                    continue
+                yield entry
+            elif current.get("source") == path:
+                # Saved values, edited or not, win over the file's
+                merged = dict(entry)
+                merged.update(current)
+                if merged != current:
+                    yield merged
@@ -1,102 +1,461 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QLineEdit, QHBoxLayout, QPushButton, QMenu, QAction, QAction
-from PyQt5.QtCore import Qt, pyqtSignal, pyqtSlot, QThread, QTimer
-from PyQt5.QtGui import QTextCursor, QColor, QFont, QTextCharFormat
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLineEdit, QHBoxLayout, QPushButton, QMenu, QAction, QAction,
+                            QSplitter, QProgressDialog)
+from PyQt5.QtCore import Qt, QObject, pyqtSignal, pyqtSlot, QTimer
+from PyQt5.QtGui import QColor, QFont
 
-import paramiko
+import codecs
 import time
 import socket
 import threading
+import os
 import re
+from collections import deque
 
-class SSHWorker(QThread):
+from .settings import DEFAULTS
+from .scrollback import Scrollback
+from .transport_pool import TransportPool
+from .io_reactor import get_reactor
+from .terminal_screen import TerminalScreen
+from .terminal_view import TerminalView
+from .command_results import CommandResultsPanel
+from .port_forwarding import PortForwarding, FLOW_RETRY, FLOW_RETRY_MAX
+from .key_input import EchoLatency
+from .session_metrics import SessionMetrics, RTT_INTERVAL
+
+# Largest number of bytes pulled from the channel in a single recv call
+READ_SIZE = 65536
+
+# Most characters handed to the GUI in one batch; reading stops until it is shown
+MAX_BATCH = 32768
+
+# Terminal type announced to the server
+TERM = "xterm-256color"
+
+# Largest slice of streamed input passed to one channel.send call
+SEND_CHUNK = 32768
+
+# Seconds between progress reports of streamed input
+SEND_PROGRESS_INTERVAL = 0.1
+
+# Pastes at least this large show a progress dialog
+PASTE_PROGRESS_SIZE = 256 * 1024
+
+# Bracketed paste markers around pasted text
+PASTE_START = b"\x1b[200~"
+PASTE_END = b"\x1b[201~"
+
+class InputStream:
+    """A large payload written to the shell in window-sized chunks.
+    
+    The reactor sends as much as the channel's window allows and waits for
+    the remote side to adjust it before sending more, so a busy remote PTY
+    slows the stream down instead of losing data. on_progress(sent, total)
+    and on_finished(result) are called on the reactor thread.
+    """
+    
+    def __init__(self, data, on_progress=None, on_finished=None):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.data = memoryview(data)
+        self.total = len(data)
+        self.offset = 0
+        self.cancelled = False
+        # A cancelled bracketed paste still ends with PASTE_END
+        self.bracketed = data.startswith(PASTE_START)
+        self.trailer = None
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.started = time.monotonic()
+        self.last_report = 0.0
+    
+    def cancel(self):
+        self.cancelled = True
+    
+    def report(self, force=False):
+        now = time.monotonic()
+        if self.on_progress is not None and (force or now - self.last_report >= SEND_PROGRESS_INTERVAL):
+            self.last_report = now
+            self.on_progress(self.offset, self.total)
+    
+    def finish(self, error=None):
+        self.data = None
+        if self.on_finished is not None:
+            self.on_finished({
+                "sent": self.offset,
+                "total": self.total,
+                "cancelled": self.cancelled,
+                "error": error,
+                "duration": time.monotonic() - self.started,
+            })
+
+class SSHWorker(QObject):
+    """Drives one interactive shell channel on the shared I/O reactor.
+    
+    Connecting happens on the reactor's blocking pool; afterwards the
+    channel is served by the reactor thread together with every other
+    session, so no thread is created per tab.
+    """
     output_received = pyqtSignal(str)
     connection_established = pyqtSignal()
     connection_failed = pyqtSignal(str)
     connection_closed = pyqtSignal()
     
-    def __init__(self, connection):
+    def __init__(self, connection, frame_rate=DEFAULTS["frame_rate"], transport_pool=None, reactor=None,
+                 metrics=None):
         super().__init__()
         self.connection = connection
-        self.client = paramiko.SSHClient()
-        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.frame_interval = 1.0 / frame_rate if frame_rate > 0 else 0.0
+        self.transport_pool = transport_pool or TransportPool(idle_timeout=0)
+        self.reactor = reactor or get_reactor()
+        self.transport = None
         self.channel = None
         self.running = False
-        self.command_queue = []
-        self.lock = threading.Lock()
+        self.connecting = False
+        self.stopping = False
+        # Appended by the GUI thread and drained by the reactor without a lock;
+        # deque append and popleft are atomic
+        self.command_queue = deque()
+        self.write_scheduled = False
+        self.flow_delay = FLOW_RETRY
+        self.latency = EchoLatency()
+        self.metrics = metrics or SessionMetrics(connection.get('name', connection['host']))
+        self.metrics.queue_depth = self.queue_depth
+        self.probing = False
+        self.term_size = (80, 24)
+        self.finished = threading.Event()
+        
+        # Multibyte characters split between reads are completed on the next one
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        
+        # Output waiting for the next frame
+        self.pending = []
+        self.pending_size = 0
+        # The channel is not read while the GUI is busy with the previous batch
+        self.reading = False
+        self.last_flush = 0.0
+        self.flush_handle = None
+        # First read of the pending output, only noted while metrics are enabled
+        self.batch_started = None
+    
+    def start(self):
+        self.reactor.call_soon(self._start)
+    
+    def stop(self):
+        running = self.running
+        self.reactor.call_soon(self._close)
+        if running:
+            self.finished.wait(2)
+    
+    def send_command(self, command):
+        self.send_data(command + "\n")
+    
+    def send_data(self, data):
+        """Queue raw text, bytes or an InputStream for the channel."""
+        if not isinstance(data, InputStream) and len(data) > SEND_CHUNK:
+            # Sent in slices instead of copying the remainder after each send
+            data = InputStream(data)
+        self.command_queue.append(data)
+        if not self.write_scheduled:
+            # One wakeup covers everything queued until the reactor drains
+            self.write_scheduled = True
+            self.reactor.call_soon(self._write)
     
-    def run(self):
+    def send_key(self, data):
+        """Send a keystroke and time how long its echo takes."""
+        self.latency.key_sent()
+        self.send_data(data)
+    
+    def queue_depth(self):
+        """Bytes queued for the channel but not sent yet."""
+        depth = 0
+        for data in list(self.command_queue):
+            depth += data.total - data.offset if isinstance(data, InputStream) else len(data)
+        return depth
+    
+    def measure_rtt(self):
+        """Refresh the keepalive round trip of the transport in the background."""
+        if self.transport is not None and not self.probing:
+            self.probing = True
+            self.reactor.call_soon(self._probe_rtt)
+    
+    def output_consumed(self):
+        """The GUI has shown the last batch; resume reading the channel."""
+        self.reactor.call_soon(self._resume_reading)
+    
+    def resize_pty(self, cols, rows):
+        """Tell the server about a new terminal size."""
+        self.term_size = (cols, rows)
+        self.reactor.call_soon(self._resize)
+    
+    # ===== Reactor thread =====
+    def _start(self):
+        self.connecting = True
+        self.reactor.run_blocking(self._open_channel, callback=self._on_channel_opened)
+    
+    def _open_channel(self):
+        # Runs on the blocking pool
+        # Reuse an authenticated transport to the same host if there is one
+        self.transport = self.transport_pool.acquire(self.connection)
+        timings = self.transport_pool.timings(self.transport)
+        self.metrics.handshake = timings["handshake"]
+        self.metrics.auth = timings["auth"]
+        
+        # Open channel and invoke shell
+        cols, rows = self.term_size
+        channel = self.transport.open_session(timeout=10)
+        channel.get_pty(term=TERM, width=cols, height=rows)
+        channel.invoke_shell()
+        channel.setblocking(False)
+        return channel
+    
+    def _on_channel_opened(self, future):
+        self.connecting = False
         try:
-            # Connect to the SSH server
-            self.client.connect(
-                hostname=self.connection['host'],
-                port=self.connection['port'],
-                username=self.connection['username'],
-                password=self.connection['password'],
-                timeout=10
-            )
-            
-            # Open channel and invoke shell
-            self.channel = self.client.invoke_shell()
-            self.channel.settimeout(0.1)
-            
-            # Signal connection established
-            self.connection_established.emit()
-            
-            # Main loop to read from channel
-            self.running = True
-            buffer = ""
-            
-            while self.running:
-                # Process any queued commands
-                with self.lock:
-                    if self.command_queue:
-                        command = self.command_queue.pop(0)
-                        self.channel.send(command)
-                
-                # Read from channel
-                try:
-                    if self.channel.recv_ready():
-                        chunk = self.channel.recv(1024).decode('utf-8', errors='replace')
-                        buffer += chunk
-                        self.output_received.emit(chunk)
-                except socket.timeout:
-                    pass
-                except Exception as e:
-                    if self.running:  # Only emit error if we're still supposed to be running
-                        self.connection_failed.emit(str(e))
-                        self.running = False
-                
-                # Short sleep to prevent CPU hogging
-                time.sleep(0.01)
-            
+            self.channel = future.result()
         except Exception as e:
             self.connection_failed.emit(str(e))
-        finally:
-            if self.channel:
-                self.channel.close()
-            self.client.close()
-            self.connection_closed.emit()
+            self._close()
+            return
+        
+        if self.stopping:
+            self._close()
+            return
+        
+        # Signal connection established
+        self.running = True
+        self.connection_established.emit()
+        self._resume_reading()
+        self._write()
     
-    def stop(self):
-        self.running = False
-        self.wait()
+    def _on_readable(self):
+        channel = self.channel
+        
+        # Read what the channel has buffered, up to one batch
+        echo = self.latency.waiting()
+        if echo:
+            self.latency.output_received()
+        metrics = self.metrics
+        try:
+            while self.pending_size < MAX_BATCH and channel.recv_ready():
+                data = channel.recv(min(READ_SIZE, MAX_BATCH - self.pending_size))
+                metrics.bytes_in += len(data)
+                metrics.chunks_in += 1
+                chunk = self.decoder.decode(data)
+                if chunk:
+                    if metrics.enabled and self.batch_started is None:
+                        self.batch_started = time.perf_counter()
+                    self.pending.append(chunk)
+                    self.pending_size += len(chunk)
+        except Exception as e:
+            if self.running:  # Only emit error if we're still supposed to be running
+                self.connection_failed.emit(str(e))
+            self._close()
+            return
+        
+        # Remote side closed the channel
+        if channel.closed or (channel.eof_received and not channel.recv_ready()):
+            self.pending.append(self.decoder.decode(b"", True))
+            self._close()
+            return
+        
+        if self.pending_size >= MAX_BATCH:
+            # The rest stays in the channel until this batch is shown
+            self._pause_reading()
+        
+        # Hand output to the GUI at most once per frame; the echo of a
+        # keystroke goes out right away
+        if echo:
+            if self.flush_handle is not None:
+                self.flush_handle.cancel()
+            self._flush()
+        elif self.flush_handle is None:
+            delay = self.last_flush + self.frame_interval - time.monotonic()
+            if delay <= 0:
+                self._flush()
+            else:
+                self.flush_handle = self.reactor.call_later(delay, self._flush)
     
-    def send_command(self, command):
-        with self.lock:
-            self.command_queue.append(command + "\n")
+    def _flush(self):
+        self.flush_handle = None
+        if any(self.pending):
+            if self.batch_started is not None:
+                self.metrics.batch_times.append(self.batch_started)
+            self.output_received.emit("".join(self.pending))
+            self._pause_reading()
+        self.pending = []
+        self.pending_size = 0
+        self.batch_started = None
+        self.last_flush = time.monotonic()
+    
+    def _pause_reading(self):
+        if self.reading:
+            self.reading = False
+            self.reactor.remove_reader(self.channel)
+    
+    def _resume_reading(self):
+        if self.running and not self.reading and self.pending_size < MAX_BATCH:
+            self.reading = True
+            self.reactor.add_reader(self.channel, self._on_readable)
+    
+    def _write(self):
+        # Cleared before draining so data queued meanwhile schedules a new call
+        self.write_scheduled = False
+        channel = self.channel
+        if channel is None or not self.running:
+            return
+        queue = self.command_queue
+        sent_before = self.metrics.bytes_out
+        while queue:
+            if isinstance(queue[0], InputStream):
+                try:
+                    if not self._send_stream(channel, queue[0]):
+                        # Send window is full, wait for the remote side
+                        self._retry_write(self.metrics.bytes_out > sent_before)
+                        return
+                except Exception as e:
+                    queue.popleft().finish(str(e))
+                    print(f"Error sending to channel: {e}")
+                    return
+                queue.popleft().finish()
+                continue
+            data = queue.popleft()
+            if isinstance(data, str):
+                data = data.encode('utf-8')
+            try:
+                sent = channel.send(data)
+            except socket.timeout:
+                sent = 0
+            except Exception as e:
+                print(f"Error sending to channel: {e}")
+                return
+            self.metrics.bytes_out += sent
+            if sent < len(data):
+                # Send window is full, retry the rest shortly
+                queue.appendleft(data[sent:])
+                self._retry_write(self.metrics.bytes_out > sent_before)
+                return
+    
+    def _retry_write(self, progress):
+        # paramiko has no writability event for channels; back off while the window stays closed
+        self.flow_delay = FLOW_RETRY if progress else min(self.flow_delay * 2, FLOW_RETRY_MAX)
+        # Input queued meanwhile is sent by the retry instead of a call of its own
+        self.write_scheduled = True
+        self.reactor.call_later(self.flow_delay, self._write)
+    
+    def _send_stream(self, channel, stream):
+        """Send what the window allows; True once the stream is done or cancelled."""
+        while stream.offset < stream.total and not stream.cancelled:
+            try:
+                sent = channel.send(stream.data[stream.offset:stream.offset + SEND_CHUNK])
+            except socket.timeout:
+                sent = 0
+            if sent == 0:
+                stream.report()
+                return False
+            stream.offset += sent
+            self.metrics.bytes_out += sent
+            stream.report()
+        if stream.cancelled and stream.bracketed and stream.trailer is None:
+            # Leave the remote shell's paste mode; the rest of an end marker already begun is sent as is
+            end = stream.total - len(PASTE_END)
+            stream.trailer = stream.data[stream.offset:] if stream.offset > end else memoryview(PASTE_END)
+        while stream.trailer:
+            try:
+                sent = channel.send(stream.trailer)
+            except socket.timeout:
+                sent = 0
+            if sent == 0:
+                return False
+            stream.trailer = stream.trailer[sent:]
+            self.metrics.bytes_out += sent
+        stream.report(True)
+        return True
+    
+    def _probe_rtt(self):
+        if self.transport is None:
+            self.probing = False
+            return
+        self.reactor.run_blocking(self.transport_pool.round_trip, self.transport, RTT_INTERVAL,
+                                  callback=self._on_rtt)
+    
+    def _on_rtt(self, future):
+        self.probing = False
+        try:
+            rtt = future.result()
+        except Exception:
+            return
+        if rtt is not None:
+            self.metrics.rtt = rtt
+    
+    def _resize(self):
+        if self.channel is not None and not self.channel.closed:
+            cols, rows = self.term_size
+            try:
+                self.channel.resize_pty(width=cols, height=rows)
+            except Exception as e:
+                print(f"Error resizing terminal: {e}")
+    
+    def _close(self):
+        self.stopping = True
+        if self.connecting or self.finished.is_set():
+            # A connect in progress closes the session once it completes
+            return
+        self.running = False
+        while self.command_queue:
+            data = self.command_queue.popleft()
+            if isinstance(data, InputStream):
+                data.finish("Connection closed")
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+        self._flush()
+        if self.channel is not None:
+            self._pause_reading()
+            self.channel.close()
+        if self.transport is not None:
+            # Closing a transport joins its thread, keep that off the reactor
+            self.reactor.run_blocking(self.transport_pool.release, self.transport)
+            self.transport = None
+        self.finished.set()
+        self.connection_closed.emit()
 
 class SSHTerminal(QWidget):
     connection_established = pyqtSignal()
     connection_failed = pyqtSignal(str)
+    forwarding_message = pyqtSignal(str)
+    input_progress = pyqtSignal(object, int, int)
+    input_finished = pyqtSignal(object, dict)
     
-    def __init__(self, connection):
+    def __init__(self, connection, settings=None, scrollback_budget=None, transport_pool=None):
         super().__init__()
         self.connection = connection
+        self.settings = settings
+        # Shared by the shell and any exec channel commands
+        self.transport_pool = transport_pool or TransportPool(idle_timeout=0)
         self.ssh_worker = None
         self.custom_commands = []
+        # Created when the first command runs on an exec channel
+        self.results_panel = None
+        # Port forwarding rules of the connection, started once connected
+        self.forwarding = None
+        self.forwarding_message.connect(lambda text: self.append_output(text + "\r\n"))
+        # Progress dialogs of streamed pastes, emitted from the reactor thread
+        self.input_dialogs = {}
+        self.input_progress.connect(self.on_input_progress)
+        self.input_finished.connect(self.on_input_finished)
+        # Shared with the worker, which counts on the reactor thread
+        self.metrics = SessionMetrics(connection['name'])
+        
+        # Screen model between the worker and the output widget
+        scrollback = Scrollback(
+            max_lines=self.setting("scrollback_lines"),
+            max_bytes=self.setting("scrollback_bytes"),
+            budget=scrollback_budget,
+            spill_path=self.spill_path() if self.setting("scrollback_spill") else None)
+        self.screen = TerminalScreen(scrollback=scrollback)
+        self.screen.reply = self.send_data
         
         self.setup_ui()
     
@@ -106,17 +465,11 @@ class SSHTerminal(QWidget):
         self.layout.setContentsMargins(0, 0, 0, 0)
         
         # Terminal output area
-        self.terminal_output = QTextEdit()
-        self.terminal_output.setReadOnly(True)
-        self.terminal_output.setLineWrapMode(QTextEdit.WidgetWidth)
-        self.terminal_output.setFont(QFont("Courier New", 10))
-        self.terminal_output.setStyleSheet("""
-            QTextEdit {
-                background-color: #000000;
-                color: #FFFFFF;
-                border: none;
-            }
-        """)
+        self.terminal_view = TerminalView(self.screen)
+        self.terminal_view.size_changed.connect(self.on_terminal_resized)
+        self.terminal_view.key_input.connect(self.send_key)
+        self.terminal_view.paste_input.connect(self.paste_data)
+        self.terminal_view.paint_callback = self.metrics.painted
         
         # Input area
         self.input_widget = QWidget()
@@ -143,17 +496,34 @@ class SSHTerminal(QWidget):
         self.input_layout.addWidget(self.command_input)
         self.input_layout.addWidget(self.custom_cmd_button)
         
+        # Exec channel results go below the terminal
+        self.splitter = QSplitter(Qt.Vertical)
+        self.splitter.addWidget(self.terminal_view)
+        
         # Add to main layout
-        self.layout.addWidget(self.terminal_output)
+        self.layout.addWidget(self.splitter)
         self.layout.addWidget(self.input_widget)
+        self.set_input_mode(self.setting("input_mode"))
+    
+    def set_input_mode(self, mode):
+        """Use "line" for the command line below the terminal, "raw" to type into the terminal."""
+        raw = mode == "raw"
+        self.terminal_view.raw_input = raw
+        self.command_input.setVisible(not raw)
+        if raw:
+            self.terminal_view.setFocus()
+        else:
+            self.command_input.setFocus()
     
     def connect_to_host(self):
         # Display connecting message
-        self.append_output(f"Connecting to {self.connection['host']}:{self.connection['port']} as {self.connection['username']}...\n")
+        self.append_output(f"Connecting to {self.connection['host']}:{self.connection['port']} as {self.connection['username']}...\r\n")
         
         # Create and start worker thread
-        self.ssh_worker = SSHWorker(self.connection)
-        self.ssh_worker.output_received.connect(self.append_output)
+        self.ssh_worker = SSHWorker(self.connection, self.setting("frame_rate"), self.transport_pool,
+                                    metrics=self.metrics)
+        self.ssh_worker.term_size = (self.screen.cols, self.screen.rows)
+        self.ssh_worker.output_received.connect(self.on_output)
         self.ssh_worker.connection_established.connect(self.on_connected)
         self.ssh_worker.connection_failed.connect(self.on_connection_failed)
         self.ssh_worker.connection_closed.connect(self.on_connection_closed)
@@ -161,20 +531,52 @@ class SSHTerminal(QWidget):
     
     def disconnect_from_host(self):
         if self.ssh_worker and self.ssh_worker.running:
-            self.append_output("\nDisconnecting...\n")
+            self.append_output("\r\nDisconnecting...\r\n")
             self.ssh_worker.stop()
+        elif self.ssh_worker and not self.ssh_worker.finished.is_set():
+            # Closes the session as soon as the connect completes
+            self.ssh_worker.stop()
+    
+    def shutdown(self):
+        """Disconnect and release the memory held by this terminal."""
+        if self.results_panel is not None:
+            self.results_panel.cancel_all()
+        if self.forwarding is not None:
+            self.forwarding.stop()
+            self.forwarding = None
+        self.disconnect_from_host()
+        self.screen.scrollback.close()
+    
+    def setting(self, key):
+        if self.settings:
+            return self.settings.get(key)
+        return DEFAULTS[key]
+    
+    def spill_path(self):
+        """File that receives lines dropped from the scrollback."""
+        name = re.sub(r'[^A-Za-z0-9_.@-]', '_', self.connection['name'])
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(os.path.expanduser("~"), ".sshworks", "scrollback",
+                            f"{name}-{stamp}-{id(self):x}.log.gz")
     
     def on_connected(self):
-        self.append_output("Connection established.\n")
-        self.command_input.setFocus()
+        self.append_output("Connection established.\r\n")
+        if self.terminal_view.raw_input:
+            self.terminal_view.setFocus()
+        else:
+            self.command_input.setFocus()
+        if self.connection.get("forwards") and self.forwarding is None:
+            self.forwarding = PortForwarding(self.connection, self.transport_pool,
+                                             on_message=self.forwarding_message.emit)
+            self.forwarding.start()
         self.connection_established.emit()
     
     def on_connection_failed(self, error):
-        self.append_output(f"Connection failed: {error}\n")
+        self.append_output(f"Connection failed: {error}\r\n")
         self.connection_failed.emit(error)
     
     def on_connection_closed(self):
-        self.append_output("Connection closed.\n")
+        self.append_output("Connection closed.\r\n")
     
     def send_command(self):
         command = self.command_input.text()
@@ -185,22 +587,96 @@ class SSHTerminal(QWidget):
     def execute_command(self, command):
         if self.ssh_worker and self.ssh_worker.running:
             self.ssh_worker.send_command(command)
-            self.append_output(f"\n$ {command}\n")
+            self.append_output(f"\r\n$ {command}\r\n")
+    
+    def run_custom_command(self, cmd):
+        """Run a saved command in the shell or on its own exec channel."""
+        if cmd.get("mode") == "exec":
+            self.run_exec_command(cmd["command"], cmd["name"])
+        else:
+            self.execute_command(cmd["command"])
+    
+    def run_exec_command(self, command, title=None):
+        """Run command on a separate exec channel; results go to the results panel."""
+        if self.results_panel is None:
+            self.results_panel = CommandResultsPanel(self.connection, self.transport_pool)
+            self.splitter.addWidget(self.results_panel)
+            self.splitter.setSizes([3 * self.height() // 4, self.height() // 4])
+        return self.results_panel.run(command, title)
+    
+    def send_data(self, data):
+        if self.ssh_worker and self.ssh_worker.running:
+            self.ssh_worker.send_data(data)
+    
+    def send_key(self, data):
+        if self.ssh_worker and self.ssh_worker.running:
+            self.ssh_worker.send_key(data)
+    
+    def paste_data(self, data, title="Pasting"):
+        """Stream data into the shell; large payloads get a cancellable progress dialog."""
+        if not (self.ssh_worker and self.ssh_worker.running) or not data:
+            return None
+        stream = InputStream(data)
+        if stream.total >= PASTE_PROGRESS_SIZE:
+            dialog = QProgressDialog(f"{title} {stream.total // 1024} KB...", "Cancel", 0, 1000, self)
+            dialog.setWindowTitle(title)
+            dialog.setMinimumDuration(300)
+            dialog.canceled.connect(stream.cancel)
+            self.input_dialogs[stream] = dialog
+            stream.on_progress = lambda sent, total: self.input_progress.emit(stream, sent, total)
+        stream.on_finished = lambda result: self.input_finished.emit(stream, result)
+        self.ssh_worker.send_data(stream)
+        return stream
+    
+    def on_input_progress(self, stream, sent, total):
+        dialog = self.input_dialogs.get(stream)
+        if dialog is not None and total:
+            dialog.setValue(int(1000 * sent / total))
+    
+    def on_input_finished(self, stream, result):
+        dialog = self.input_dialogs.pop(stream, None)
+        if dialog is not None:
+            dialog.reset()
+            dialog.deleteLater()
+        if result["error"]:
+            self.append_output(f"\r\nInput stopped after {result['sent']} of {result['total']} bytes: {result['error']}\r\n")
+    
+    def echo_latency(self):
+        """Keystroke to echo latency statistics of the shell, in seconds."""
+        if self.ssh_worker is None:
+            return EchoLatency().summary()
+        return self.ssh_worker.latency.summary()
+    
+    def on_output(self, text):
+        metrics = self.metrics
+        if not metrics.enabled:
+            self.append_output(text)
+        else:
+            started = time.perf_counter()
+            metrics.batch_shown()
+            self.append_output(text)
+            metrics.append_output_time += time.perf_counter() - started
+        if self.ssh_worker is not None:
+            self.ssh_worker.output_consumed()
     
     def append_output(self, text):
-        cursor = self.terminal_output.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        
-        # Simple ANSI color handling (very basic implementation)
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        plain_text = ansi_escape.sub('', text)
-        
-        # Insert the text
-        cursor.insertText(plain_text)
-        
-        # Scroll to the bottom
-        cursor.movePosition(QTextCursor.End)
-        self.terminal_output.setTextCursor(cursor)
+        # Let the screen model interpret the whole batch, then repaint
+        # only the rows it changed
+        self.screen.feed(text)
+        self.terminal_view.refresh()
+    
+    def set_metrics_enabled(self, enabled):
+        self.metrics.set_enabled(enabled)
+    
+    def metrics_snapshot(self):
+        """Current counters of the session; refreshes the keepalive RTT while enabled."""
+        if self.metrics.enabled and self.ssh_worker and self.ssh_worker.running:
+            self.ssh_worker.measure_rtt()
+        return self.metrics.snapshot()
+    
+    def on_terminal_resized(self, cols, rows):
+        if self.ssh_worker:
+            self.ssh_worker.resize_pty(cols, rows)
     
     def set_custom_commands(self, commands):
         self.custom_commands = commands
@@ -216,7 +692,7 @@ class SSHTerminal(QWidget):
             for cmd in self.custom_commands:
                 action = QAction(cmd["name"], self)
                 action.setData(cmd["command"])
-                action.triggered.connect(lambda checked, cmd=cmd: self.execute_command(cmd["command"]))
+                action.triggered.connect(lambda checked, cmd=cmd: self.run_custom_command(cmd))
                 menu.addAction(action)
         
         menu.exec(self.custom_cmd_button.mapToGlobal(self.custom_cmd_button.rect().bottomLeft()))
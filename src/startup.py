@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import sys
+import time
+
+class StartupTimer:
+    """Records how long each stage of application startup takes.
+
+    mark(name) closes the running stage under that name. report() returns
+    the stage durations and the total in milliseconds, measured from the
+    moment the timer was created.
+    """
+
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.last = self.started
+        self.stages = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.stages.append((name, now - self.last))
+        self.last = now
+
+    def total(self):
+        return self.last - self.started
+
+    def report(self):
+        return {
+            "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in self.stages},
+            "total_ms": round(self.total() * 1000, 1),
+        }
+
+    def write(self, stream=sys.stdout):
+        stream.write(json.dumps(self.report()) + "\n")
+        stream.flush()
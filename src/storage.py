@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+
+import yaml
+
+# The libyaml bindings are much faster when PyYAML was built with them
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+SafeDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+def write_atomic(path, text):
+    """Replace a file's content so readers see either the old or the new version.
+
+    The text goes to a temporary file in the same directory, is flushed to
+    disk and then renamed over the target. A crash in between leaves the
+    previous file untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            # Keep the permissions of the file being replaced
+            os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+def load_yaml(path):
+    """Read a YAML file with the fastest available safe loader."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+def dump_yaml(data, path):
+    """Write data as YAML, atomically."""
+    write_atomic(path, yaml.dump(data, Dumper=SafeDumper, default_flow_style=False,
+                                 allow_unicode=True))
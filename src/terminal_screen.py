@@ -0,0 +1,656 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import unicodedata
+from array import array
+
+from .vt_parser import VTParser
+
+# Cell attributes are packed into one unsigned 32 bit integer:
+# bits 0-8 foreground, bits 9-17 background, bits 18+ style flags.
+# Colours 0-255 are xterm palette indexes, 256 is the default colour.
+DEFAULT_COLOR = 256
+FG_MASK = 0x1FF
+BG_SHIFT = 9
+BG_MASK = 0x1FF << BG_SHIFT
+
+BOLD = 1 << 18
+DIM = 1 << 19
+ITALIC = 1 << 20
+UNDERLINE = 1 << 21
+BLINK = 1 << 22
+REVERSE = 1 << 23
+INVISIBLE = 1 << 24
+STRIKE = 1 << 25
+
+DEFAULT_ATTR = DEFAULT_COLOR | (DEFAULT_COLOR << BG_SHIFT)
+
+# Placeholder stored in the cell to the right of a double width character
+WIDE_PLACEHOLDER = 0
+
+# Codec producing native-endian code points for array('I')
+_UTF32 = 'utf-32-le' if sys.byteorder == 'little' else 'utf-32-be'
+
+# SGR flag codes and the flags they set
+_SGR_SET = {1: BOLD, 2: DIM, 3: ITALIC, 4: UNDERLINE, 5: BLINK,
+            7: REVERSE, 8: INVISIBLE, 9: STRIKE}
+# SGR codes and the flags they clear
+_SGR_CLEAR = {21: BOLD | DIM, 22: BOLD | DIM, 23: ITALIC, 24: UNDERLINE,
+              25: BLINK, 27: REVERSE, 28: INVISIBLE, 29: STRIKE}
+
+# DEC special graphics (line drawing) character set
+_DEC_GRAPHICS = dict(zip(
+    map(ord, "`abcdefghijklmnopqrstuvwxyz{|}~"),
+    map(ord, "◆▒␉␌␍␊°±␤␋┘┐┌└┼⎺⎻─⎼⎽├┤┴┬│≤≥π≠£·")))
+
+def rgb_to_palette(r, g, b):
+    """Map a 24 bit colour to the closest entry of the xterm 256 colour cube."""
+    if r == g == b:
+        if r < 8:
+            return 16
+        if r > 248:
+            return 231
+        return 232 + (r - 8) * 24 // 247
+    return 16 + 36 * (r * 5 // 255) + 6 * (g * 5 // 255) + (b * 5 // 255)
+
+def cells_to_text(chars):
+    """Text stored in an array of cells, without wide character placeholders."""
+    return chars.tobytes().decode(_UTF32).replace('\x00', '')
+
+def trim_cells(chars, attrs):
+    """Drop trailing blank cells that use the default attributes."""
+    used = len(chars.tobytes().decode(_UTF32).rstrip(' '))
+    if used == len(chars) or attrs[used:].count(DEFAULT_ATTR) != len(attrs) - used:
+        return chars, attrs
+    return chars[:used], attrs[:used]
+
+def char_width(ch):
+    """Number of cells a character occupies (0, 1 or 2)."""
+    if unicodedata.combining(ch) or unicodedata.category(ch) in ('Mn', 'Me', 'Cf', 'Cc'):
+        return 0
+    if unicodedata.east_asian_width(ch) in ('W', 'F'):
+        return 2
+    return 1
+
+class TerminalScreen:
+    """Fixed size grid of character cells driven by a VT/xterm byte stream.
+
+    Each row is stored as two arrays of unsigned ints, one with code points
+    and one with packed attributes. Rows touched since the last call to
+    take_dirty() are tracked, and lines scrolled off the top of the primary
+    screen are moved to the scrollback.
+    """
+
+    def __init__(self, cols=80, rows=24, scrollback=None):
+        self.cols = cols
+        self.rows = rows
+        if scrollback is None:
+            # Imported here, the scrollback module depends on this one
+            from .scrollback import Scrollback
+            scrollback = Scrollback()
+        self.scrollback = scrollback
+        # Number of lines added to the scrollback since take_scrolled()
+        self.scrolled = 0
+        self.title = ""
+        # Called with bytes that have to be sent back to the host
+        self.reply = None
+        self.parser = VTParser(self)
+        self.reset()
+
+    # ===== Public interface =====
+    def feed(self, text):
+        """Process a piece of decoded output from the host."""
+        self.parser.feed(text)
+
+    def reset(self):
+        """Full terminal reset (RIS)."""
+        self.chars = [self._blank_chars() for _ in range(self.rows)]
+        self.attrs = [self._blank_attrs(DEFAULT_ATTR) for _ in range(self.rows)]
+        self.wrapped = bytearray(self.rows)
+        self.alt_buffer = None
+        self.cursor_x = 0
+        self.cursor_y = 0
+        self.wrap_pending = False
+        self.attr = DEFAULT_ATTR
+        self.scroll_top = 0
+        self.scroll_bottom = self.rows - 1
+        self.saved_cursor = None
+        self.autowrap = True
+        self.origin_mode = False
+        self.insert_mode = False
+        self.cursor_visible = True
+        self.app_cursor_keys = False
+        self.bracketed_paste = False
+        self.charsets = ['B', 'B']
+        self.active_charset = 0
+        self.dirty = set(range(self.rows))
+
+    def resize(self, cols, rows):
+        """Change the screen size, keeping as much content as possible."""
+        cols = max(1, cols)
+        rows = max(1, rows)
+        if cols == self.cols and rows == self.rows:
+            return
+
+        if cols != self.cols:
+            for buffers in self._all_buffers():
+                chars, attrs = buffers
+                for y in range(len(chars)):
+                    chars[y] = self._fit(chars[y], cols, ord(' '))
+                    attrs[y] = self._fit(attrs[y], cols, DEFAULT_ATTR)
+            self.cols = cols
+
+        if rows < self.rows:
+            # Push lines above the cursor into the scrollback first
+            excess = self.rows - rows
+            push = min(excess, self.cursor_y)
+            for _ in range(push):
+                if self.alt_buffer is None:
+                    self._push_scrollback(0)
+                del self.chars[0], self.attrs[0], self.wrapped[0]
+            del self.chars[rows:], self.attrs[rows:], self.wrapped[rows:]
+            self.cursor_y -= push
+        elif rows > self.rows:
+            extra = rows - self.rows
+            self.chars.extend(self._blank_chars() for _ in range(extra))
+            self.attrs.extend(self._blank_attrs(DEFAULT_ATTR) for _ in range(extra))
+            self.wrapped.extend(bytes(extra))
+
+        if self.alt_buffer is not None:
+            chars, attrs, wrapped = self.alt_buffer
+            del chars[rows:], attrs[rows:], wrapped[rows:]
+            while len(chars) < rows:
+                chars.append(self._blank_chars())
+                attrs.append(self._blank_attrs(DEFAULT_ATTR))
+                wrapped.append(0)
+
+        self.rows = rows
+        self.scroll_top = 0
+        self.scroll_bottom = rows - 1
+        self.cursor_x = min(self.cursor_x, cols - 1)
+        self.cursor_y = min(self.cursor_y, rows - 1)
+        self.wrap_pending = False
+        self.dirty = set(range(rows))
+
+    def take_dirty(self):
+        """Return the rows changed since the last call and reset tracking."""
+        dirty = self.dirty
+        self.dirty = set()
+        return dirty
+
+    def take_scrolled(self):
+        """Return the number of lines added to the scrollback since the last call."""
+        scrolled = min(self.scrolled, len(self.scrollback))
+        self.scrolled = 0
+        return scrolled
+
+    def line_text(self, y):
+        """Plain text of a screen row, without trailing blanks."""
+        return self._row_text(self.chars[y])
+
+    def scrollback_text(self, index):
+        """Plain text of a scrollback line (0 is the oldest)."""
+        return self._row_text(self.scrollback[index][0])
+
+    def text(self):
+        """Plain text of the whole screen."""
+        return "\n".join(self.line_text(y) for y in range(self.rows))
+
+    @property
+    def alt_screen(self):
+        return self.alt_buffer is not None
+
+    # ===== Parser callbacks =====
+    def draw(self, text):
+        if self.charsets[self.active_charset] == '0':
+            text = text.translate(_DEC_GRAPHICS)
+
+        if text.isascii():
+            self._put_text(text)
+            return
+
+        # Split into runs of single width characters
+        run = []
+        for ch in text:
+            width = char_width(ch)
+            if width == 1:
+                run.append(ch)
+                continue
+            if run:
+                self._put_text("".join(run))
+                run = []
+            if width == 2:
+                self._put_wide(ord(ch))
+        if run:
+            self._put_text("".join(run))
+
+    def execute(self, ch):
+        if ch == '\r':
+            self.cursor_x = 0
+            self.wrap_pending = False
+        elif ch in '\n\x0b\x0c':
+            self.index()
+        elif ch == '\x08':
+            if self.cursor_x > 0:
+                self.cursor_x -= 1
+            self.wrap_pending = False
+        elif ch == '\t':
+            self.cursor_x = min(self.cols - 1, (self.cursor_x // 8 + 1) * 8)
+            self.wrap_pending = False
+        elif ch == '\x0e':
+            self.active_charset = 1
+        elif ch == '\x0f':
+            self.active_charset = 0
+
+    def esc_dispatch(self, intermediates, final):
+        if intermediates:
+            if intermediates in '()' and len(intermediates) == 1:
+                self.charsets['()'.index(intermediates)] = final
+            return
+        if final == '7':
+            self.save_cursor()
+        elif final == '8':
+            self.restore_cursor()
+        elif final == 'D':
+            self.index()
+        elif final == 'E':
+            self.cursor_x = 0
+            self.index()
+        elif final == 'M':
+            self.reverse_index()
+        elif final == 'c':
+            self.reset()
+            self.alt_buffer = None
+
+    def osc_dispatch(self, data):
+        code, _, value = data.partition(';')
+        if code in ('0', '2'):
+            self.title = value
+
+    def csi_dispatch(self, params, private, intermediates, final):
+        if intermediates:
+            # DECSCUSR, DECSTR and friends are not supported
+            if intermediates == '!' and final == 'p':
+                self.attr = DEFAULT_ATTR
+                self.insert_mode = False
+                self.origin_mode = False
+                self.autowrap = True
+            return
+
+        if private == '?':
+            if final in 'hl':
+                for mode in params:
+                    self._set_private_mode(mode, final == 'h')
+            return
+        if private:
+            return
+
+        n = params[0] if params else 0
+        count = n or 1
+
+        if final == 'm':
+            self._select_graphic_rendition(params)
+        elif final == 'A':
+            self._move_cursor(self.cursor_x, max(self._top_limit(), self.cursor_y - count))
+        elif final in 'Be':
+            self._move_cursor(self.cursor_x, min(self._bottom_limit(), self.cursor_y + count))
+        elif final in 'Ca':
+            self._move_cursor(self.cursor_x + count, self.cursor_y)
+        elif final == 'D':
+            self._move_cursor(self.cursor_x - count, self.cursor_y)
+        elif final == 'E':
+            self._move_cursor(0, min(self._bottom_limit(), self.cursor_y + count))
+        elif final == 'F':
+            self._move_cursor(0, max(self._top_limit(), self.cursor_y - count))
+        elif final in 'G`':
+            self._move_cursor(count - 1, self.cursor_y)
+        elif final in 'Hf':
+            row = count
+            col = params[1] if len(params) > 1 and params[1] else 1
+            if self.origin_mode:
+                row += self.scroll_top
+            self._move_cursor(col - 1, row - 1)
+        elif final == 'd':
+            row = count + (self.scroll_top if self.origin_mode else 0)
+            self._move_cursor(self.cursor_x, row - 1)
+        elif final == 'I':
+            # Counts come from the host; more tab stops than columns change nothing
+            for _ in range(min(count, self.cols)):
+                self.execute('\t')
+        elif final == 'Z':
+            x = self.cursor_x
+            for _ in range(min(count, self.cols)):
+                x = max(0, (x - 1) // 8 * 8)
+            self._move_cursor(x, self.cursor_y)
+        elif final == 'J':
+            self._erase_display(n)
+        elif final == 'K':
+            self._erase_line(n)
+        elif final == 'X':
+            self._erase_cells(self.cursor_y, self.cursor_x, self.cursor_x + count)
+        elif final == '@':
+            self._insert_cells(count)
+        elif final == 'P':
+            self._delete_cells(count)
+        elif final == 'L':
+            if self.scroll_top <= self.cursor_y <= self.scroll_bottom:
+                self.scroll_down(count, self.cursor_y, self.scroll_bottom)
+                self.cursor_x = 0
+        elif final == 'M':
+            if self.scroll_top <= self.cursor_y <= self.scroll_bottom:
+                self.scroll_up(count, self.cursor_y, self.scroll_bottom)
+                self.cursor_x = 0
+        elif final == 'S':
+            self.scroll_up(count, self.scroll_top, self.scroll_bottom)
+        elif final == 'T':
+            self.scroll_down(count, self.scroll_top, self.scroll_bottom)
+        elif final == 'b':
+            if self.cursor_x > 0:
+                previous = self.chars[self.cursor_y][self.cursor_x - 1]
+                count = min(count, self.cols * self.rows)
+                codes = array('I', [previous]) * count
+                self._put(codes, 0, count)
+        elif final == 'r':
+            top = count - 1
+            bottom = (params[1] if len(params) > 1 and params[1] else self.rows) - 1
+            bottom = min(bottom, self.rows - 1)
+            if top < bottom:
+                self.scroll_top = top
+                self.scroll_bottom = bottom
+                self._move_cursor(0, top if self.origin_mode else 0)
+        elif final == 's':
+            self.save_cursor()
+        elif final == 'u':
+            self.restore_cursor()
+        elif final in 'hl':
+            if 4 in params:
+                self.insert_mode = final == 'h'
+        elif final == 'n':
+            if n == 6:
+                self._reply(f"\x1b[{self.cursor_y + 1};{self.cursor_x + 1}R")
+            elif n == 5:
+                self._reply("\x1b[0n")
+        elif final == 'c':
+            self._reply("\x1b[?1;2c")
+
+    # ===== Screen operations =====
+    def index(self):
+        """Move the cursor down one line, scrolling at the bottom margin."""
+        self.wrap_pending = False
+        if self.cursor_y == self.scroll_bottom:
+            self.scroll_up(1, self.scroll_top, self.scroll_bottom)
+        elif self.cursor_y < self.rows - 1:
+            self.cursor_y += 1
+
+    def reverse_index(self):
+        """Move the cursor up one line, scrolling at the top margin."""
+        self.wrap_pending = False
+        if self.cursor_y == self.scroll_top:
+            self.scroll_down(1, self.scroll_top, self.scroll_bottom)
+        elif self.cursor_y > 0:
+            self.cursor_y -= 1
+
+    def scroll_up(self, count, top, bottom):
+        """Scroll the region top..bottom up, discarding lines at the top."""
+        count = min(count, bottom - top + 1)
+        blank = self._erase_attr()
+        for _ in range(count):
+            if top == 0 and self.alt_buffer is None:
+                self._push_scrollback(0)
+            del self.chars[top], self.attrs[top], self.wrapped[top]
+            self.chars.insert(bottom, self._blank_chars())
+            self.attrs.insert(bottom, self._blank_attrs(blank))
+            self.wrapped.insert(bottom, 0)
+        if len(self.dirty) < self.rows:
+            self.dirty.update(range(top, bottom + 1))
+
+    def scroll_down(self, count, top, bottom):
+        """Scroll the region top..bottom down, discarding lines at the bottom."""
+        count = min(count, bottom - top + 1)
+        blank = self._erase_attr()
+        for _ in range(count):
+            del self.chars[bottom], self.attrs[bottom], self.wrapped[bottom]
+            self.chars.insert(top, self._blank_chars())
+            self.attrs.insert(top, self._blank_attrs(blank))
+            self.wrapped.insert(top, 0)
+        if len(self.dirty) < self.rows:
+            self.dirty.update(range(top, bottom + 1))
+
+    def save_cursor(self):
+        self.saved_cursor = (self.cursor_x, self.cursor_y, self.attr,
+                             self.origin_mode, list(self.charsets), self.active_charset)
+
+    def restore_cursor(self):
+        if self.saved_cursor is None:
+            self.cursor_x = self.cursor_y = 0
+            return
+        x, y, self.attr, self.origin_mode, charsets, self.active_charset = self.saved_cursor
+        self.charsets = list(charsets)
+        self._move_cursor(x, y)
+
+    # ===== Internal helpers =====
+    def _blank_chars(self):
+        return array('I', [32]) * self.cols
+
+    def _blank_attrs(self, attr):
+        return array('I', [attr]) * self.cols
+
+    @staticmethod
+    def _fit(row, cols, fill):
+        if len(row) > cols:
+            return row[:cols]
+        return row + array('I', [fill]) * (cols - len(row))
+
+    def _all_buffers(self):
+        yield self.chars, self.attrs
+        if self.alt_buffer is not None:
+            yield self.alt_buffer[0], self.alt_buffer[1]
+
+    @staticmethod
+    def _row_text(chars):
+        return cells_to_text(chars).rstrip(' ')
+
+    def _push_scrollback(self, y):
+        self.scrollback.append((self.chars[y], self.attrs[y], self.wrapped[y]))
+        self.scrolled += 1
+
+    def _erase_attr(self):
+        # Erased cells keep the current background colour only
+        return (self.attr & BG_MASK) | DEFAULT_COLOR
+
+    def _top_limit(self):
+        return self.scroll_top if self.cursor_y >= self.scroll_top else 0
+
+    def _bottom_limit(self):
+        return self.scroll_bottom if self.cursor_y <= self.scroll_bottom else self.rows - 1
+
+    def _move_cursor(self, x, y):
+        self.cursor_x = max(0, min(self.cols - 1, x))
+        self.cursor_y = max(0, min(self.rows - 1, y))
+        self.wrap_pending = False
+
+    def _reply(self, text):
+        if self.reply is not None:
+            self.reply(text.encode('ascii'))
+
+    def _wrap(self):
+        self.wrapped[self.cursor_y] = 1
+        self.cursor_x = 0
+        self.index()
+
+    def _put_text(self, text):
+        codes = array('I')
+        codes.frombytes(text.encode(_UTF32))
+        self._put(codes, 0, len(codes))
+
+    def _put(self, codes, start, end):
+        cols = self.cols
+        attr = self.attr
+        while start < end:
+            if self.wrap_pending:
+                self.wrap_pending = False
+                if self.autowrap:
+                    self._wrap()
+            y = self.cursor_y
+            x = self.cursor_x
+            n = min(end - start, cols - x)
+            chars = self.chars[y]
+            attrs = self.attrs[y]
+            if self.insert_mode:
+                chars[x + n:] = chars[x:cols - n]
+                attrs[x + n:] = attrs[x:cols - n]
+            chars[x:x + n] = codes[start:start + n]
+            attrs[x:x + n] = array('I', [attr]) * n
+            self.dirty.add(y)
+            start += n
+            x += n
+            if x >= cols:
+                self.cursor_x = cols - 1
+                self.wrap_pending = True
+                if not self.autowrap:
+                    # Without autowrap the rest overwrites the last column
+                    start = end
+            else:
+                self.cursor_x = x
+
+    def _put_wide(self, code):
+        if self.cols < 2:
+            return
+        if self.wrap_pending or self.cursor_x >= self.cols - 1:
+            self.wrap_pending = False
+            if self.autowrap:
+                self._wrap()
+            else:
+                self.cursor_x = self.cols - 2
+        self._put(array('I', [code, WIDE_PLACEHOLDER]), 0, 2)
+
+    def _erase_cells(self, y, start, end):
+        end = min(end, self.cols)
+        if start >= end:
+            return
+        n = end - start
+        self.chars[y][start:end] = array('I', [32]) * n
+        self.attrs[y][start:end] = array('I', [self._erase_attr()]) * n
+        self.dirty.add(y)
+
+    def _erase_line(self, mode):
+        y = self.cursor_y
+        if mode == 0:
+            self._erase_cells(y, self.cursor_x, self.cols)
+        elif mode == 1:
+            self._erase_cells(y, 0, self.cursor_x + 1)
+        elif mode == 2:
+            self._erase_cells(y, 0, self.cols)
+        self.wrapped[y] = 0
+
+    def _erase_display(self, mode):
+        if mode == 0:
+            self._erase_line(0)
+            rows = range(self.cursor_y + 1, self.rows)
+        elif mode == 1:
+            self._erase_line(1)
+            rows = range(0, self.cursor_y)
+        elif mode == 2:
+            rows = range(self.rows)
+        elif mode == 3:
+            self.scrollback.clear()
+            self.scrolled = 0
+            return
+        else:
+            return
+        for y in rows:
+            self._erase_cells(y, 0, self.cols)
+            self.wrapped[y] = 0
+
+    def _insert_cells(self, count):
+        y, x = self.cursor_y, self.cursor_x
+        count = min(count, self.cols - x)
+        chars, attrs = self.chars[y], self.attrs[y]
+        chars[x + count:] = chars[x:self.cols - count]
+        attrs[x + count:] = attrs[x:self.cols - count]
+        self._erase_cells(y, x, x + count)
+
+    def _delete_cells(self, count):
+        y, x = self.cursor_y, self.cursor_x
+        count = min(count, self.cols - x)
+        chars, attrs = self.chars[y], self.attrs[y]
+        chars[x:self.cols - count] = chars[x + count:]
+        attrs[x:self.cols - count] = attrs[x + count:]
+        self._erase_cells(y, self.cols - count, self.cols)
+
+    def _set_private_mode(self, mode, enable):
+        if mode == 1:
+            self.app_cursor_keys = enable
+        elif mode == 6:
+            self.origin_mode = enable
+            self._move_cursor(0, self.scroll_top if enable else 0)
+        elif mode == 7:
+            self.autowrap = enable
+        elif mode == 25:
+            self.cursor_visible = enable
+            self.dirty.add(self.cursor_y)
+        elif mode == 2004:
+            self.bracketed_paste = enable
+        elif mode in (47, 1047, 1049):
+            if mode == 1049 and enable:
+                self.save_cursor()
+            self._switch_alt_screen(enable)
+            if mode == 1049 and not enable:
+                self.restore_cursor()
+
+    def _switch_alt_screen(self, enable):
+        if enable == (self.alt_buffer is not None):
+            return
+        if enable:
+            self.alt_buffer = (self.chars, self.attrs, self.wrapped)
+            self.chars = [self._blank_chars() for _ in range(self.rows)]
+            self.attrs = [self._blank_attrs(DEFAULT_ATTR) for _ in range(self.rows)]
+            self.wrapped = bytearray(self.rows)
+        else:
+            self.chars, self.attrs, self.wrapped = self.alt_buffer
+            self.alt_buffer = None
+        self.scroll_top = 0
+        self.scroll_bottom = self.rows - 1
+        self.dirty = set(range(self.rows))
+
+    def _select_graphic_rendition(self, params):
+        if not params:
+            params = [0]
+        attr = self.attr
+        i = 0
+        while i < len(params):
+            code = params[i]
+            if code == 0:
+                attr = DEFAULT_ATTR
+            elif code in _SGR_SET:
+                attr |= _SGR_SET[code]
+            elif code in _SGR_CLEAR:
+                attr &= ~_SGR_CLEAR[code]
+            elif 30 <= code <= 37:
+                attr = (attr & ~FG_MASK) | (code - 30)
+            elif 90 <= code <= 97:
+                attr = (attr & ~FG_MASK) | (code - 90 + 8)
+            elif code == 39:
+                attr = (attr & ~FG_MASK) | DEFAULT_COLOR
+            elif 40 <= code <= 47:
+                attr = (attr & ~BG_MASK) | ((code - 40) << BG_SHIFT)
+            elif 100 <= code <= 107:
+                attr = (attr & ~BG_MASK) | ((code - 100 + 8) << BG_SHIFT)
+            elif code == 49:
+                attr = (attr & ~BG_MASK) | (DEFAULT_COLOR << BG_SHIFT)
+            elif code in (38, 48) and i + 1 < len(params):
+                color = None
+                if params[i + 1] == 5 and i + 2 < len(params):
+                    color = params[i + 2] & 0xFF
+                    i += 2
+                elif params[i + 1] == 2 and i + 4 < len(params):
+                    color = rgb_to_palette(*(min(255, p) for p in params[i + 2:i + 5]))
+                    i += 4
+                if color is not None:
+                    if code == 38:
+                        attr = (attr & ~FG_MASK) | color
+                    else:
+                        attr = (attr & ~BG_MASK) | (color << BG_SHIFT)
+            i += 1
+        self.attr = attr
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import QWidget, QScrollBar, QApplication, QSizePolicy
+from PyQt5.QtCore import Qt, QRect, pyqtSignal
+from PyQt5.QtGui import QPainter, QColor, QFont, QFontMetrics, QPixmap
+
+from .key_input import key_to_bytes
+from .terminal_screen import (DEFAULT_COLOR, FG_MASK, BG_SHIFT, BOLD, DIM, ITALIC,
+                              UNDERLINE, REVERSE, INVISIBLE, STRIKE, WIDE_PLACEHOLDER,
+                              cells_to_text)
+
+# Style flags that change how a glyph is drawn
+GLYPH_FLAGS = BOLD | DIM | ITALIC | UNDERLINE | STRIKE
+
+# Colour indexes used for the default foreground and background
+DEFAULT_FG = DEFAULT_COLOR
+DEFAULT_BG = DEFAULT_COLOR + 1
+
+SELECTION_COLOR = QColor(255, 255, 255, 90)
+
+# Glyph pixmaps kept per view; the least recently used go first
+GLYPH_CACHE_SIZE = 4096
+
+def build_palette():
+    """Return the xterm 256 colour palette as a list of QColor."""
+    base = ["#000000", "#CD0000", "#00CD00", "#CDCD00", "#0000EE", "#CD00CD", "#00CDCD", "#E5E5E5",
+            "#7F7F7F", "#FF0000", "#00FF00", "#FFFF00", "#5C5CFF", "#FF00FF", "#00FFFF", "#FFFFFF"]
+    palette = [QColor(color) for color in base]
+    levels = [0, 95, 135, 175, 215, 255]
+    for r in levels:
+        for g in levels:
+            for b in levels:
+                palette.append(QColor(r, g, b))
+    for i in range(24):
+        level = 8 + i * 10
+        palette.append(QColor(level, level, level))
+    return palette
+
+# xterm palette followed by the default foreground and background
+COLORS = build_palette() + [QColor("#FFFFFF"), QColor("#000000")]
+
+class TerminalView(QWidget):
+    """Paints a TerminalScreen as a monospace cell grid.
+
+    Glyphs are rendered once per (character, colour, style, width) into
+    pixmaps and reused, up to GLYPH_CACHE_SIZE of them. refresh() only
+    schedules repaints for rows the screen reports as changed, so painting
+    cost follows the changed area, not the history size.
+    """
+
+    # Emitted with (cols, rows) when the visible grid size changes
+    size_changed = pyqtSignal(int, int)
+    # Bytes typed or pasted while raw_input is on
+    key_input = pyqtSignal(bytes)
+    # Clipboard contents pasted while raw_input is on, possibly large
+    paste_input = pyqtSignal(bytes)
+
+    def __init__(self, screen, parent=None):
+        super().__init__(parent)
+        self.screen = screen
+        self.glyph_cache = OrderedDict()
+        # Number of lines the view is scrolled back into the history
+        self.scroll_offset = 0
+        self.cursor_row = -1
+        self.selection = None
+        self._selecting = False
+        # Send key presses to the session instead of using a line editor
+        self.raw_input = False
+        # Called after every paint, used for the session metrics
+        self.paint_callback = None
+
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setCursor(Qt.IBeamCursor)
+
+        self.scrollbar = QScrollBar(Qt.Vertical, self)
+        self.scrollbar.setRange(0, 0)
+        self.scrollbar.valueChanged.connect(self.on_scrollbar_moved)
+
+        font = QFont("Courier New", 10)
+        font.setStyleHint(QFont.Monospace)
+        font.setFixedPitch(True)
+        self.set_terminal_font(font)
+
+    # ===== Font and glyph cache =====
+    def set_terminal_font(self, font):
+        """Change the font and drop every cached glyph."""
+        self.fonts = {}
+        for flags in (0, BOLD, ITALIC, BOLD | ITALIC):
+            variant = QFont(font)
+            variant.setBold(bool(flags & BOLD))
+            variant.setItalic(bool(flags & ITALIC))
+            self.fonts[flags] = variant
+        metrics = QFontMetrics(font)
+        self.cell_width = max(1, metrics.horizontalAdvance("M"))
+        self.cell_height = max(1, metrics.height())
+        self.ascent = metrics.ascent()
+        self.glyph_cache.clear()
+        self.update_grid_size()
+        self.update()
+
+    def glyph(self, code, color, flags, width):
+        """Return the cached pixmap for a character drawn in a colour and style."""
+        key = (code, color, flags, width)
+        cache = self.glyph_cache
+        pixmap = cache.get(key)
+        if pixmap is not None:
+            cache.move_to_end(key)
+            return pixmap
+
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.cell_width * width * ratio), int(self.cell_height * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+
+        foreground = COLORS[color]
+        if flags & DIM:
+            foreground = foreground.darker(150)
+
+        painter = QPainter(pixmap)
+        painter.setFont(self.fonts[flags & (BOLD | ITALIC)])
+        painter.setPen(foreground)
+        painter.drawText(0, self.ascent, chr(code))
+        if flags & UNDERLINE:
+            painter.drawLine(0, self.ascent + 1, self.cell_width * width - 1, self.ascent + 1)
+        if flags & STRIKE:
+            middle = self.cell_height // 2
+            painter.drawLine(0, middle, self.cell_width * width - 1, middle)
+        painter.end()
+
+        cache[key] = pixmap
+        if len(cache) > GLYPH_CACHE_SIZE:
+            cache.popitem(last=False)
+        return pixmap
+
+    # ===== Screen updates =====
+    def refresh(self):
+        """Schedule a repaint of the rows changed since the last refresh."""
+        screen = self.screen
+        scrolled = screen.take_scrolled()
+        dirty = screen.take_dirty()
+        self.update_scrollbar()
+
+        if self.scroll_offset:
+            # Keep the history the user is reading in place
+            if scrolled:
+                self.scroll_offset = min(len(screen.scrollback), self.scroll_offset + scrolled)
+                self.update_scrollbar()
+            return
+
+        if screen.cursor_y != self.cursor_row:
+            dirty.add(screen.cursor_y)
+            if 0 <= self.cursor_row < screen.rows:
+                dirty.add(self.cursor_row)
+            self.cursor_row = screen.cursor_y
+        else:
+            # The cursor may have moved along the row
+            dirty.add(screen.cursor_y)
+
+        width = self.grid_width()
+        start = None
+        previous = None
+        for row in sorted(dirty):
+            if start is not None and row == previous + 1:
+                previous = row
+                continue
+            if start is not None:
+                self.update(QRect(0, start * self.cell_height, width,
+                                  (previous - start + 1) * self.cell_height))
+            start = previous = row
+        if start is not None:
+            self.update(QRect(0, start * self.cell_height, width,
+                              (previous - start + 1) * self.cell_height))
+
+    def grid_width(self):
+        return self.width() - self.scrollbar.width()
+
+    def update_grid_size(self):
+        cols = max(2, self.grid_width() // self.cell_width)
+        rows = max(2, self.height() // self.cell_height)
+        if (cols, rows) != (self.screen.cols, self.screen.rows):
+            self.screen.resize(cols, rows)
+            self.cursor_row = -1
+            self.size_changed.emit(cols, rows)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        history = len(self.screen.scrollback)
+        self.scroll_offset = min(self.scroll_offset, history)
+        self.scrollbar.blockSignals(True)
+        self.scrollbar.setRange(0, history)
+        self.scrollbar.setPageStep(self.screen.rows)
+        self.scrollbar.setValue(history - self.scroll_offset)
+        self.scrollbar.blockSignals(False)
+
+    def on_scrollbar_moved(self, value):
+        history = len(self.screen.scrollback)
+        self.scroll_offset = max(0, min(history, history - value))
+        self.update()
+
+    def scroll_to_bottom(self):
+        if self.scroll_offset:
+            self.scroll_offset = 0
+            self.update_scrollbar()
+            self.update()
+
+    def line_at(self, row):
+        """Return (chars, attrs) of the line shown on a view row."""
+        screen = self.screen
+        history = len(screen.scrollback)
+        index = history - min(self.scroll_offset, history) + row
+        if index < history:
+            line = screen.scrollback[index]
+            return line[0], line[1]
+        index -= history
+        if index < screen.rows:
+            return screen.chars[index], screen.attrs[index]
+        return None, None
+
+    # ===== Painting =====
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        area = event.rect()
+        # The scrollback budget may have trimmed this history for another tab
+        if self.scroll_offset > len(self.screen.scrollback):
+            self.update_scrollbar()
+        cell_width = self.cell_width
+        cell_height = self.cell_height
+        first = max(0, area.top() // cell_height)
+        last = min(self.screen.rows - 1, area.bottom() // cell_height)
+
+        painter.fillRect(area, COLORS[DEFAULT_BG])
+        for row in range(first, last + 1):
+            chars, attrs = self.line_at(row)
+            if chars is not None:
+                self.paint_row(painter, row * cell_height, chars, attrs)
+
+        self.paint_selection(painter, first, last)
+
+        screen = self.screen
+        if (self.scroll_offset == 0 and screen.cursor_visible
+                and first <= screen.cursor_y <= last):
+            self.paint_cursor(painter)
+        painter.end()
+        if self.paint_callback is not None:
+            self.paint_callback()
+
+    def paint_row(self, painter, top, chars, attrs):
+        cell_width = self.cell_width
+        cell_height = self.cell_height
+        count = min(len(chars), self.screen.cols)
+        glyphs = []
+
+        # Backgrounds are filled in runs of equal colour
+        run_start = 0
+        run_background = DEFAULT_BG
+        for x in range(count):
+            attr = attrs[x]
+            foreground = attr & FG_MASK
+            background = attr >> BG_SHIFT & FG_MASK
+            if background == DEFAULT_COLOR:
+                background = DEFAULT_BG
+            if attr & BOLD and foreground < 8:
+                foreground += 8
+            if attr & REVERSE:
+                foreground, background = background, foreground
+            if background != run_background:
+                if run_background != DEFAULT_BG:
+                    painter.fillRect(run_start * cell_width, top, (x - run_start) * cell_width,
+                                     cell_height, COLORS[run_background])
+                run_start = x
+                run_background = background
+
+            code = chars[x]
+            if code == WIDE_PLACEHOLDER or attr & INVISIBLE:
+                continue
+            if code != 32 or attr & (UNDERLINE | STRIKE):
+                glyphs.append((x, code, foreground, attr & GLYPH_FLAGS))
+        if run_background != DEFAULT_BG:
+            painter.fillRect(run_start * cell_width, top, (count - run_start) * cell_width,
+                             cell_height, COLORS[run_background])
+
+        # Glyphs come from the cache
+        for x, code, foreground, flags in glyphs:
+            width = 2 if x + 1 < count and chars[x + 1] == WIDE_PLACEHOLDER else 1
+            painter.drawPixmap(x * cell_width, top, self.glyph(code, foreground, flags, width))
+
+    def paint_cursor(self, painter):
+        screen = self.screen
+        x, y = screen.cursor_x, screen.cursor_y
+        cursor = QRect(x * self.cell_width, y * self.cell_height, self.cell_width, self.cell_height)
+        if not self.hasFocus():
+            painter.setPen(COLORS[DEFAULT_FG])
+            painter.drawRect(cursor.adjusted(0, 0, -1, -1))
+            return
+        painter.fillRect(cursor, COLORS[DEFAULT_FG])
+        code = screen.chars[y][x]
+        if code not in (32, WIDE_PLACEHOLDER):
+            flags = screen.attrs[y][x] & GLYPH_FLAGS
+            painter.drawPixmap(cursor.topLeft(), self.glyph(code, DEFAULT_BG, flags, 1))
+
+    # ===== Selection =====
+    def position_at(self, point):
+        """Absolute (line, column) for a point in the widget."""
+        row = max(0, min(self.screen.rows - 1, point.y() // self.cell_height))
+        col = max(0, min(self.screen.cols, point.x() // self.cell_width))
+        return len(self.screen.scrollback) - self.scroll_offset + row, col
+
+    def paint_selection(self, painter, first, last):
+        if not self.selection:
+            return
+        (start_line, start_col), (end_line, end_col) = sorted(self.selection)
+        top = len(self.screen.scrollback) - self.scroll_offset
+        for row in range(first, last + 1):
+            line = top + row
+            if line < start_line or line > end_line:
+                continue
+            left = start_col if line == start_line else 0
+            right = end_col if line == end_line else self.screen.cols
+            if right > left:
+                painter.fillRect(left * self.cell_width, row * self.cell_height,
+                                 (right - left) * self.cell_width, self.cell_height, SELECTION_COLOR)
+
+    def selected_text(self):
+        """Return the selected text with wrapped lines joined."""
+        if not self.selection:
+            return ""
+        screen = self.screen
+        history = len(screen.scrollback)
+        (start_line, start_col), (end_line, end_col) = sorted(self.selection)
+        parts = []
+        for line in range(start_line, end_line + 1):
+            if line < history:
+                chars, _, wrapped = screen.scrollback[line]
+            elif line - history < screen.rows:
+                chars, wrapped = screen.chars[line - history], screen.wrapped[line - history]
+            else:
+                break
+            left = start_col if line == start_line else 0
+            right = end_col if line == end_line else len(chars)
+            text = cells_to_text(chars[left:right])
+            parts.append(text if wrapped and line != end_line else text.rstrip(' '))
+            if not wrapped and line != end_line:
+                parts.append("\n")
+        return "".join(parts)
+
+    def copy_selection(self):
+        text = self.selected_text()
+        if text:
+            QApplication.clipboard().setText(text)
+
+    def paste_clipboard(self):
+        text = QApplication.clipboard().text()
+        if not text:
+            return
+        data = text.replace("\r\n", "\r").replace("\n", "\r").encode('utf-8')
+        if self.screen.bracketed_paste:
+            data = b"\x1b[200~" + data + b"\x1b[201~"
+        self.paste_input.emit(data)
+
+    # ===== Qt events =====
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        width = self.scrollbar.sizeHint().width()
+        self.scrollbar.setGeometry(self.width() - width, 0, width, self.height())
+        self.update_grid_size()
+
+    def wheelEvent(self, event):
+        lines = -event.angleDelta().y() // 40
+        if lines:
+            history = len(self.screen.scrollback)
+            self.scroll_offset = max(0, min(history, self.scroll_offset - lines))
+            self.update_scrollbar()
+            self.update()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            position = self.position_at(event.pos())
+            self.selection = [position, position]
+            self._selecting = True
+            self.update()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._selecting:
+            self.selection[1] = self.position_at(event.pos())
+            self.update()
+
+    def mouseReleaseEvent(self, event):
+        if self._selecting:
+            self._selecting = False
+            if self.selection[0] == self.selection[1]:
+                self.selection = None
+            else:
+                self.copy_selection()
+            self.update()
+
+    def keyPressEvent(self, event):
+        if not self.raw_input:
+            super().keyPressEvent(event)
+            return
+        modifiers = event.modifiers()
+        if modifiers & Qt.ControlModifier and modifiers & Qt.ShiftModifier:
+            # Ctrl+Shift+C and Ctrl+Shift+V stay with the clipboard
+            if event.key() == Qt.Key_C:
+                self.copy_selection()
+                return
+            if event.key() == Qt.Key_V:
+                self.paste_clipboard()
+                return
+        data = key_to_bytes(event.key(), modifiers, event.text(), self.screen.app_cursor_keys)
+        if data:
+            self.scroll_to_bottom()
+            self.key_input.emit(data)
+
+    def focusNextPrevChild(self, forward):
+        # Tab and Shift+Tab belong to the remote shell in raw mode
+        if self.raw_input:
+            return False
+        return super().focusNextPrevChild(forward)
+
+    def focusInEvent(self, event):
+        super().focusInEvent(event)
+        self.update()
+
+    def focusOutEvent(self, event):
+        super().focusOutEvent(event)
+        self.update()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import itertools
+import os
+import threading
+
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTreeWidget, QTreeWidgetItem,
+                            QPushButton, QProgressBar)
+from PyQt5.QtCore import Qt, pyqtSignal
+
+from .sftp_transfer import Transfer
+
+def format_bytes(count):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(count) < 1024 or unit == "GB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024.0
+
+class TransferPanel(QWidget):
+    """SFTP uploads and downloads with live progress and throughput.
+
+    Every transfer runs on its own thread on the connection's pooled
+    transport. Cancelled or failed transfers can be resumed; they continue
+    from the offsets reached before.
+    """
+    transfer_progress = pyqtSignal(int, object, object, float)
+    transfer_finished = pyqtSignal(int, dict)
+
+    def __init__(self, settings, transport_pool, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        self.transport_pool = transport_pool
+        self.transfers = {}
+        self.transfer_ids = itertools.count(1)
+
+        # Emitted from the transfer threads, delivered on the GUI thread
+        self.transfer_progress.connect(self.on_progress)
+        self.transfer_finished.connect(self.on_finished)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.transfers_tree = QTreeWidget()
+        self.transfers_tree.setHeaderLabels(["File", "Host", "Progress", "Rate", "Status"])
+        self.transfers_tree.setRootIsDecorated(False)
+        self.transfers_tree.setColumnWidth(0, 260)
+        self.transfers_tree.setColumnWidth(2, 200)
+        layout.addWidget(self.transfers_tree)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch()
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_selected)
+        self.resume_button = QPushButton("Resume")
+        self.resume_button.clicked.connect(self.resume_selected)
+        self.clear_button = QPushButton("Clear Finished")
+        self.clear_button.clicked.connect(self.clear_finished)
+        buttons_layout.addWidget(self.cancel_button)
+        buttons_layout.addWidget(self.resume_button)
+        buttons_layout.addWidget(self.clear_button)
+        layout.addLayout(buttons_layout)
+
+    def start(self, connection, direction, local_path, remote_path, item=None):
+        """Start a transfer; direction is "download" or "upload"."""
+        transfer_id = next(self.transfer_ids)
+        transfer = Transfer(
+            connection, direction, local_path, remote_path, self.transport_pool,
+            streams=self.settings.get("sftp_streams"),
+            max_requests=self.settings.get("sftp_requests"),
+            on_progress=lambda done, total, rate: self.transfer_progress.emit(transfer_id, done, total, rate))
+        if item is None:
+            item = QTreeWidgetItem(self.transfers_tree)
+            arrow = "↓" if direction == "download" else "↑"
+            item.setText(0, f"{arrow} {os.path.basename(remote_path if direction == 'download' else local_path)}")
+            item.setToolTip(0, f"{local_path} {'←' if direction == 'download' else '→'} {remote_path}")
+            item.setText(1, connection["name"])
+            bar = QProgressBar()
+            bar.setRange(0, 1000)
+            self.transfers_tree.setItemWidget(item, 2, bar)
+        item.setData(0, Qt.UserRole, transfer_id)
+        item.setText(3, "")
+        item.setText(4, "Starting")
+        self.transfers[transfer_id] = {"transfer": transfer, "item": item, "result": None}
+        threading.Thread(target=self._run, args=(transfer_id, transfer),
+                         name="sshworks-transfer", daemon=True).start()
+        return transfer_id
+
+    def _run(self, transfer_id, transfer):
+        result = transfer.run()
+        self.transfer_finished.emit(transfer_id, result)
+
+    def selected(self):
+        item = self.transfers_tree.currentItem()
+        return self.transfers.get(item.data(0, Qt.UserRole)) if item else None
+
+    def on_progress(self, transfer_id, done, total, rate):
+        entry = self.transfers.get(transfer_id)
+        if entry is None or entry["result"] is not None:
+            return
+        item = entry["item"]
+        bar = self.transfers_tree.itemWidget(item, 2)
+        bar.setValue(int(1000 * done / total) if total else 0)
+        bar.setFormat(f"{format_bytes(done)} / {format_bytes(total)}")
+        item.setText(3, f"{format_bytes(rate)}/s")
+        item.setText(4, "Running")
+
+    def on_finished(self, transfer_id, result):
+        entry = self.transfers.get(transfer_id)
+        if entry is None:
+            return
+        entry["result"] = result
+        item = entry["item"]
+        item.setText(3, f"{format_bytes(result['rate'])}/s")
+        if result["error"]:
+            item.setText(4, result["error"])
+        else:
+            self.transfers_tree.itemWidget(item, 2).setValue(1000)
+            item.setText(4, f"Done in {result['duration']:.1f} s")
+
+    def cancel_selected(self):
+        entry = self.selected()
+        if entry is not None and entry["result"] is None:
+            entry["transfer"].cancel()
+
+    def cancel_all(self):
+        for entry in self.transfers.values():
+            if entry["result"] is None:
+                entry["transfer"].cancel()
+
+    def resume_selected(self):
+        entry = self.selected()
+        if entry is None or entry["result"] is None or not entry["result"]["error"]:
+            return
+        transfer = entry["transfer"]
+        del self.transfers[entry["item"].data(0, Qt.UserRole)]
+        self.start(transfer.connection, transfer.direction, transfer.local_path,
+                   transfer.remote_path, entry["item"])
+
+    def clear_finished(self):
+        for transfer_id, entry in list(self.transfers.items()):
+            if entry["result"] is not None:
+                index = self.transfers_tree.indexOfTopLevelItem(entry["item"])
+                self.transfers_tree.takeTopLevelItem(index)
+                del self.transfers[transfer_id]
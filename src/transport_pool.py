@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from collections import deque
+
+import paramiko
+from paramiko.common import cMSG_GLOBAL_REQUEST
+from paramiko.message import Message
+
+# Most jump hosts a connection may go through
+MAX_JUMPS = 8
+
+# Seconds a keepalive probe waits for the server's reply
+PROBE_TIMEOUT = 5.0
+
+def parse_jump(spec, default_user):
+    """A connection dict from a ProxyJump entry such as "user@host:port"."""
+    text = spec.strip()
+    if text.startswith("ssh://"):
+        text = text[len("ssh://"):]
+    username, _, hostport = text.rpartition("@")
+    port = 22
+    if hostport.startswith("["):
+        # [IPv6]:port
+        host, _, rest = hostport[1:].partition("]")
+        if rest.startswith(":"):
+            port = int(rest[1:])
+    elif hostport.count(":") == 1:
+        host, port_text = hostport.split(":")
+        port = int(port_text)
+    else:
+        host = hostport
+    return {"name": spec, "host": host, "port": port, "username": username or default_user}
+
+class TimedSSHClient(paramiko.SSHClient):
+    """SSHClient that notes when authentication starts and ends."""
+
+    auth_started = None
+    auth_finished = None
+
+    def _auth(self, *args, **kwargs):
+        self.auth_started = time.perf_counter()
+        try:
+            return super()._auth(*args, **kwargs)
+        finally:
+            self.auth_finished = time.perf_counter()
+
+class TimedTransport(paramiko.Transport):
+    """Transport that can time a global request without blocking on it.
+
+    paramiko keeps one completion event per transport for requests that
+    want a reply, so a probe running next to request_port_forward would
+    take its reply. Here every request wanting a reply is queued and the
+    replies, which the server sends in request order, are matched to them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reply_lock = threading.Lock()
+        # Probe events, or None for paramiko's own requests, oldest first
+        self.reply_waiters = deque()
+
+    def global_request(self, kind, data=None, wait=True):
+        if not wait:
+            return super().global_request(kind, data, wait)
+        self.completion_event = threading.Event()
+        self._send_global_request(kind, data, None)
+        while True:
+            self.completion_event.wait(0.1)
+            if not self.active:
+                return None
+            if self.completion_event.is_set():
+                break
+        return self.global_response
+
+    def probe(self, kind, timeout):
+        """Seconds until the server answers a request, or None on timeout."""
+        event = threading.Event()
+        started = self._send_global_request(kind, None, event)
+        if not event.wait(timeout):
+            return None
+        return time.perf_counter() - started
+
+    def _send_global_request(self, kind, data, waiter):
+        message = Message()
+        message.add_byte(cMSG_GLOBAL_REQUEST)
+        message.add_string(kind)
+        message.add_boolean(True)
+        if data is not None:
+            message.add(*data)
+        # Queued and sent together so the queue stays in request order
+        with self.reply_lock:
+            self.reply_waiters.append(waiter)
+            started = time.perf_counter()
+            self._send_user_message(message)
+        return started
+
+    def _parse_request_success(self, m):
+        if self._probe_answered():
+            super()._parse_request_success(m)
+
+    def _parse_request_failure(self, m):
+        if self._probe_answered():
+            super()._parse_request_failure(m)
+
+    def _probe_answered(self):
+        """Hand a reply to its probe; False if it belongs to a probe."""
+        with self.reply_lock:
+            waiter = self.reply_waiters.popleft() if self.reply_waiters else None
+        if waiter is None:
+            return True
+        waiter.set()
+        return False
+
+class PooledTransport:
+    """A transport shared by every user of the same host, port and user."""
+
+    def __init__(self, key):
+        self.key = key
+        self.client = None
+        self.refs = 0
+        self.error = None
+        self.ready = threading.Event()
+        self.idle_timer = None
+        # Transport of the jump host this one is tunnelled through
+        self.via = None
+        # Kept open for warm_ttl seconds instead of idle_timeout when unused
+        self.warm = False
+        self.last_used = time.monotonic()
+        # Seconds spent on TCP connect plus key exchange, and on authentication
+        self.handshake_time = None
+        self.auth_time = None
+        # Last keepalive round trip in seconds and when it was measured
+        self.rtt = None
+        self.rtt_at = 0.0
+        self.probe_lock = threading.Lock()
+
+    @property
+    def transport(self):
+        return self.client.get_transport() if self.client else None
+
+    def is_active(self):
+        transport = self.transport
+        return transport is not None and transport.is_active()
+
+class TransportPool:
+    """Pool of authenticated SSH transports keyed by (host, port, username).
+
+    The first acquire() for a key connects and authenticates; later calls
+    reuse the same transport to open new channels. Transports are reference
+    counted and closed once they have been unused for idle_timeout seconds.
+
+    prewarm() connects in the background ahead of time. Up to warm_size
+    unused warm transports are kept for warm_ttl seconds, the least recently
+    used are closed first. Every transport sends a keepalive every
+    keepalive seconds so VPNs and NAT gateways do not drop it while idle.
+
+    Connections listing "jump_hosts" are reached through a direct-tcpip
+    channel of the last jump host's transport, which is itself a pooled
+    transport. Every target behind the same bastion therefore shares one
+    bastion login. Jump hosts are saved connection names, looked up with
+    resolve(name), or "[user@]host[:port]" specs.
+    """
+
+    def __init__(self, idle_timeout=60, keepalive=0, warm_size=0, warm_ttl=600, resolve=None):
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self.warm_size = warm_size
+        self.warm_ttl = warm_ttl
+        self.resolve = resolve or (lambda name: None)
+        # Reentrant: dropping a transport releases the jump host it went through
+        self.lock = threading.RLock()
+        self.entries = {}
+        # Keys this thread is connecting, to catch jump hosts that loop
+        self.connecting = threading.local()
+
+    @staticmethod
+    def key_for(connection):
+        return (connection['host'], int(connection['port']), connection['username'],
+                tuple(connection.get('jump_hosts') or ()))
+
+    def jump_connection(self, connection):
+        """The connection for the last jump host, carrying the hops before it."""
+        jumps = list(connection.get('jump_hosts') or [])
+        if len(jumps) > MAX_JUMPS:
+            raise paramiko.SSHException(f"More than {MAX_JUMPS} jump hosts")
+        spec = jumps[-1]
+        saved = self.resolve(spec)
+        if saved is not None:
+            via = dict(saved)
+            # A saved jump host's own jump hosts come first
+            via['jump_hosts'] = jumps[:-1] + list(saved.get('jump_hosts') or [])
+        else:
+            via = parse_jump(spec, connection['username'])
+            via['jump_hosts'] = jumps[:-1]
+        return via
+
+    def acquire(self, connection, timeout=10):
+        """Return an active transport for the connection, connecting if needed."""
+        key = self.key_for(connection)
+        if key in getattr(self.connecting, 'keys', ()):
+            raise paramiko.SSHException(f"Jump hosts of {connection['host']} form a loop")
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.ready.is_set() and not entry.is_active():
+                # Dead or failed transport, start over
+                self._discard(entry)
+                entry = None
+            if entry is None:
+                entry = PooledTransport(key)
+                self.entries[key] = entry
+                owner = True
+            else:
+                owner = False
+            entry.refs += 1
+            entry.last_used = time.monotonic()
+            if entry.idle_timer is not None:
+                entry.idle_timer.cancel()
+                entry.idle_timer = None
+
+        if owner:
+            self._connect(entry, connection, timeout)
+        else:
+            # Another caller is already connecting to the same host
+            entry.ready.wait(timeout)
+
+        if entry.error is not None or not entry.is_active():
+            self._release_entry(entry)
+            raise entry.error or paramiko.SSHException("Transport is not active")
+        return entry.transport
+
+    def release(self, transport):
+        """Drop one reference; the transport closes after idle_timeout unused seconds."""
+        with self.lock:
+            entry = next((e for e in self.entries.values() if e.transport is transport), None)
+        if entry is not None:
+            self._release_entry(entry)
+        elif transport is not None:
+            # Already dropped from the pool (replaced after it died)
+            transport.close()
+
+    def _release_entry(self, entry):
+        with self.lock:
+            entry.refs = max(0, entry.refs - 1)
+            if entry.refs:
+                return
+            entry.last_used = time.monotonic()
+            if not entry.is_active():
+                self._discard(entry)
+                return
+            self._schedule_close(entry)
+            self._trim_warm()
+
+    def prewarm(self, connection, timeout=10):
+        """Connect in the background so a later acquire() finds a ready transport.
+
+        An existing transport is marked warm instead. Returns False when the
+        warm pool is disabled.
+        """
+        if self.warm_size <= 0:
+            return False
+        key = self.key_for(connection)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.ready.is_set() and not entry.is_active():
+                self._discard(entry)
+                entry = None
+            if entry is not None:
+                entry.warm = True
+                if entry.refs == 0 and entry.ready.is_set():
+                    self._schedule_close(entry)
+                return True
+            entry = PooledTransport(key)
+            entry.warm = True
+            self.entries[key] = entry
+            self._trim_warm()
+        threading.Thread(target=self._prewarm, args=(entry, connection, timeout),
+                         name="sshworks-prewarm", daemon=True).start()
+        return True
+
+    def _prewarm(self, entry, connection, timeout):
+        self._connect(entry, connection, timeout)
+        with self.lock:
+            if entry.refs:
+                return
+            if self.entries.get(entry.key) is not entry:
+                # Trimmed or closed while connecting
+                if entry.client is not None:
+                    entry.client.close()
+                return
+            if entry.is_active():
+                self._schedule_close(entry)
+                self._trim_warm()
+            else:
+                # Not worth keeping a failed attempt around; acquire() retries
+                self._discard(entry)
+
+    def warm_entries(self):
+        """Keys of the warm transports that are connected."""
+        with self.lock:
+            return [entry.key for entry in self.entries.values() if entry.warm and entry.is_active()]
+
+    def _schedule_close(self, entry):
+        # Caller holds the lock
+        if entry.idle_timer is not None:
+            entry.idle_timer.cancel()
+        delay = self.warm_ttl if entry.warm else self.idle_timeout
+        if delay <= 0:
+            self._discard(entry)
+            return
+        entry.idle_timer = threading.Timer(delay, self._close_if_idle, (entry,))
+        entry.idle_timer.daemon = True
+        entry.idle_timer.start()
+
+    def _trim_warm(self):
+        # Caller holds the lock; close the least recently used unused warm transports
+        idle = sorted((entry for entry in self.entries.values() if entry.warm and entry.refs == 0 and entry.ready.is_set()),
+                      key=lambda entry: entry.last_used)
+        for entry in idle[:max(0, len(idle) - self.warm_size)]:
+            self._discard(entry)
+
+    def open_session(self, connection, timeout=10):
+        """Acquire a transport and open a new session channel on it."""
+        transport = self.acquire(connection, timeout)
+        try:
+            return transport.open_session(timeout=timeout)
+        except Exception:
+            self.release(transport)
+            raise
+
+    def entry_for(self, transport):
+        with self.lock:
+            for entry in self.entries.values():
+                if entry.client is not None and entry.transport is transport:
+                    return entry
+        return None
+
+    def timings(self, transport):
+        """Handshake and authentication seconds of a pooled transport."""
+        entry = self.entry_for(transport)
+        if entry is None:
+            return {"handshake": None, "auth": None}
+        return {"handshake": entry.handshake_time, "auth": entry.auth_time}
+
+    def round_trip(self, transport, max_age=0):
+        """Time a keepalive request answered by the server.
+
+        Blocks for at most PROBE_TIMEOUT seconds. A measurement younger
+        than max_age seconds, or the last one while another session is
+        probing the same transport, is returned instead of probing again.
+        """
+        entry = self.entry_for(transport)
+        if entry is None or not entry.is_active():
+            return None
+        if entry.rtt is not None and time.monotonic() - entry.rtt_at < max_age:
+            return entry.rtt
+        if not entry.probe_lock.acquire(blocking=False):
+            # Another session is probing this transport already
+            return entry.rtt
+        try:
+            # Servers answer unknown global requests with a failure, which is enough
+            rtt = transport.probe("keepalive@openssh.com", PROBE_TIMEOUT)
+            if rtt is not None:
+                entry.rtt = rtt
+                entry.rtt_at = time.monotonic()
+            return entry.rtt
+        finally:
+            entry.probe_lock.release()
+
+    def close_all(self):
+        """Close every pooled transport."""
+        with self.lock:
+            for entry in list(self.entries.values()):
+                self._discard(entry)
+
+    def _connect(self, entry, connection, timeout):
+        keys = self.connecting.__dict__.setdefault('keys', set())
+        keys.add(entry.key)
+        sock = None
+        client = None
+        try:
+            if connection.get('jump_hosts'):
+                # Tunnel through the (shared) transport of the last jump host
+                entry.via = self.acquire(self.jump_connection(connection), timeout)
+                sock = entry.via.open_channel(
+                    "direct-tcpip", (connection['host'], int(connection['port'])),
+                    ("127.0.0.1", 0), timeout=timeout)
+            client = TimedSSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            started = time.perf_counter()
+            client.connect(
+                hostname=connection['host'],
+                port=connection['port'],
+                username=connection['username'],
+                password=connection.get('password'),
+                key_filename=connection.get('key_filename'),
+                timeout=timeout,
+                sock=sock,
+                transport_factory=TimedTransport
+            )
+            if client.auth_started is not None:
+                entry.handshake_time = client.auth_started - started
+                entry.auth_time = client.auth_finished - client.auth_started
+            if self.keepalive:
+                client.get_transport().set_keepalive(self.keepalive)
+            entry.client = client
+        except Exception as e:
+            entry.error = e
+            # A failed login leaves the transport thread and socket running
+            if client is not None:
+                client.close()
+            if sock is not None:
+                sock.close()
+        finally:
+            keys.discard(entry.key)
+            entry.ready.set()
+
+    def _close_if_idle(self, entry):
+        with self.lock:
+            if entry.refs == 0 and self.entries.get(entry.key) is entry:
+                self._discard(entry)
+
+    def _discard(self, entry):
+        # Caller holds the lock
+        if self.entries.get(entry.key) is entry:
+            del self.entries[entry.key]
+        if entry.idle_timer is not None:
+            entry.idle_timer.cancel()
+            entry.idle_timer = None
+        if entry.client is not None:
+            entry.client.close()
+        if entry.via is not None:
+            via, entry.via = entry.via, None
+            self.release(via)
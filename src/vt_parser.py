@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+
+# Parser states (modelled after the DEC VT500 state diagram)
+GROUND = 0
+ESCAPE = 1
+ESCAPE_INTERMEDIATE = 2
+CSI_PARAM = 3
+CSI_INTERMEDIATE = 4
+CSI_IGNORE = 5
+OSC_STRING = 6
+STRING_IGNORE = 7
+
+# Character classes
+C_CONTROL = 0       # C0 controls that are executed
+C_BEL = 1
+C_CAN = 2           # CAN and SUB
+C_ESC = 3
+C_INTERMEDIATE = 4  # 0x20-0x2f
+C_PARAM = 5         # 0-9 : ;
+C_PRIVATE = 6       # < = > ?
+C_CSI = 7           # [
+C_OSC = 8           # ]
+C_STRING = 9        # P X ^ _
+C_FINAL = 10        # remaining 0x40-0x7e
+C_DEL = 11
+C_PRINT = 12        # everything else (non-ASCII text)
+
+# Actions
+NONE = 0
+EXECUTE = 1
+COLLECT = 2
+PARAM = 3
+PRIVATE = 4
+ESC_DISPATCH = 5
+CSI_DISPATCH = 6
+CSI_START = 7
+OSC_START = 8
+OSC_PUT = 9
+OSC_END = 10
+ESC_START = 11
+ABORT = 12
+
+def _build_classes():
+    classes = [C_FINAL] * 128
+    for code in range(0x20):
+        classes[code] = C_CONTROL
+    classes[0x07] = C_BEL
+    classes[0x18] = classes[0x1a] = C_CAN
+    classes[0x1b] = C_ESC
+    for code in range(0x20, 0x30):
+        classes[code] = C_INTERMEDIATE
+    for code in range(0x30, 0x3c):
+        classes[code] = C_PARAM
+    for code in range(0x3c, 0x40):
+        classes[code] = C_PRIVATE
+    classes[ord('[')] = C_CSI
+    classes[ord(']')] = C_OSC
+    for ch in 'PX^_':
+        classes[ord(ch)] = C_STRING
+    classes[0x7f] = C_DEL
+    return classes
+
+def _build_table():
+    # Transitions shared by every state except GROUND
+    anywhere = {C_CAN: (ABORT, GROUND), C_ESC: (ESC_START, ESCAPE)}
+
+    def state(default, **entries):
+        row = [default] * 13
+        for cls, transition in anywhere.items():
+            row[cls] = transition
+        for name, transition in entries.items():
+            row[globals()[name]] = transition
+        return row
+
+    table = [None] * 8
+    table[GROUND] = state((NONE, GROUND),
+                          C_CONTROL=(EXECUTE, GROUND), C_BEL=(EXECUTE, GROUND),
+                          C_CAN=(EXECUTE, GROUND), C_ESC=(ESC_START, ESCAPE))
+    table[ESCAPE] = state((ESC_DISPATCH, GROUND),
+                          C_CONTROL=(EXECUTE, ESCAPE), C_BEL=(EXECUTE, ESCAPE),
+                          C_INTERMEDIATE=(COLLECT, ESCAPE_INTERMEDIATE),
+                          C_CSI=(CSI_START, CSI_PARAM), C_OSC=(OSC_START, OSC_STRING),
+                          C_STRING=(NONE, STRING_IGNORE),
+                          C_DEL=(NONE, ESCAPE), C_PRINT=(NONE, GROUND))
+    table[ESCAPE_INTERMEDIATE] = state((ESC_DISPATCH, GROUND),
+                                       C_CONTROL=(EXECUTE, ESCAPE_INTERMEDIATE),
+                                       C_BEL=(EXECUTE, ESCAPE_INTERMEDIATE),
+                                       C_INTERMEDIATE=(COLLECT, ESCAPE_INTERMEDIATE),
+                                       C_DEL=(NONE, ESCAPE_INTERMEDIATE),
+                                       C_PRINT=(NONE, GROUND))
+    table[CSI_PARAM] = state((CSI_DISPATCH, GROUND),
+                             C_CONTROL=(EXECUTE, CSI_PARAM), C_BEL=(EXECUTE, CSI_PARAM),
+                             C_PARAM=(PARAM, CSI_PARAM), C_PRIVATE=(PRIVATE, CSI_PARAM),
+                             C_INTERMEDIATE=(COLLECT, CSI_INTERMEDIATE),
+                             C_DEL=(NONE, CSI_PARAM), C_PRINT=(NONE, GROUND))
+    table[CSI_INTERMEDIATE] = state((CSI_DISPATCH, GROUND),
+                                    C_CONTROL=(EXECUTE, CSI_INTERMEDIATE),
+                                    C_BEL=(EXECUTE, CSI_INTERMEDIATE),
+                                    C_INTERMEDIATE=(COLLECT, CSI_INTERMEDIATE),
+                                    C_PARAM=(NONE, CSI_IGNORE), C_PRIVATE=(NONE, CSI_IGNORE),
+                                    C_DEL=(NONE, CSI_INTERMEDIATE), C_PRINT=(NONE, GROUND))
+    table[CSI_IGNORE] = state((NONE, CSI_IGNORE),
+                              C_CONTROL=(EXECUTE, CSI_IGNORE), C_BEL=(EXECUTE, CSI_IGNORE),
+                              C_CSI=(NONE, GROUND), C_OSC=(NONE, GROUND),
+                              C_STRING=(NONE, GROUND), C_FINAL=(NONE, GROUND))
+    table[OSC_STRING] = state((OSC_PUT, OSC_STRING),
+                              C_CONTROL=(NONE, OSC_STRING), C_BEL=(OSC_END, GROUND),
+                              C_ESC=(OSC_END, ESCAPE))
+    # Also holds over-long OSC strings, which may end with BEL
+    table[STRING_IGNORE] = state((NONE, STRING_IGNORE), C_BEL=(NONE, GROUND))
+    return table
+
+# Limits on CSI parameters sent by the host; longer sequences are ignored
+MAX_PARAM_LENGTH = 64
+MAX_PARAMS = 16
+MAX_PARAM_VALUE = 65535
+
+# Limits on intermediates and OSC strings; longer sequences are ignored
+MAX_INTERMEDIATES = 8
+MAX_OSC_LENGTH = 65536
+
+CLASSES = _build_classes()
+TABLE = _build_table()
+
+# Fast paths: runs of printable text, complete CSI sequences, CSI
+# parameters and OSC payload
+_PRINTABLE_RUN = re.compile(r'[^\x00-\x1f\x7f]+')
+_CSI_SEQUENCE = re.compile(r'\x1b\[([<=>?]?)([0-9:;]{0,64})([ -/]{0,8})([@-~])')
+_PARAM_RUN = re.compile(r'[0-9:;]+')
+_OSC_RUN = re.compile(r'[^\x00-\x1f]+')
+_IGNORED_STRING_RUN = re.compile(r'[^\x07\x18\x1a\x1b]+')
+
+class VTParser:
+    """Stateful, table-driven VT/xterm escape sequence parser.
+
+    Text is fed in arbitrary pieces; a sequence split between two calls to
+    feed() is completed on the next call. Runs of printable text are handed
+    to the handler in one draw() call. Parsed actions are dispatched to the
+    handler, which must provide draw(), execute(), csi_dispatch(),
+    esc_dispatch() and osc_dispatch().
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.reset()
+
+    def reset(self):
+        """Return to the ground state and forget any partial sequence."""
+        self.state = GROUND
+        self.params = ""
+        self.intermediates = ""
+        self.private = ""
+        self.osc = []
+        self.osc_length = 0
+
+    def feed(self, text):
+        """Parse a piece of decoded terminal output."""
+        handler = self.handler
+        draw = handler.draw
+        state = self.state
+        classes = CLASSES
+        table = TABLE
+        length = len(text)
+        i = 0
+
+        while i < length:
+            if state == GROUND:
+                match = _PRINTABLE_RUN.match(text, i)
+                if match is not None:
+                    draw(match.group())
+                    i = match.end()
+                    continue
+                if text[i] == '\x1b':
+                    # Complete CSI sequences skip the state machine
+                    match = _CSI_SEQUENCE.match(text, i)
+                    if match is not None:
+                        private, params, intermediates, final = match.groups()
+                        self._dispatch_csi(params, private, intermediates, final)
+                        i = match.end()
+                        continue
+            elif state == CSI_PARAM:
+                match = _PARAM_RUN.match(text, i)
+                if match is not None:
+                    self.params += match.group()
+                    i = match.end()
+                    if len(self.params) > MAX_PARAM_LENGTH:
+                        state = CSI_IGNORE
+                    continue
+            elif state == OSC_STRING:
+                match = _OSC_RUN.match(text, i)
+                if match is not None:
+                    self.osc.append(match.group())
+                    self.osc_length += match.end() - i
+                    i = match.end()
+                    if self.osc_length > MAX_OSC_LENGTH:
+                        self.osc = []
+                        state = STRING_IGNORE
+                    continue
+            elif state == STRING_IGNORE:
+                match = _IGNORED_STRING_RUN.match(text, i)
+                if match is not None:
+                    i = match.end()
+                    continue
+
+            ch = text[i]
+            code = ord(ch)
+            action, state_next = table[state][classes[code] if code < 128 else C_PRINT]
+
+            if action == EXECUTE:
+                handler.execute(ch)
+            elif action == ESC_START:
+                self.intermediates = ""
+            elif action == CSI_START:
+                self.params = ""
+                self.private = ""
+            elif action == COLLECT:
+                self.intermediates += ch
+                if len(self.intermediates) > MAX_INTERMEDIATES:
+                    self.intermediates = ""
+                    state_next = CSI_IGNORE
+            elif action == PARAM:
+                self.params += ch
+                if len(self.params) > MAX_PARAM_LENGTH:
+                    state_next = CSI_IGNORE
+            elif action == PRIVATE:
+                # Private markers are only valid before any parameter
+                if self.params:
+                    state_next = CSI_IGNORE
+                else:
+                    self.private += ch
+            elif action == ESC_DISPATCH:
+                handler.esc_dispatch(self.intermediates, ch)
+            elif action == CSI_DISPATCH:
+                self._dispatch_csi(self.params, self.private, self.intermediates, ch)
+            elif action == OSC_START:
+                self.osc = []
+                self.osc_length = 0
+            elif action == OSC_PUT:
+                self.osc.append(ch)
+                self.osc_length += 1
+                if self.osc_length > MAX_OSC_LENGTH:
+                    self.osc = []
+                    state_next = STRING_IGNORE
+            elif action == OSC_END:
+                handler.osc_dispatch("".join(self.osc))
+                self.intermediates = ""
+
+            state = state_next
+            i += 1
+
+        self.state = state
+
+    def _dispatch_csi(self, params, private, intermediates, final):
+        if len(params) > MAX_PARAM_LENGTH:
+            return
+        try:
+            if not params:
+                values = []
+            elif params.isdigit():
+                values = [min(int(params), MAX_PARAM_VALUE)]
+            else:
+                # Sub-parameters (38:2:r:g:b) are treated like regular parameters
+                values = [min(int(param), MAX_PARAM_VALUE) if param else 0
+                          for param in params.replace(":", ";").split(";")[:MAX_PARAMS]]
+        except ValueError:
+            # Malformed sequence, ignored
+            return
+        self.handler.csi_dispatch(values, private, intermediates, final)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Recently used connection names remembered in the settings
+RECENT_LIMIT = 20
+
+class WarmPool:
+    """Decides which saved connections are kept pre-connected.
+
+    Pinned connections come first, then the most recently opened ones, up
+    to the transport pool's warm_size. The transports themselves live in
+    the TransportPool, so opening a tab for a warm connection only needs a
+    new channel. Nothing is pre-connected unless the "warm_pool" setting is
+    on.
+    """
+
+    def __init__(self, transport_pool, connection_manager, settings_manager):
+        self.transport_pool = transport_pool
+        self.connection_manager = connection_manager
+        self.settings_manager = settings_manager
+
+    def enabled(self):
+        return bool(self.settings_manager.get("warm_pool")) and self.transport_pool.warm_size > 0
+
+    def pinned(self):
+        return list(self.settings_manager.get("pinned_connections"))
+
+    def recent(self):
+        return list(self.settings_manager.get("recent_connections"))
+
+    def is_pinned(self, name):
+        return name in self.settings_manager.get("pinned_connections")
+
+    def set_pinned(self, name, pinned):
+        """Pin or unpin a connection; a newly pinned one is pre-connected right away."""
+        names = [n for n in self.pinned() if n != name]
+        if pinned:
+            names.append(name)
+        self.settings_manager.set("pinned_connections", names)
+        if pinned and self.enabled():
+            connection = self.connection_manager.get_connection(name)
+            if connection is not None:
+                self.transport_pool.prewarm(connection)
+
+    def candidates(self):
+        """Saved connections to keep warm, most important first."""
+        names = []
+        for name in self.pinned() + self.recent():
+            if name not in names:
+                names.append(name)
+        names = names[:self.transport_pool.warm_size]
+        found = self.connection_manager.get_connections(names)
+        return [found[name] for name in names if name in found]
+
+    def warm_up(self):
+        """Start pre-connecting every candidate in the background."""
+        if not self.enabled():
+            return 0
+        candidates = self.candidates()
+        for connection in candidates:
+            self.transport_pool.prewarm(connection)
+        return len(candidates)
+
+    def record_use(self, connection):
+        """Remember that a connection was opened and keep its transport warm."""
+        name = connection.get("name")
+        if name is None or self.connection_manager.get_connection(name) is None:
+            # Quick connections are not saved, so they are not remembered either
+            return
+        recent = [name] + [n for n in self.recent() if n != name]
+        self.settings_manager.set("recent_connections", recent[:RECENT_LIMIT])
+        if self.enabled():
+            self.transport_pool.prewarm(connection)